@@ -0,0 +1,154 @@
+"""
+Admission control / load shedding
+Rejects low-priority requests and new SSE subscribers with a fast 503 +
+Retry-After when the event loop lags, the memory layer queues up, or too
+many streams are open, keeping headroom for live voice tool calls
+"""
+
+import os
+from typing import Any, Callable, Dict
+from urllib.parse import parse_qs
+
+from json_backend import dumps_bytes
+
+CRITICAL = "critical"
+NORMAL = "normal"
+LOW = "low"
+SSE_SUBSCRIBE = "sse_subscribe"
+
+# Paths served to live voice sessions; never shed
+CRITICAL_PATHS = ("/mcp", "/mcp-v1", "/elevenlabs/webhook")
+CRITICAL_PREFIXES = ("/webhook/elevenlabs/tools/",)
+LOW_PRIORITY_PATHS = ("/api/test-memory", "/api/stats", "/api/memory/export", "/api/memory/import",
+                      "/api/memory/bulk-delete")
+SSE_PATHS = ("/sse", "/mcp", "/mcp-v1")
+# Operational endpoints must keep answering while we shed
+EXEMPT_PREFIXES = ("/health", "/admin/", "/metrics")
+
+
+def classify(method: str, path: str, query: bytes = b"") -> str:
+    if path.startswith(EXEMPT_PREFIXES):
+        return CRITICAL
+    if method == "GET" and path in SSE_PATHS:
+        # GET /mcp?method=initialize|tools/list is a JSON-RPC call, not a stream
+        if query and "method" in parse_qs(query.decode("latin-1")):
+            return CRITICAL
+        return SSE_SUBSCRIBE
+    if path in CRITICAL_PATHS or path.startswith(CRITICAL_PREFIXES):
+        return CRITICAL
+    if path in LOW_PRIORITY_PATHS:
+        return LOW
+    return NORMAL
+
+
+class AdmissionController:
+    """Decides per request class whether the process has room for more work"""
+
+    def __init__(
+        self,
+        lag_fn: Callable[[], float],
+        queue_depth_fn: Callable[[], int],
+        low_max_lag: float = 0.1,
+        low_max_queue: int = 50,
+        normal_max_lag: float = 0.5,
+        normal_max_queue: int = 500,
+        sse_max_lag: float = 0.25,
+        sse_max_subscribers: int = 2000,
+        retry_after: int = 2,
+    ):
+        self.lag_fn = lag_fn
+        self.queue_depth_fn = queue_depth_fn
+        self.limits = {
+            LOW: (low_max_lag, low_max_queue),
+            NORMAL: (normal_max_lag, normal_max_queue),
+            SSE_SUBSCRIBE: (sse_max_lag, None),
+        }
+        self.sse_max_subscribers = sse_max_subscribers
+        self.retry_after = retry_after
+
+        self.sse_subscribers = 0
+        self.admitted = {CRITICAL: 0, NORMAL: 0, LOW: 0, SSE_SUBSCRIBE: 0}
+        self.shed = {NORMAL: 0, LOW: 0, SSE_SUBSCRIBE: 0}
+        self.last_reason = None
+
+    def check(self, request_class: str):
+        """Return None to admit, or the reason the request should be shed"""
+        if request_class == CRITICAL:
+            return None
+        max_lag, max_queue = self.limits[request_class]
+        lag = self.lag_fn()
+        if lag > max_lag:
+            return f"event loop lag {lag * 1000:.0f}ms"
+        if max_queue is not None:
+            depth = self.queue_depth_fn()
+            if depth > max_queue:
+                return f"memory queue depth {depth}"
+        if request_class == SSE_SUBSCRIBE and self.sse_subscribers >= self.sse_max_subscribers:
+            return f"{self.sse_subscribers} active SSE subscribers"
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "event_loop_lag_ms": round(self.lag_fn() * 1000, 2),
+            "memory_queue_depth": self.queue_depth_fn(),
+            "sse_subscribers": self.sse_subscribers,
+            "sse_max_subscribers": self.sse_max_subscribers,
+            "admitted": dict(self.admitted),
+            "shed": dict(self.shed),
+            "last_shed_reason": self.last_reason,
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware answering 503 + Retry-After for requests the controller sheds"""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        controller = self.controller
+        request_class = classify(scope["method"], scope["path"], scope.get("query_string", b""))
+        reason = controller.check(request_class)
+        if reason is not None:
+            controller.shed[request_class] += 1
+            controller.last_reason = reason
+            body = dumps_bytes({"error": "Service overloaded", "reason": reason})
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(controller.retry_after).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        controller.admitted[request_class] += 1
+        if request_class != SSE_SUBSCRIBE:
+            return await self.app(scope, receive, send)
+        controller.sse_subscribers += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.sse_subscribers -= 1
+
+
+def controller_from_env(lag_fn, queue_depth_fn) -> AdmissionController:
+    env = os.environ.get
+    return AdmissionController(
+        lag_fn,
+        queue_depth_fn,
+        low_max_lag=float(env("ADMISSION_LOW_MAX_LAG_S", 0.1)),
+        low_max_queue=int(env("ADMISSION_LOW_MAX_QUEUE", 50)),
+        normal_max_lag=float(env("ADMISSION_NORMAL_MAX_LAG_S", 0.5)),
+        normal_max_queue=int(env("ADMISSION_NORMAL_MAX_QUEUE", 500)),
+        sse_max_lag=float(env("ADMISSION_SSE_MAX_LAG_S", 0.25)),
+        sse_max_subscribers=int(env("ADMISSION_SSE_MAX_SUBSCRIBERS", 2000)),
+        retry_after=int(env("ADMISSION_RETRY_AFTER_S", 2)),
+    )
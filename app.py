@@ -5,23 +5,47 @@ ElevenLabs + Mem0 Integration with SSE Support
 """
 
 import os
-import json
 import asyncio
+import threading
+import time
+import zlib
 from datetime import datetime
 from fastapi import FastAPI, HTTPException, Request, Response
-from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from mem0 import MemoryClient
 from dotenv import load_dotenv
 import uvicorn
 from typing import AsyncGenerator
 import uuid
 
+from admission import AdmissionMiddleware, controller_from_env
+from bulk_import import ImportRejected, ImportRunning, importer_from_env
+from json_backend import FastJSONResponse, dumps_bytes, jsonrpc_raw, request_json, sse_frame
+from keyword_index import reciprocal_rank_fusion
+from loop_monitor import LoopMonitorMiddleware, monitor_from_env
+from mem0_standin import memory_client_from_env
+from memory_index import InvalidCursor, InvalidDate, decode_offset, index_from_env, result_list
+from memory_layer import MemoryLayer
+from profiler import ProfilerBusy, collapsed, profiler_from_env
+from resilience import error_status
+from retention import parse_filter, retention_from_env
+from tenancy import TenantMiddleware, UnknownTenant, resolver_from_env
+from tracing import TracingMiddleware, tracer
+from metrics import REGISTRY, SSE_QUEUE_LAG, TOOL_CALLS, TOOL_LATENCY, MetricsMiddleware, jsonrpc_code
+from scheduling import ADMIN, BULK
+from static_assets import file_asset, json_asset
+
 # Load environment variables
 load_dotenv()
 
 # Initialize FastAPI
-app = FastAPI(title="CombinedMemory Voice Agent")
+# Responses are encoded by json_backend (orjson when installed)
+app = FastAPI(title="CombinedMemory Voice Agent", default_response_class=FastJSONResponse)
+
+# Per-request tenant (Mem0 user) from token, X-User-Id or tool argument (TENANT_*);
+# added before CORS so tenant 403s still carry CORS headers
+tenants = resolver_from_env(os.environ.get('USER_ID', 'quinn_may'))
+app.add_middleware(TenantMiddleware, resolver=tenants)
 
 # Add CORS middleware
 app.add_middleware(
@@ -32,6 +56,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Event-loop lag sampler / blocking-call detector
+loop_monitor = monitor_from_env()
+app.add_middleware(LoopMonitorMiddleware, monitor=loop_monitor)
+
+# Load shedding driven by loop lag, memory queue depth and SSE subscriber count
+admission = controller_from_env(
+    loop_monitor.current_lag,
+    lambda: memory.queue_depth if memory else 0,
+)
+app.add_middleware(AdmissionMiddleware, controller=admission)
+
+# Outside admission so shed 503s are counted too (tracing wraps it)
+app.add_middleware(MetricsMiddleware)
+
+# Per-request span tracing (TRACE_EXPORT / TRACE_SAMPLE_RATE)
+app.add_middleware(TracingMiddleware, tracer=tracer)
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    """Begin sampling event-loop lag once the server loop is running"""
+    if os.environ.get("LOOP_MONITOR", "1") != "0":
+        loop_monitor.start()
+    profiler.main_thread_id = threading.get_ident()
+
+# On-demand stack sampling profiler behind /admin/profile
+profiler = profiler_from_env()
+
 # Global configuration
 USER_ID = os.environ.get('USER_ID', 'quinn_may')
 MEM0_API_KEY = os.environ.get('MEM0_API_KEY')
@@ -41,362 +92,245 @@ ELEVENLABS_SERVER_ID = os.environ.get('ELEVENLABS_SERVER_ID', '74Vinci9jnFDyA4G6
 CLIENT = os.environ.get('MEM0_CLIENT', 'CombinedMemory.com')
 PROJECT_TYPE = os.environ.get('MEM0_PROJECT_TYPE', 'voice_ai_assistant')
 DEVICE = os.environ.get('MEM0_DEVICE', 'railway_deployment')
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+# Fuse Mem0 semantic results with the local BM25 keyword index (0 = semantic only)
+HYBRID_SEARCH = os.environ.get('HYBRID_SEARCH', '1') != '0'
 
-# Initialize Mem0 client
-mem0_client = None
-if MEM0_API_KEY:
-    mem0_client = MemoryClient(api_key=MEM0_API_KEY)
+# Initialize Mem0 client (MEM0_BACKEND=standin selects the offline stand-in)
+mem0_client = memory_client_from_env(MEM0_API_KEY, USER_ID)
 
-# SSE Memory Queue for broadcasting
-memory_queue = asyncio.Queue()
-active_connections = []
+# Async memory layer (circuit breaker + hedged reads) wrapping the Mem0 client
+memory = MemoryLayer(mem0_client) if mem0_client else None
 
-async def broadcast_memory(memory_data):
-    """Broadcast memory to all SSE connections"""
-    for connection in active_connections[:]:
-        try:
-            await connection.put(memory_data)
-        except:
-            active_connections.remove(connection)
+# Local per-user view of memories backing paginated get_all (MEMORY_INDEX_TTL_S)
+memory_index = index_from_env(memory)
 
-@app.get("/", response_class=HTMLResponse)
-async def root():
-    """Serve the web interface for MCP server"""
-    return """
-<!DOCTYPE html>
-<html>
-<head>
-    <title>CombinedMemory MCP Server</title>
-    <meta name="viewport" content="width=device-width, initial-scale=1">
-    <style>
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, sans-serif;
-            max-width: 800px;
-            margin: 0 auto;
-            padding: 20px;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-        }
-        .container {
-            background: white;
-            border-radius: 20px;
-            padding: 30px;
-            box-shadow: 0 20px 60px rgba(0,0,0,0.3);
-        }
-        h1 {
-            color: #333;
-            text-align: center;
-            margin-bottom: 10px;
-        }
-        .subtitle {
-            text-align: center;
-            color: #666;
-            margin-bottom: 30px;
-        }
-        .status {
-            background: #f0f4f8;
-            padding: 15px;
-            border-radius: 10px;
-            margin-bottom: 20px;
-        }
-        .status-item {
-            display: flex;
-            justify-content: space-between;
-            margin: 10px 0;
-        }
-        .badge {
-            display: inline-block;
-            padding: 3px 10px;
-            border-radius: 15px;
-            font-size: 12px;
-            font-weight: 600;
-        }
-        .badge.success {
-            background: #10b981;
-            color: white;
-        }
-        .badge.info {
-            background: #3b82f6;
-            color: white;
-        }
-        .badge.warning {
-            background: #fbbf24;
-            color: #92400e;
-        }
-        .actions {
-            margin-top: 30px;
-        }
-        .btn {
-            display: block;
-            width: 100%;
-            padding: 15px;
-            margin: 10px 0;
-            border: none;
-            border-radius: 10px;
-            font-size: 16px;
-            font-weight: 600;
-            cursor: pointer;
-            transition: all 0.3s;
-        }
-        .btn-primary {
-            background: #667eea;
-            color: white;
-        }
-        .btn-primary:hover {
-            background: #5a67d8;
-            transform: translateY(-2px);
-        }
-        .btn-secondary {
-            background: #e5e7eb;
-            color: #333;
-        }
-        .btn-secondary:hover {
-            background: #d1d5db;
-        }
-        .btn-danger {
-            background: #ef4444;
-            color: white;
-        }
-        .btn-danger:hover {
-            background: #dc2626;
-        }
-        .info-box {
-            background: #fef3c7;
-            border: 1px solid #fbbf24;
-            padding: 15px;
-            border-radius: 10px;
-            margin: 20px 0;
-        }
-        .info-box h3 {
-            margin-top: 0;
-            color: #92400e;
-        }
-        .code {
-            background: #1f2937;
-            color: #10b981;
-            padding: 10px;
-            border-radius: 5px;
-            font-family: 'Courier New', monospace;
-            font-size: 14px;
-            overflow-x: auto;
+# Dashboard HTML, precompressed once with ETag / Last-Modified for conditional GETs
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+DASHBOARD = file_asset(os.path.join(STATIC_DIR, "index.html"), "text/html; charset=utf-8")
+
+# Gauges read at scrape time
+REGISTRY.gauge("sse_subscribers", "Open /sse memory streams", lambda: len(active_connections))
+REGISTRY.gauge("streams_open", "All open SSE streams (/sse, /mcp, /mcp-v1)", lambda: admission.sse_subscribers)
+REGISTRY.gauge("sse_queue_depth_max", "Deepest per-subscriber SSE queue",
+               lambda: max((q.qsize() for q in active_connections), default=0))
+REGISTRY.gauge("event_loop_lag_seconds", "Smoothed event-loop lag", loop_monitor.current_lag)
+REGISTRY.gauge("memory_queue_depth", "Memory calls waiting for a slot", lambda: memory.queue_depth if memory else 0)
+REGISTRY.gauge("mem0_concurrency_limit", "Adaptive Mem0 concurrency limit",
+               lambda: int(memory.limiter.limit) if memory else 0)
+REGISTRY.gauge("mem0_circuit_open", "1 while the Mem0 circuit breaker is open or half-open",
+               lambda: int(memory.breaker.state != "closed") if memory else 0)
+
+# Tool names used as metric labels
+KNOWN_TOOLS = {
+    "store_memory", "search_memory", "get_all_memories", "delete_memory",
+    "addMemories", "retrieveMemories", "getSessionSummary",
+}
+
+# MCP initialize / tools/list results never change, so they are encoded once
+MCP_INITIALIZE_RESULT = dumps_bytes({
+    "protocolVersion": "0.1.0",
+    "capabilities": {
+        "tools": {"listChanged": True}
+    },
+    "serverInfo": {
+        "name": "mem0-mcp",
+        "version": "1.0.0"
+    }
+})
+
+MCP_TOOLS = [
+    {
+        "name": "store_memory",
+        "description": "Store conversation memories",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "message": {
+                    "type": "string",
+                    "description": "Memory to store"
+                }
+            },
+            "required": ["message"]
         }
-        .mcp-status {
-            background: #f3f4f6;
-            border: 2px solid #e5e7eb;
-            padding: 15px;
-            border-radius: 10px;
-            margin: 20px 0;
+    },
+    {
+        "name": "search_memory",
+        "description": "Search through stored memories",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Search query to find relevant memories"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of results to return (default: 5)",
+                    "minimum": 1,
+                    "maximum": 20
+                },
+                "scopes": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": ["user", "agent", "run"]},
+                    "description": "Memory scopes to search together: the user's facts, the agent's shared "
+                                   "knowledge, and/or one conversation (needs run_id). Default: [\"user\"]"
+                },
+                "run_id": {
+                    "type": "string",
+                    "description": "Conversation whose memories the run scope searches"
+                }
+            },
+            "required": ["query"]
         }
-        .mcp-messages {
-            max-height: 200px;
-            overflow-y: auto;
-            background: #1f2937;
-            color: #10b981;
-            padding: 10px;
-            border-radius: 5px;
-            font-family: monospace;
-            font-size: 12px;
-            margin-top: 10px;
+    },
+    {
+        "name": "get_all_memories",
+        "description": "Retrieve the user's memories, newest first, one page at a time; "
+                       "optionally only those from a date range or of one category",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of memories to return (default: 10)",
+                    "minimum": 1,
+                    "maximum": 50
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "nextCursor from the previous page, to continue after it"
+                },
+                "date_from": {
+                    "type": "string",
+                    "description": "First day to include: YYYY-MM-DD, YYYY-MM, YYYY, 'today' or 'yesterday'"
+                },
+                "date_to": {
+                    "type": "string",
+                    "description": "Last day to include, same formats as date_from (a month or year covers all of it)"
+                },
+                "category": {
+                    "type": "string",
+                    "description": "Only memories of this category, e.g. mcp_memory, elevenlabs_voice, sse_stream"
+                }
+            }
         }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>🧠 CombinedMemory MCP Server</h1>
-        <p class="subtitle">Powered by Mem0 + MCP Protocol</p>
-        
-        <div class="status">
-            <h3>System Status</h3>
-            <div class="status-item">
-                <span>Memory Backend</span>
-                <span class="badge success">Connected</span>
-            </div>
-            <div class="status-item">
-                <span>MCP Protocol</span>
-                <span class="badge success">v0.1.0</span>
-            </div>
-            <div class="status-item">
-                <span>MCP Endpoint</span>
-                <span id="mcp-status" class="badge success">Active</span>
-            </div>
-            <div class="status-item">
-                <span>User ID</span>
-                <span class="badge info">quinn_may</span>
-            </div>
-            <div class="status-item">
-                <span>Tools Available</span>
-                <span class="badge info">4</span>
-            </div>
-        </div>
-
-        <div class="info-box">
-            <h3>🔌 MCP Endpoint</h3>
-            <p>The MCP server is available at:</p>
-            <div class="code">
-                POST /mcp - MCP JSON-RPC Protocol<br>
-                URL: https://mcp.combinedmemory.com/mcp
-            </div>
-        </div>
-
-        <div class="mcp-status">
-            <h3>🧪 MCP Protocol Tests</h3>
-            <button class="btn btn-primary" onclick="testMCPInitialize()">Test MCP Initialize</button>
-            <button class="btn btn-secondary" onclick="testMCPToolsList()">Test Tools List</button>
-            <button class="btn btn-secondary" onclick="testMCPStoreMemory()">Test Store Memory</button>
-            <div class="mcp-messages" id="mcp-messages">
-                MCP test results will appear here...
-            </div>
-        </div>
-
-        <div class="actions">
-            <button class="btn btn-primary" onclick="testMemory()">Test Memory System</button>
-            <button class="btn btn-secondary" onclick="viewStats()">View Statistics</button>
-        </div>
-
-        <div id="result" style="margin-top: 20px;"></div>
-    </div>
-
-    <script>
-        function logMessage(message) {
-            const messagesDiv = document.getElementById('mcp-messages');
-            const timestamp = new Date().toLocaleTimeString();
-            messagesDiv.innerHTML += `[${timestamp}] ${message}\n`;
-            messagesDiv.scrollTop = messagesDiv.scrollHeight;
+    },
+    {
+        "name": "delete_memory",
+        "description": "Delete a specific memory by ID",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "memory_id": {
+                    "type": "string",
+                    "description": "ID of the memory to delete"
+                }
+            },
+            "required": ["memory_id"]
         }
+    }
+]
+MCP_TOOLS_LIST_RESULT = dumps_bytes({"tools": MCP_TOOLS})
 
-        async function testMCPInitialize() {
-            logMessage('Testing MCP Initialize...');
-            
-            try {
-                const response = await fetch('/mcp', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json'
-                    },
-                    body: JSON.stringify({
-                        jsonrpc: '2.0',
-                        id: '1',
-                        method: 'initialize',
-                        params: {}
-                    })
-                });
-                
-                const data = await response.json();
-                logMessage(`✅ Initialize: ${JSON.stringify(data.result, null, 2)}`);
-            } catch (error) {
-                logMessage(`❌ Initialize Error: ${error}`);
-            }
-        }
+# SSE Memory Queue for broadcasting
+memory_queue = asyncio.Queue()
+active_connections = []
+# Subscriber queue -> tenant, so each tenant only sees its own memory events
+connection_tenants = {}
 
-        async function testMCPToolsList() {
-            logMessage('Testing MCP Tools List...');
-            
-            try {
-                const response = await fetch('/mcp', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json'
-                    },
-                    body: JSON.stringify({
-                        jsonrpc: '2.0',
-                        id: '2',
-                        method: 'tools/list',
-                        params: {}
-                    })
-                });
-                
-                const data = await response.json();
-                logMessage(`✅ Tools: ${data.result.tools.length} tool(s) available`);
-                logMessage(`Tool: ${data.result.tools[0].name} - ${data.result.tools[0].description}`);
-            } catch (error) {
-                logMessage(`❌ Tools List Error: ${error}`);
-            }
-        }
+async def broadcast_memory(memory_data, tenant: str = None):
+    """Broadcast memory to the current tenant's SSE connections"""
+    tenant = tenant or tenants.current()
+    # Enqueue time travels with the event so delivery lag can be measured
+    enqueued_at = time.monotonic()
+    with tracer.span("broadcast_memory", subscribers=len(active_connections)):
+        # Encoded once here, not once per subscriber
+        frame = sse_frame(memory_data)
+        for connection in active_connections[:]:
+            if connection_tenants.get(connection, tenant) != tenant:
+                continue
+            try:
+                await connection.put((enqueued_at, frame))
+            except:
+                active_connections.remove(connection)
 
-        async function testMCPStoreMemory() {
-            logMessage('Testing MCP Store Memory...');
-            
-            try {
-                const testMessage = `Test memory from MCP frontend at ${new Date().toISOString()}`;
-                const response = await fetch('/mcp', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json'
-                    },
-                    body: JSON.stringify({
-                        jsonrpc: '2.0',
-                        id: '3',
-                        method: 'tools/call',
-                        params: {
-                            name: 'store_memory',
-                            arguments: {
-                                message: testMessage
-                            }
-                        }
-                    })
-                });
-                
-                const data = await response.json();
-                if (data.result) {
-                    logMessage(`✅ Memory Stored: ${data.result.content[0].text}`);
-                } else {
-                    logMessage(`❌ Store Error: ${JSON.stringify(data.error)}`);
-                }
-            } catch (error) {
-                logMessage(`❌ Store Memory Error: ${error}`);
-            }
-        }
+def observe_tool(transport: str, tool_name: str, started: float, code: str):
+    """Record latency and result code for one MCP / webhook tool call"""
+    # Unknown tool names would otherwise become unbounded label values
+    tool = tool_name if code != "-32601" and tool_name in KNOWN_TOOLS else "<unknown>"
+    TOOL_LATENCY.observe(time.perf_counter() - started, transport, tool)
+    TOOL_CALLS.inc(transport, tool, code)
 
-        async function testMemory() {
-            const result = document.getElementById('result');
-            result.innerHTML = '<p>Testing memory system...</p>';
-            
-            try {
-                const response = await fetch('/api/test-memory');
-                const data = await response.json();
-                result.innerHTML = `
-                    <div class="status">
-                        <h3>✅ Memory Test Results</h3>
-                        <pre class="code">${JSON.stringify(data, null, 2)}</pre>
-                    </div>
-                `;
-            } catch (error) {
-                result.innerHTML = `<p style="color: red;">Error: ${error}</p>`;
-            }
-        }
+# Memory scopes search_memory can fan out over
+SEARCH_SCOPES = ("user", "agent", "run")
 
-        async function viewStats() {
-            const result = document.getElementById('result');
-            result.innerHTML = '<p>Loading statistics...</p>';
-            
-            try {
-                const response = await fetch('/api/stats');
-                const data = await response.json();
-                result.innerHTML = `
-                    <div class="status">
-                        <h3>📊 System Statistics</h3>
-                        <div class="status-item">
-                            <span>Total Memories</span>
-                            <span class="badge info">${data.memory_count || 0}</span>
-                        </div>
-                        <div class="status-item">
-                            <span>Recent Activity</span>
-                            <span class="badge success">${data.recent_activity || 'Active'}</span>
-                        </div>
-                        <div class="status-item">
-                            <span>MCP Endpoint</span>
-                            <span class="badge success">https://mcp.combinedmemory.com/mcp</span>
-                        </div>
-                    </div>
-                `;
-            } catch (error) {
-                result.innerHTML = `<p style="color: red;">Error: ${error}</p>`;
-            }
-        }
-    </script>
-</body>
-</html>
-"""
+def scope_filters(scopes, run_id: str = None) -> dict:
+    """Mem0 search kwargs per requested scope; raises ValueError for unknown scopes"""
+    if isinstance(scopes, str):
+        scopes = [scopes]
+    filters = {}
+    for scope in scopes or ["user"]:
+        if scope == "user":
+            filters[scope] = {"user_id": tenants.current()}
+        elif scope == "agent":
+            filters[scope] = {"agent_id": AGENT_ID}
+        elif scope == "run":
+            if not run_id:
+                raise ValueError("The run scope needs a run_id")
+            filters[scope] = {"user_id": tenants.current(), "run_id": str(run_id)}
+        else:
+            raise ValueError(f"Unknown scope {scope!r}; expected one of {', '.join(SEARCH_SCOPES)}")
+    return filters
+
+async def hybrid_search(query: str, limit: int, scopes: dict = None) -> list:
+    """
+    Mem0 semantic search per scope (user / agent / run, see scope_filters),
+    all in flight at once, plus BM25 keyword matches over the user's memories,
+    de-duplicated and merged by reciprocal-rank fusion
+    """
+    scopes = scopes or {"user": {"user_id": tenants.current()}}
+    if not HYBRID_SEARCH and len(scopes) == 1:
+        return result_list(await memory.search(query=query, limit=limit, **next(iter(scopes.values()))))
+    # The keyword lookup runs on the loop while the Mem0 calls are in flight
+    semantic = asyncio.gather(
+        *(memory.search(query=query, limit=limit, **kwargs) for kwargs in scopes.values()),
+        return_exceptions=True
+    )
+    keyword = []
+    if HYBRID_SEARCH and "user" in scopes:
+        with tracer.span("keyword_search"):
+            keyword = memory_index.keyword_search(tenants.current(), query, limit)
+    answers = await semantic
+    
+    # One failing scope degrades the answer instead of failing it
+    rankings = []
+    for scope, answer in zip(scopes, answers):
+        if isinstance(answer, BaseException):
+            continue
+        # Mem0 answers either a list or {"results": [...]}
+        answer = result_list(answer)
+        rankings.append([{**r, "scope": scope} for r in answer] if len(scopes) > 1 else answer)
+    if not rankings:
+        raise answers[0]
+    if len(scopes) > 1:
+        keyword = [{**r, "scope": "user"} for r in keyword]
+    if len(rankings) == 1 and not keyword:
+        return rankings[0]
+    with tracer.span("rank_fusion", rankings=len(rankings), keyword=len(keyword)):
+        return reciprocal_rank_fusion(rankings + [keyword], limit)
+
+def require_admin(request: Request, strict: bool = False):
+    """Guard admin endpoints with X-Admin-Token when ADMIN_TOKEN is set (strict: always required)"""
+    if strict and not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="ADMIN_TOKEN is not configured")
+    if ADMIN_TOKEN and request.headers.get("x-admin-token") != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@app.get("/", response_class=HTMLResponse)
+async def root(request: Request):
+    """Serve the web interface for MCP server"""
+    return DASHBOARD.response(request, "dashboard")
 
 @app.get("/health")
 async def health_check():
@@ -405,51 +339,56 @@ async def health_check():
 
 # ========== NEW SSE ENDPOINTS ==========
 
-async def event_generator() -> AsyncGenerator[str, None]:
+async def event_generator(tenant: str = None) -> AsyncGenerator[str, None]:
     """Generate SSE events from memory queue"""
     queue = asyncio.Queue()
+    connection_tenants[queue] = tenant or tenants.default
     active_connections.append(queue)
     
     try:
         # Send initial connection message
-        yield f"data: {json.dumps({'type': 'connection', 'message': 'Connected to CombinedMemory SSE', 'timestamp': datetime.now().isoformat()})}\n\n"
+        yield sse_frame({'type': 'connection', 'message': 'Connected to CombinedMemory SSE', 'timestamp': datetime.now().isoformat()})
         
         while True:
             # Wait for new memory events
-            memory_event = await queue.get()
-            yield f"data: {json.dumps(memory_event)}\n\n"
+            enqueued_at, frame = await queue.get()
+            SSE_QUEUE_LAG.observe(time.monotonic() - enqueued_at)
+            yield frame
     except asyncio.CancelledError:
         pass
     finally:
         if queue in active_connections:
             active_connections.remove(queue)
+        connection_tenants.pop(queue, None)
 
 @app.get("/.well-known/ai-plugin.json")
-async def openai_verification():
+async def openai_verification(request: Request):
     """OpenAI plugin verification endpoint"""
-    return {
-        "schema_version": "v1",
-        "name_for_human": "CombinedMemory Voice Agent",
-        "name_for_model": "combinedmemory_voice",
-        "description_for_human": "Voice AI assistant with memory capabilities",
-        "description_for_model": "Voice AI assistant with ElevenLabs and Mem0 integration for persistent memory",
-        "auth": {
-            "type": "none"
-        },
-        "api": {
-            "type": "openapi",
-            "url": "https://mcp.combinedmemory.com/openapi.json"
-        },
-        "logo_url": "https://mcp.combinedmemory.com/logo.png",
-        "contact_email": "quinn@maymarketingseo.com",
-        "legal_info_url": "https://combinedmemory.com/legal"
-    }
+    return AI_PLUGIN.response(request, "ai_plugin")
+
+AI_PLUGIN = json_asset({
+    "schema_version": "v1",
+    "name_for_human": "CombinedMemory Voice Agent",
+    "name_for_model": "combinedmemory_voice",
+    "description_for_human": "Voice AI assistant with memory capabilities",
+    "description_for_model": "Voice AI assistant with ElevenLabs and Mem0 integration for persistent memory",
+    "auth": {
+        "type": "none"
+    },
+    "api": {
+        "type": "openapi",
+        "url": "https://mcp.combinedmemory.com/openapi.json"
+    },
+    "logo_url": "https://mcp.combinedmemory.com/logo.png",
+    "contact_email": "quinn@maymarketingseo.com",
+    "legal_info_url": "https://combinedmemory.com/legal"
+})
 
 @app.get("/sse")
 async def sse_stream(request: Request):
     """SSE endpoint for streaming memory updates"""
     return StreamingResponse(
-        event_generator(),
+        event_generator(tenants.current()),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -498,7 +437,7 @@ async def mcp_sse_stream(request: Request):
                     }
                 }
             }
-            return JSONResponse(content=response)
+            return FastJSONResponse(content=response)
         
         elif method == "tools/list":
             response = {
@@ -521,13 +460,13 @@ async def mcp_sse_stream(request: Request):
                     }]
                 }
             }
-            return JSONResponse(content=response)
+            return FastJSONResponse(content=response)
     
     # Default SSE stream behavior
     async def mcp_event_generator():
         """Generate MCP protocol events in SSE format"""
         # Send connection established
-        yield f"event: open\ndata: {json.dumps({'type': 'connection', 'status': 'connected'})}\n\n"
+        yield sse_frame({'type': 'connection', 'status': 'connected'}, event="open")
         
         # Keep connection alive
         while True:
@@ -553,7 +492,7 @@ async def mcp_sse_stream(request: Request):
 @app.post("/sse")
 async def sse_post_memory(request: Request):
     """POST endpoint to push memories through SSE stream"""
-    data = await request.json()
+    data = await request_json(request)
     message = data.get("message")
     
     if not message:
@@ -567,7 +506,7 @@ async def sse_post_memory(request: Request):
         "id": memory_id,
         "type": "memory",
         "message": message,
-        "user_id": USER_ID,
+        "user_id": tenants.current(),
         "agent_id": AGENT_ID,
         "timestamp": datetime.now().isoformat(),
         "metadata": data.get("metadata", {})
@@ -591,9 +530,9 @@ async def sse_post_memory(request: Request):
             }
             
             # Store in mem0
-            mem0_result = mem0_client.add(
+            mem0_result = await memory.add(
                 messages=[{"role": "user", "content": message}],
-                user_id=USER_ID,
+                user_id=tenants.current(),
                 metadata=metadata
             )
             
@@ -618,311 +557,302 @@ async def sse_post_memory(request: Request):
         "timestamp": memory_event["timestamp"]
     }
 
-@app.post("/mcp")
-async def mcp_endpoint(request: Request):
-    """MCP Protocol endpoint for ElevenLabs"""
+async def call_mcp_tool(tool_name: str, arguments: dict, request_id):
+    """Execute one MCP tools/call as the tenant named by its user_id argument, if any"""
     try:
-        body = await request.json()
+        tenant = tenants.override(arguments.get("user_id"))
+    except UnknownTenant as e:
+        return {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "error": {
+                "code": -32602,
+                "message": str(e)
+            }
+        }
+    with tenants.scope(tenant):
+        return await run_mcp_tool(tool_name, arguments, request_id)
+
+async def run_mcp_tool(tool_name: str, arguments: dict, request_id):
+    """Execute one MCP tools/call and return the JSON-RPC response"""
+    if tool_name == "store_memory":
+        message = arguments.get("message")
         
-        # Check if this is an MCP protocol request
-        if "jsonrpc" in body:
-            # Handle MCP protocol
-            method = body.get("method")
-            params = body.get("params", {})
-            request_id = body.get("id", str(uuid.uuid4()))
+        if message and mem0_client:
+            # Store in Mem0
+            now = datetime.now()
+            metadata = {
+                "category": "mcp_memory",
+                "day": now.strftime("%Y-%m-%d"),
+                "month": now.strftime("%Y-%m"),
+                "year": now.strftime("%Y"),
+                "client": CLIENT,
+                "project_type": PROJECT_TYPE,
+                "device": "elevenlabs_mcp",
+                "timestamp": now.isoformat()
+            }
             
-            # Route MCP methods
-            if method == "initialize":
+            result = await memory.add(
+                messages=[{"role": "user", "content": message}],
+                user_id=tenants.current(),
+                metadata=metadata
+            )
+            
+            # Broadcast to SSE
+            memory_event = {
+                "id": str(uuid.uuid4()),
+                "type": "mcp_memory",
+                "message": message,
+                "user_id": tenants.current(),
+                "timestamp": now.isoformat(),
+                "stored": True
+            }
+            await broadcast_memory(memory_event)
+            
+            return {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "result": {
+                    "content": [{
+                        "type": "text",
+                        "text": f"Memory stored: {result.get('id', 'success')}"
+                    }]
+                }
+            }
+        
+        return {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "error": {
+                "code": -32602,
+                "message": "Invalid params"
+            }
+        }
+    
+    elif tool_name == "search_memory":
+        query = arguments.get("query")
+        limit = arguments.get("limit", 5)
+        
+        if query and mem0_client:
+            try:
+                scopes = scope_filters(arguments.get("scopes"), arguments.get("run_id"))
+            except ValueError as e:
                 return {
                     "jsonrpc": "2.0",
                     "id": request_id,
-                    "result": {
-                        "protocolVersion": "0.1.0",
-                        "capabilities": {
-                            "tools": {"listChanged": True}
-                        },
-                        "serverInfo": {
-                            "name": "mem0-mcp",
-                            "version": "1.0.0"
-                        }
+                    "error": {
+                        "code": -32602,
+                        "message": str(e)
                     }
                 }
             
-            elif method == "tools/list":
+            try:
+                results = await hybrid_search(query, min(limit, 20), scopes)
+                
+                with tracer.span("format", results=len(results)):
+                    if results:
+                        # Label each memory with its scope once several are merged
+                        memories_text = "\n".join([
+                            f"• [{result['scope']}] {result['memory']}" if "scope" in result
+                            else f"• {result['memory']}"
+                            for result in results[:limit]
+                        ])
+                        response_text = f"Found {len(results)} memories:\n{memories_text}"
+                    else:
+                        response_text = "No memories found matching your query."
+                
                 return {
                     "jsonrpc": "2.0",
                     "id": request_id,
                     "result": {
-                        "tools": [
-                            {
-                                "name": "store_memory",
-                                "description": "Store conversation memories",
-                                "inputSchema": {
-                                    "type": "object",
-                                    "properties": {
-                                        "message": {
-                                            "type": "string",
-                                            "description": "Memory to store"
-                                        }
-                                    },
-                                    "required": ["message"]
-                                }
-                            },
-                            {
-                                "name": "search_memory",
-                                "description": "Search through stored memories",
-                                "inputSchema": {
-                                    "type": "object",
-                                    "properties": {
-                                        "query": {
-                                            "type": "string",
-                                            "description": "Search query to find relevant memories"
-                                        },
-                                        "limit": {
-                                            "type": "integer",
-                                            "description": "Maximum number of results to return (default: 5)",
-                                            "minimum": 1,
-                                            "maximum": 20
-                                        }
-                                    },
-                                    "required": ["query"]
-                                }
-                            },
-                            {
-                                "name": "get_all_memories",
-                                "description": "Retrieve all memories for the user",
-                                "inputSchema": {
-                                    "type": "object",
-                                    "properties": {
-                                        "limit": {
-                                            "type": "integer",
-                                            "description": "Maximum number of memories to return (default: 10)",
-                                            "minimum": 1,
-                                            "maximum": 50
-                                        }
-                                    }
-                                }
-                            },
-                            {
-                                "name": "delete_memory",
-                                "description": "Delete a specific memory by ID",
-                                "inputSchema": {
-                                    "type": "object",
-                                    "properties": {
-                                        "memory_id": {
-                                            "type": "string",
-                                            "description": "ID of the memory to delete"
-                                        }
-                                    },
-                                    "required": ["memory_id"]
-                                }
-                            }
-                        ]
+                        "content": [{
+                            "type": "text",
+                            "text": response_text
+                        }]
                     }
                 }
-            
-            elif method == "tools/call":
-                tool_name = params.get("name")
-                arguments = params.get("arguments", {})
-                
-                if tool_name == "store_memory":
-                    message = arguments.get("message")
-                    
-                    if message and mem0_client:
-                        # Store in Mem0
-                        now = datetime.now()
-                        metadata = {
-                            "category": "mcp_memory",
-                            "day": now.strftime("%Y-%m-%d"),
-                            "month": now.strftime("%Y-%m"),
-                            "year": now.strftime("%Y"),
-                            "client": CLIENT,
-                            "project_type": PROJECT_TYPE,
-                            "device": "elevenlabs_mcp",
-                            "timestamp": now.isoformat()
-                        }
-                        
-                        result = mem0_client.add(
-                            messages=[{"role": "user", "content": message}],
-                            user_id=USER_ID,
-                            metadata=metadata
-                        )
-                        
-                        # Broadcast to SSE
-                        memory_event = {
-                            "id": str(uuid.uuid4()),
-                            "type": "mcp_memory",
-                            "message": message,
-                            "user_id": USER_ID,
-                            "timestamp": now.isoformat(),
-                            "stored": True
-                        }
-                        await broadcast_memory(memory_event)
-                        
-                        return {
-                            "jsonrpc": "2.0",
-                            "id": request_id,
-                            "result": {
-                                "content": [{
-                                    "type": "text",
-                                    "text": f"Memory stored: {result.get('id', 'success')}"
-                                }]
-                            }
-                        }
-                    
-                    return {
-                        "jsonrpc": "2.0",
-                        "id": request_id,
-                        "error": {
-                            "code": -32602,
-                            "message": "Invalid params"
-                        }
+            except Exception as e:
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {
+                        "code": -32603,
+                        "message": f"Search error: {str(e)}"
                     }
+                }
+        
+        return {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "error": {
+                "code": -32602,
+                "message": "Query parameter is required"
+            }
+        }
+    
+    elif tool_name == "get_all_memories":
+        limit = max(1, min(arguments.get("limit", 10), 50))
+        cursor = arguments.get("cursor")
+        
+        if mem0_client:
+            try:
+                # One page from the local index, newest first; date/category use its bucket indexes
+                results, next_cursor, total = await memory_index.page(
+                    tenants.current(), cursor, limit,
+                    category=arguments.get("category"),
+                    date_from=arguments.get("date_from"),
+                    date_to=arguments.get("date_to")
+                )
                 
-                elif tool_name == "search_memory":
-                    query = arguments.get("query")
-                    limit = arguments.get("limit", 5)
-                    
-                    if query and mem0_client:
-                        try:
-                            results = mem0_client.search(
-                                query=query,
-                                user_id=USER_ID,
-                                limit=min(limit, 20)
-                            )
-                            
-                            if results:
-                                memories_text = "\n".join([
-                                    f"• {result['memory']}" for result in results[:limit]
-                                ])
-                                response_text = f"Found {len(results)} memories:\n{memories_text}"
-                            else:
-                                response_text = "No memories found matching your query."
-                            
-                            return {
-                                "jsonrpc": "2.0",
-                                "id": request_id,
-                                "result": {
-                                    "content": [{
-                                        "type": "text",
-                                        "text": response_text
-                                    }]
-                                }
-                            }
-                        except Exception as e:
-                            return {
-                                "jsonrpc": "2.0",
-                                "id": request_id,
-                                "error": {
-                                    "code": -32603,
-                                    "message": f"Search error: {str(e)}"
-                                }
-                            }
-                    
-                    return {
-                        "jsonrpc": "2.0",
-                        "id": request_id,
-                        "error": {
-                            "code": -32602,
-                            "message": "Query parameter is required"
-                        }
-                    }
+                with tracer.span("format", results=len(results)):
+                    if results:
+                        memories_text = "\n".join([
+                            f"• [{result.get('id', 'unknown')}] {result['memory']}" 
+                            for result in results
+                        ])
+                        response_text = f"Retrieved {len(results)} of {total} memories:\n{memories_text}"
+                        if next_cursor:
+                            response_text += f"\n\nMore memories available; pass cursor: {next_cursor}"
+                    else:
+                        response_text = "No memories found."
                 
-                elif tool_name == "get_all_memories":
-                    limit = arguments.get("limit", 10)
-                    
-                    if mem0_client:
-                        try:
-                            # Get all memories for the user
-                            results = mem0_client.get_all(
-                                user_id=USER_ID
-                            )
-                            
-                            # Limit the results
-                            results = results[:min(limit, 50)]
-                            
-                            if results:
-                                memories_text = "\n".join([
-                                    f"• [{result.get('id', 'unknown')}] {result['memory']}" 
-                                    for result in results[:limit]
-                                ])
-                                response_text = f"Retrieved {len(results)} memories:\n{memories_text}"
-                            else:
-                                response_text = "No memories found."
-                            
-                            return {
-                                "jsonrpc": "2.0",
-                                "id": request_id,
-                                "result": {
-                                    "content": [{
-                                        "type": "text",
-                                        "text": response_text
-                                    }]
-                                }
-                            }
-                        except Exception as e:
-                            return {
-                                "jsonrpc": "2.0",
-                                "id": request_id,
-                                "error": {
-                                    "code": -32603,
-                                    "message": f"Retrieval error: {str(e)}"
-                                }
-                            }
-                    
-                    return {
-                        "jsonrpc": "2.0",
-                        "id": request_id,
-                        "error": {
-                            "code": -32603,
-                            "message": "Memory client not configured"
-                        }
+                result = {
+                    "content": [{
+                        "type": "text",
+                        "text": response_text
+                    }]
+                }
+                if next_cursor:
+                    result["nextCursor"] = next_cursor
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "result": result
+                }
+            except (InvalidCursor, InvalidDate) as e:
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {
+                        "code": -32602,
+                        "message": str(e)
                     }
-                
-                elif tool_name == "delete_memory":
-                    memory_id = arguments.get("memory_id")
-                    
-                    if memory_id and mem0_client:
-                        try:
-                            result = mem0_client.delete(memory_id=memory_id)
-                            
-                            return {
-                                "jsonrpc": "2.0",
-                                "id": request_id,
-                                "result": {
-                                    "content": [{
-                                        "type": "text",
-                                        "text": f"Memory {memory_id} deleted successfully"
-                                    }]
-                                }
-                            }
-                        except Exception as e:
-                            return {
-                                "jsonrpc": "2.0",
-                                "id": request_id,
-                                "error": {
-                                    "code": -32603,
-                                    "message": f"Delete error: {str(e)}"
-                                }
-                            }
-                    
+                }
+            except Exception as e:
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {
+                        "code": -32603,
+                        "message": f"Retrieval error: {str(e)}"
+                    }
+                }
+        
+        return {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "error": {
+                "code": -32603,
+                "message": "Memory client not configured"
+            }
+        }
+    
+    elif tool_name == "delete_memory":
+        memory_id = arguments.get("memory_id")
+        
+        if memory_id and mem0_client:
+            try:
+                # Only the current tenant's own memories can be deleted by id
+                tenant = tenants.current()
+                try:
+                    record = await memory.get(memory_id=memory_id, tenant=tenant)
+                except Exception as e:
+                    if error_status(e) != 404:
+                        raise
+                    record = None
+                if not record or record.get("user_id") != tenant:
                     return {
                         "jsonrpc": "2.0",
                         "id": request_id,
                         "error": {
                             "code": -32602,
-                            "message": "Memory ID parameter is required"
+                            "message": f"Memory not found: {memory_id}"
                         }
                     }
                 
+                result = await memory.delete(memory_id=memory_id, tenant=tenant)
+                
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "result": {
+                        "content": [{
+                            "type": "text",
+                            "text": f"Memory {memory_id} deleted successfully"
+                        }]
+                    }
+                }
+            except Exception as e:
                 return {
                     "jsonrpc": "2.0",
                     "id": request_id,
                     "error": {
-                        "code": -32601,
-                        "message": f"Unknown tool: {tool_name}"
+                        "code": -32603,
+                        "message": f"Delete error: {str(e)}"
                     }
                 }
+        
+        return {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "error": {
+                "code": -32602,
+                "message": "Memory ID parameter is required"
+            }
+        }
+    
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "error": {
+            "code": -32601,
+            "message": f"Unknown tool: {tool_name}"
+        }
+    }
+
+@app.post("/mcp")
+async def mcp_endpoint(request: Request):
+    """MCP Protocol endpoint for ElevenLabs"""
+    try:
+        with tracer.span("json.parse"):
+            body = await request_json(request)
+        
+        # Check if this is an MCP protocol request
+        if "jsonrpc" in body:
+            # Handle MCP protocol
+            method = body.get("method")
+            params = body.get("params", {})
+            request_id = body.get("id", str(uuid.uuid4()))
+            
+            # Route MCP methods
+            if method == "initialize":
+                return FastJSONResponse(jsonrpc_raw(request_id, MCP_INITIALIZE_RESULT))
+            
+            elif method == "tools/list":
+                return FastJSONResponse(jsonrpc_raw(request_id, MCP_TOOLS_LIST_RESULT))
+            
+            elif method == "tools/call":
+                tool_name = params.get("name")
+                arguments = params.get("arguments", {})
+                started = time.perf_counter()
+                try:
+                    with tracer.span("dispatch", tool=tool_name):
+                        response = await call_mcp_tool(tool_name, arguments, request_id)
+                except Exception:
+                    observe_tool("mcp", tool_name, started, "exception")
+                    raise
+                observe_tool("mcp", tool_name, started, jsonrpc_code(response))
+                return FastJSONResponse(response)
             
             else:
                 return {
@@ -967,13 +897,13 @@ async def mcp_v1_handler(request: Request):
         pass
     
     try:
-        body = await request.json()
+        body = await request_json(request)
         request_id = body.get("id", str(uuid.uuid4()))
         method = body.get("method")
         params = body.get("params", {})
         
         if method == "initialize":
-            return JSONResponse({
+            return FastJSONResponse({
                 "jsonrpc": "2.0",
                 "id": request_id,
                 "result": {
@@ -989,7 +919,7 @@ async def mcp_v1_handler(request: Request):
             })
         
         elif method == "tools/list":
-            return JSONResponse({
+            return FastJSONResponse({
                 "jsonrpc": "2.0",
                 "id": request_id,
                 "result": {
@@ -1027,13 +957,13 @@ async def mcp_v1_handler(request: Request):
                         "source": "mcp_v1"
                     }
                     
-                    result = mem0_client.add(
+                    result = await memory.add(
                         messages=[{"role": "user", "content": content}],
-                        user_id=USER_ID,
+                        user_id=tenants.current(),
                         metadata=metadata
                     )
                     
-                    return JSONResponse({
+                    return FastJSONResponse({
                         "jsonrpc": "2.0",
                         "id": request_id,
                         "result": {
@@ -1046,7 +976,7 @@ async def mcp_v1_handler(request: Request):
                         }
                     })
                 
-                return JSONResponse({
+                return FastJSONResponse({
                     "jsonrpc": "2.0",
                     "id": request_id,
                     "error": {
@@ -1055,7 +985,7 @@ async def mcp_v1_handler(request: Request):
                     }
                 })
             
-            return JSONResponse({
+            return FastJSONResponse({
                 "jsonrpc": "2.0",
                 "id": request_id,
                 "error": {
@@ -1065,7 +995,7 @@ async def mcp_v1_handler(request: Request):
             })
         
         else:
-            return JSONResponse({
+            return FastJSONResponse({
                 "jsonrpc": "2.0",
                 "id": request_id,
                 "error": {
@@ -1075,7 +1005,7 @@ async def mcp_v1_handler(request: Request):
             })
     
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "jsonrpc": "2.0",
             "id": body.get("id") if "body" in locals() else None,
             "error": {
@@ -1088,7 +1018,7 @@ async def mcp_v1_handler(request: Request):
 async def mcp_v1_sse(request: Request):
     """SSE endpoint for MCP v1"""
     async def event_stream():
-        yield f"event: open\ndata: {json.dumps({'type': 'open'})}\n\n"
+        yield sse_frame({'type': 'open'}, event="open")
         while True:
             if await request.is_disconnected():
                 break
@@ -1108,18 +1038,21 @@ async def mcp_v1_sse(request: Request):
 # ========== ELEVENLABS INTEGRATION ==========
 
 @app.get("/elevenlabs/config")
-async def get_elevenlabs_config():
+async def get_elevenlabs_config(request: Request):
     """Get ElevenLabs configuration"""
-    return {
-        "server_id": ELEVENLABS_SERVER_ID,
-        "api_key_configured": bool(ELEVENLABS_API_KEY),
-        "integration_status": "ready" if ELEVENLABS_API_KEY else "api_key_missing"
-    }
+    return ELEVENLABS_CONFIG.response(request, "elevenlabs_config")
+
+# Built from env vars, so it only changes on restart
+ELEVENLABS_CONFIG = json_asset({
+    "server_id": ELEVENLABS_SERVER_ID,
+    "api_key_configured": bool(ELEVENLABS_API_KEY),
+    "integration_status": "ready" if ELEVENLABS_API_KEY else "api_key_missing"
+})
 
 @app.post("/elevenlabs/webhook")
 async def elevenlabs_webhook(request: Request):
     """Webhook endpoint for ElevenLabs voice agent"""
-    data = await request.json()
+    data = await request_json(request)
     
     # Extract message from ElevenLabs
     message = data.get("text", data.get("message", ""))
@@ -1143,9 +1076,9 @@ async def elevenlabs_webhook(request: Request):
             "timestamp": now.isoformat()
         }
         
-        result = mem0_client.add(
+        result = await memory.add(
             messages=[{"role": "user", "content": message}],
-            user_id=USER_ID,
+            user_id=tenants.current(),
             metadata=metadata
         )
         
@@ -1155,7 +1088,7 @@ async def elevenlabs_webhook(request: Request):
             "type": "elevenlabs_memory",
             "message": message,
             "agent_id": agent_id,
-            "user_id": USER_ID,
+            "user_id": tenants.current(),
             "timestamp": now.isoformat(),
             "mem0_result": result,
             "stored": True
@@ -1176,7 +1109,7 @@ async def elevenlabs_webhook(request: Request):
 @app.post("/api/memory/add")
 async def add_memory(request: Request):
     """Add a memory via API (now also broadcasts to SSE)"""
-    data = await request.json()
+    data = await request_json(request)
     message = data.get("message")
     
     if not message:
@@ -1199,9 +1132,10 @@ async def add_memory(request: Request):
     }
     
     try:
-        result = mem0_client.add(
+        result = await memory.add(
+            workload=BULK,
             messages=[{"role": "user", "content": message}],
-            user_id=USER_ID,
+            user_id=tenants.current(),
             metadata=metadata
         )
         
@@ -1209,7 +1143,7 @@ async def add_memory(request: Request):
         memory_event = {
             "type": "memory_added",
             "message": message,
-            "user_id": USER_ID,
+            "user_id": tenants.current(),
             "result": result,
             "timestamp": now.isoformat()
         }
@@ -1221,8 +1155,8 @@ async def add_memory(request: Request):
 
 @app.post("/api/memory/search")
 async def search_memory(request: Request):
-    """Search memories via API"""
-    data = await request.json()
+    """Search memories via API; {"scopes": ["user", "agent", "run"], "run_id": ...} widens the search"""
+    data = await request_json(request)
     query = data.get("query")
     
     if not query:
@@ -1232,11 +1166,16 @@ async def search_memory(request: Request):
         raise HTTPException(status_code=500, detail="Memory system not configured")
     
     try:
-        results = mem0_client.search(
-            query=query,
-            user_id=USER_ID,
-            limit=5
-        )
+        scopes = scope_filters(data.get("scopes"), data.get("run_id"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        # Plain Mem0 results (with scores) unless several scopes are merged
+        if len(scopes) == 1:
+            results = result_list(await memory.search(query=query, limit=5, **next(iter(scopes.values()))))
+        else:
+            results = await hybrid_search(query, 5, scopes)
         
         # Broadcast search event to SSE
         search_event = {
@@ -1247,10 +1186,149 @@ async def search_memory(request: Request):
         }
         await broadcast_memory(search_event)
         
-        return {"success": True, "results": results}
+        return FastJSONResponse({"success": True, "results": results})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/memory/list")
+async def list_memories(cursor: str = None, limit: int = 20, category: str = None,
+                        date_from: str = None, date_to: str = None):
+    """
+    Page through the user's memories, newest first; pass next_cursor back for
+    the next page. category and date_from/date_to (YYYY[-MM[-DD]], today,
+    yesterday) narrow the listing; total counts the matches.
+    """
+    if not mem0_client:
+        raise HTTPException(status_code=500, detail="Memory system not configured")
+    
+    try:
+        results, next_cursor, total = await memory_index.page(
+            tenants.current(), cursor, max(1, min(limit, 200)), category, date_from, date_to
+        )
+    except (InvalidCursor, InvalidDate) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse({"memories": results, "next_cursor": next_cursor, "total": total})
+
+@app.get("/api/memory/export")
+async def export_memories(cursor: str = None, gzip: bool = False, page_size: int = 500):
+    """
+    Stream the user's memories as NDJSON, newest first, paging Mem0 page_size
+    records at a time. Each line is {"type": "memory", "cursor": ..., "data":
+    {...}}; an interrupted export resumes by passing the last cursor
+    received. The stream ends with an {"type": "end"} line. gzip=true
+    compresses the stream on the fly.
+    """
+    if not mem0_client:
+        raise HTTPException(status_code=500, detail="Memory system not configured")
+    if cursor:
+        try:
+            decode_offset(cursor)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    page_size = max(1, min(page_size, 5000))
+    tenant = tenants.current()
+
+    async def lines() -> AsyncGenerator[bytes, None]:
+        count = 0
+        batch = []
+        async for record, record_cursor in memory_index.iter_pages(tenant, cursor, page_size):
+            batch.append(dumps_bytes({"type": "memory", "cursor": record_cursor, "data": record}))
+            count += 1
+            if len(batch) >= page_size:
+                yield b"\n".join(batch) + b"\n"
+                batch = []
+        batch.append(dumps_bytes({"type": "end", "count": count, "resumed_from": cursor}))
+        yield b"\n".join(batch) + b"\n"
+
+    async def gzipped() -> AsyncGenerator[bytes, None]:
+        # wbits=31: gzip container; sync flush per chunk so the client sees progress
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        async for chunk in lines():
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+
+    headers = {"Content-Disposition": 'attachment; filename="memories.ndjson"', "Cache-Control": "no-store"}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(gzipped() if gzip else lines(), media_type="application/x-ndjson", headers=headers)
+
+# Bulk NDJSON import (IMPORT_CONCURRENCY / IMPORT_BATCH_SIZE / IMPORT_CHECKPOINT_DIR)
+importer = importer_from_env(memory, broadcast_memory)
+
+@app.post("/api/memory/import")
+async def import_memories(request: Request, job_id: str = None):
+    """
+    Import a streamed NDJSON body (Content-Encoding: gzip accepted). Progress
+    is published on /sse; re-send the same file with ?job_id= to resume.
+    """
+    if not mem0_client:
+        raise HTTPException(status_code=500, detail="Memory system not configured")
+    
+    try:
+        job = importer.start(tenants.current(), job_id)
+    except ImportRejected as e:
+        raise HTTPException(status_code=409 if isinstance(e, ImportRunning) else 400, detail=str(e))
+    
+    gzipped = request.headers.get("content-encoding", "").lower() == "gzip"
+    try:
+        return FastJSONResponse(await importer.run(job, request.stream(), gzipped))
+    except (ImportRejected, zlib.error) as e:
+        return FastJSONResponse({**job.snapshot(), "error": str(e)}, status_code=400)
+
+@app.get("/api/memory/import/{job_id}")
+async def import_status(job_id: str):
+    """Progress or final result of an import, including its resume checkpoint"""
+    if not importer:
+        raise HTTPException(status_code=500, detail="Memory system not configured")
+    job = importer.job(job_id)
+    if job is None or job.get("user_id") != tenants.current():
+        raise HTTPException(status_code=404, detail=f"Unknown import {job_id}")
+    return job
+
+# Filter-based bulk delete and scheduled retention (RETENTION_POLICIES / RETENTION_RATE)
+retention = retention_from_env(memory, memory_index, broadcast_memory)
+
+@app.on_event("startup")
+async def start_retention():
+    """Begin the periodic retention sweep over every tenant the resolver can serve"""
+    if retention:
+        retention.start_scheduler(tenants.known)
+
+@app.post("/api/memory/bulk-delete")
+async def bulk_delete_memories(request: Request):
+    """
+    Delete every memory matching {"filter": {...}} in the background, e.g.
+    {"filter": {"category": "sse_stream", "older_than_days": 30}}. Filter
+    fields: category, day, month, year, device, client, older_than_days,
+    before. dry_run=true only counts matches and returns a sample. Needs
+    X-Admin-Token, and is disabled until ADMIN_TOKEN is set.
+    """
+    require_admin(request, strict=True)
+    if not mem0_client:
+        raise HTTPException(status_code=500, detail="Memory system not configured")
+    
+    try:
+        data = await request_json(request)
+        flt = parse_filter(data.get("filter") if isinstance(data, dict) else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    job = retention.start(tenants.current(), flt, dry_run=bool(data.get("dry_run")))
+    if job.dry_run:
+        await job.task
+        return FastJSONResponse(job.snapshot())
+    return FastJSONResponse(job.snapshot(), status_code=202)
+
+@app.get("/api/memory/bulk-delete/{job_id}")
+async def bulk_delete_status(job_id: str):
+    """Progress or final counts of a bulk delete job"""
+    if not retention:
+        raise HTTPException(status_code=500, detail="Memory system not configured")
+    job = retention.job(job_id)
+    if job is None or job["user_id"] != tenants.current():
+        raise HTTPException(status_code=404, detail=f"Unknown bulk delete {job_id}")
+    return job
+
 @app.get("/api/test-memory")
 async def test_memory():
     """Test memory system functionality"""
@@ -1259,16 +1337,29 @@ async def test_memory():
     
     try:
         # Add a test memory
-        test_message = f"Test from CombinedMemory web interface at {datetime.now()}"
-        add_result = mem0_client.add(
+        now = datetime.now()
+        test_message = f"Test from CombinedMemory web interface at {now}"
+        add_result = await memory.add(
+            workload=ADMIN,
             messages=[{"role": "user", "content": test_message}],
-            user_id=USER_ID
+            user_id=tenants.current(),
+            # Tagged so a retention policy ("test=7") can expire them
+            metadata={
+                "category": "test",
+                "day": now.strftime("%Y-%m-%d"),
+                "month": now.strftime("%Y-%m"),
+                "year": now.strftime("%Y"),
+                "client": CLIENT,
+                "device": DEVICE,
+                "timestamp": now.isoformat()
+            }
         )
         
         # Search for recent memories
-        search_results = mem0_client.search(
+        search_results = await memory.search(
+            workload=ADMIN,
             query="CombinedMemory",
-            user_id=USER_ID,
+            user_id=tenants.current(),
             limit=3
         )
         
@@ -1296,16 +1387,17 @@ async def get_stats():
     
     try:
         # Get recent memories count
-        results = mem0_client.search(
+        results = await memory.search(
+            workload=ADMIN,
             query="conversation",
-            user_id=USER_ID,
+            user_id=tenants.current(),
             limit=10
         )
         
         return {
             "memory_count": len(results),
             "recent_activity": "Active" if results else "No recent activity",
-            "user_id": USER_ID,
+            "user_id": tenants.current(),
             "client": CLIENT,
             "agent_id": AGENT_ID,
             "sse_connections": len(active_connections)
@@ -1313,12 +1405,115 @@ async def get_stats():
     except Exception as e:
         return {"error": str(e)}
 
+# ========== ADMIN ENDPOINTS ==========
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus text exposition of request, tool, Mem0, SSE and cache metrics"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/admin/resilience")
+async def resilience_stats(request: Request):
+    """Concurrency limiter, circuit breaker and hedging stats for the Mem0 client"""
+    # Both list tenant ids, so they are never open on a multi-tenant deployment
+    require_admin(request, strict=tenants.multi_tenant)
+    if not memory:
+        return {"error": "Memory system not configured"}
+    return {**memory.stats(), "index": memory_index.snapshot()}
+
+@app.get("/admin/tenants")
+async def tenant_stats(request: Request):
+    """Tenant resolution settings, per-tenant index shards and per-pool tenant fairness"""
+    # Both list tenant ids, so they are never open on a multi-tenant deployment
+    require_admin(request, strict=tenants.multi_tenant)
+    return {
+        "resolver": tenants.snapshot(),
+        "index": memory_index.snapshot() if memory_index else None,
+        "pools": memory.scheduler.snapshot() if memory else None,
+    }
+
+@app.get("/admin/retention")
+async def retention_stats(request: Request):
+    """Retention policies, sweep history and recent bulk delete jobs"""
+    require_admin(request)
+    if not retention:
+        return {"error": "Memory system not configured"}
+    return retention.snapshot()
+
+@app.post("/admin/retention/run")
+async def run_retention(request: Request):
+    """Run every retention policy now instead of waiting for the next sweep"""
+    require_admin(request)
+    if not retention:
+        return {"error": "Memory system not configured"}
+    jobs = await retention.sweep(tenants.known())
+    return {"jobs": [job.snapshot() for job in jobs]}
+
+@app.get("/admin/tracing")
+async def tracing_stats(request: Request):
+    """Span exporter configuration and export counters"""
+    require_admin(request)
+    return tracer.snapshot()
+
+@app.get("/admin/profile")
+async def run_profile(request: Request, seconds: float = 10, hz: int = 100, format: str = "collapsed"):
+    """Sample every thread's stack for N seconds; collapsed-stack output for flamegraphs"""
+    require_admin(request, strict=True)
+    try:
+        seconds, hz = profiler.reserve(seconds, hz)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ProfilerBusy as e:
+        return FastJSONResponse(
+            status_code=429,
+            content={"error": str(e), "profiler": profiler.snapshot()},
+            headers={"Retry-After": str(int(e.retry_after) + 1)}
+        )
+    
+    # Sampling runs in a worker thread so the event loop keeps serving
+    result = await asyncio.to_thread(profiler.run, seconds, hz)
+    if format == "json":
+        result["stacks"] = dict(result["stacks"].most_common())
+        return result
+    return PlainTextResponse(
+        collapsed(result["stacks"]),
+        headers={
+            "X-Profile-Seconds": str(result["seconds"]),
+            "X-Profile-Samples": str(result["samples"]),
+        }
+    )
+
+@app.get("/admin/loop")
+async def loop_stats(request: Request, limit: int = 10):
+    """Event-loop lag histogram and the call sites that blocked the loop the longest"""
+    require_admin(request)
+    return loop_monitor.snapshot(limit)
+
+@app.get("/admin/admission")
+async def admission_stats(request: Request):
+    """Load-shedding signals and admitted/shed counts per request class"""
+    require_admin(request)
+    return admission.snapshot()
+
 # Webhook endpoint for ElevenLabs tools
 @app.post("/webhook/elevenlabs/tools/{tool_name}")
 async def handle_tool_call(tool_name: str, request: Request):
     """Handle tool calls from ElevenLabs agent"""
-    data = await request.json()
-    
+    data = await request_json(request)
+    started = time.perf_counter()
+    try:
+        tenant = tenants.override((data.get("parameters") or {}).get("user_id"))
+    except UnknownTenant as e:
+        response = {"error": str(e)}
+        observe_tool("webhook", tool_name, started, "error")
+        return FastJSONResponse(response, status_code=403)
+    with tracer.span("dispatch", tool=tool_name), tenants.scope(tenant):
+        response = await run_webhook_tool(tool_name, data)
+    observe_tool("webhook", tool_name, started, "error" if "error" in response else "ok")
+    return FastJSONResponse(response)
+
+async def run_webhook_tool(tool_name: str, data: dict) -> dict:
+    """Execute one ElevenLabs webhook tool and return its response body"""
     if not mem0_client:
         return {"error": "Memory system not configured"}
     
@@ -1326,9 +1521,9 @@ async def handle_tool_call(tool_name: str, request: Request):
         if tool_name == "addMemories":
             message = data.get("parameters", {}).get("message")
             if message:
-                result = mem0_client.add(
+                result = await memory.add(
                     messages=[{"role": "user", "content": message}],
-                    user_id=USER_ID
+                    user_id=tenants.current()
                 )
                 
                 # Broadcast to SSE
@@ -1345,20 +1540,16 @@ async def handle_tool_call(tool_name: str, request: Request):
         elif tool_name == "retrieveMemories":
             query = data.get("parameters", {}).get("message")
             if query:
-                results = mem0_client.search(
-                    query=query,
-                    user_id=USER_ID,
-                    limit=5
-                )
+                results = await hybrid_search(query, 5)
                 if results:
                     memories = "\n".join([f"- {r['memory']}" for r in results])
                     return {"success": True, "message": memories}
                 return {"success": True, "message": "No relevant memories found"}
         
         elif tool_name == "getSessionSummary":
-            results = mem0_client.search(
+            results = await memory.search(
                 query="recent topics",
-                user_id=USER_ID,
+                user_id=tenants.current(),
                 limit=3
             )
             if results:
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Allocation and memory-footprint budgets per endpoint
+Drives app.py in-process through its ASGI interface (middleware included)
+with tracemalloc on, against the Mem0 stand-in preloaded with a large
+memory set, and measures for each hot path:
+  - peak traced memory while one call runs
+  - memory still held after the call (leak / unbounded cache growth)
+Exits non-zero when any endpoint exceeds its budget, printing the top
+allocation sites, so memory regressions fail CI like a test would.
+
+    python bench/alloc_budgets.py
+    python bench/alloc_budgets.py --only mcp_get_all_memories --calls 50
+    python bench/alloc_budgets.py --budget mcp_search_memory=400   # peak KB override
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+from harness import REPO_ROOT, STANDIN_ENV, report_header, write_report
+
+PRELOAD = 5000
+SSE_SUBSCRIBERS = 200
+
+# name -> (peak KB per call, retained KB per call)
+BUDGETS_KB = {
+    "root_html": (32, 4),
+    "mcp_initialize": (48, 4),
+    "mcp_tools_list": (64, 4),
+    "mcp_search_memory": (1024, 8),
+    "mcp_get_all_memories": (160, 8),
+    "webhook_retrieveMemories": (1024, 8),
+    "sse_broadcast": (48, 4),
+}
+
+
+def rpc(method: str, params: dict = None) -> bytes:
+    return json.dumps({"jsonrpc": "2.0", "id": "bench", "method": method, "params": params or {}}).encode()
+
+
+def tool(name: str, arguments: dict) -> bytes:
+    return rpc("tools/call", {"name": name, "arguments": arguments})
+
+
+async def asgi_call(app, method: str, path: str, body: bytes = b"") -> tuple:
+    """Run one request through the ASGI app; returns (status, body bytes)"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench"), (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    sent = False
+    status, chunks = None, []
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+
+def scenarios(app_module):
+    app = app_module.app
+
+    # Subscribers are set up once so only the per-event cost is measured
+    queues = [asyncio.Queue() for _ in range(SSE_SUBSCRIBERS)]
+
+    async def sse_broadcast():
+        app_module.active_connections.extend(queues)
+        try:
+            await app_module.broadcast_memory({"type": "sse_memory", "message": "allocation probe",
+                                               "timestamp": "2026-01-01T00:00:00"})
+            for q in queues:
+                q.get_nowait()
+        finally:
+            del app_module.active_connections[-SSE_SUBSCRIBERS:]
+        return 200, b""
+
+    return {
+        "root_html": lambda: asgi_call(app, "GET", "/"),
+        "mcp_initialize": lambda: asgi_call(app, "POST", "/mcp", rpc("initialize")),
+        "mcp_tools_list": lambda: asgi_call(app, "POST", "/mcp", rpc("tools/list")),
+        "mcp_search_memory": lambda: asgi_call(app, "POST", "/mcp",
+                                               tool("search_memory", {"query": "coffee budget", "limit": 20})),
+        "mcp_get_all_memories": lambda: asgi_call(app, "POST", "/mcp",
+                                                  tool("get_all_memories", {"limit": 50})),
+        "webhook_retrieveMemories": lambda: asgi_call(app, "POST", "/webhook/elevenlabs/tools/retrieveMemories",
+                                                      json.dumps({"parameters": {"message": "coffee"}}).encode()),
+        "sse_broadcast": sse_broadcast,
+    }
+
+
+async def measure(call, calls: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        status, _ = await call()
+        if status != 200:
+            raise RuntimeError(f"warmup call returned {status}")
+
+    gc.collect()
+    before_all = tracemalloc.get_traced_memory()[0]
+    snapshot_before = tracemalloc.take_snapshot()
+    peaks = []
+    for _ in range(calls):
+        # Let the loop drop finished to_thread futures so the previous result is really gone
+        await asyncio.sleep(0)
+        gc.collect()
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        await call()
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before_all
+    peaks.sort()
+    return {
+        "peak_kb": round(peaks[len(peaks) // 2] / 1024, 1),
+        "peak_kb_max": round(peaks[-1] / 1024, 1),
+        "retained_kb_per_call": round(max(0, retained) / calls / 1024, 2),
+        "snapshot_before": snapshot_before,
+    }
+
+
+def top_sites(snapshot_before, limit: int = 8) -> list:
+    diff = tracemalloc.take_snapshot().compare_to(snapshot_before, "lineno")
+    return [str(stat) for stat in diff[:limit]]
+
+
+async def run(names, args) -> dict:
+    os.environ.update({**STANDIN_ENV, "MEM0_STANDIN_LATENCY_MS": "0", "MEM0_STANDIN_PRELOAD": str(PRELOAD),
+                       "LOOP_MONITOR": "0", "TRACE_SAMPLE_RATE": "0"})
+    sys.path.insert(0, str(REPO_ROOT))
+    import app as app_module
+
+    tracemalloc.start(args.frames)
+    available = scenarios(app_module)
+    results = {}
+    for name in names:
+        stats = await measure(available[name], args.calls, args.warmup)
+        snapshot_before = stats.pop("snapshot_before")
+        peak_budget, retained_budget = BUDGETS_KB[name]
+        peak_budget = args.budget.get(name, peak_budget)
+        stats.update(peak_budget_kb=peak_budget, retained_budget_kb=retained_budget)
+        stats["ok"] = stats["peak_kb"] <= peak_budget and stats["retained_kb_per_call"] <= retained_budget
+        if not stats["ok"]:
+            stats["top_sites"] = top_sites(snapshot_before)
+        results[name] = stats
+        marker = "✅" if stats["ok"] else "❌"
+        print(f"{marker} {name:26s} peak {stats['peak_kb']:>9.1f}KB (budget {peak_budget}KB)  "
+              f"retained {stats['retained_kb_per_call']:>6.2f}KB/call (budget {retained_budget}KB)")
+        for site in stats.get("top_sites", []):
+            print(f"      {site}")
+    tracemalloc.stop()
+    return results
+
+
+def parse_budgets(value: str) -> dict:
+    budgets = {}
+    for item in filter(None, value.split(",")):
+        name, _, kb = item.partition("=")
+        budgets[name.strip()] = float(kb)
+    return budgets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default=",".join(BUDGETS_KB), help="Comma-separated endpoint names")
+    parser.add_argument("--calls", type=int, default=20, help="Measured calls per endpoint")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--frames", type=int, default=1, help="Traceback depth kept by tracemalloc")
+    parser.add_argument("--budget", type=parse_budgets, default={}, help="Peak KB overrides, e.g. root_html=64")
+    parser.add_argument("--out", default="bench/results/alloc_budgets.json")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.only.split(",") if n.strip()]
+    unknown = [n for n in names if n not in BUDGETS_KB]
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(unknown)}")
+
+    results = asyncio.run(run(names, args))
+    report = report_header("alloc_budgets", {k: v for k, v in vars(args).items() if k != "out"})
+    report["results"] = results
+    write_report(args.out, report)
+
+    failed = [name for name, stats in results.items() if not stats["ok"]]
+    if failed:
+        print(f"❌ Over budget: {', '.join(failed)}")
+        sys.exit(1)
+    print("✅ All endpoints within allocation budgets")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+End-to-end conversation replay harness
+Replays scripted multi-turn voice conversations as the sequence of tool calls
+the ElevenLabs agent makes (webhook addMemories / retrieveMemories /
+getSessionSummary and MCP store_memory / search_memory), with many sessions
+running concurrently against app.py and the offline Mem0 stand-in.
+
+Reports per-tool and per-turn latency against budgets, plus the recall hit
+rate (a retrieval turn "hits" when the fact stored earlier in the same
+session comes back). Exits non-zero when the SLO is missed.
+
+    python bench/conversation_replay.py --sessions 50 --conversations 500
+    python bench/conversation_replay.py --script my_conversations.json --slo 0.99
+
+Script format (JSON list of conversations; "{tag}" expands to a per-session
+token so recall can be checked even though all sessions share one user):
+
+    [{"name": "pets", "turns": [
+        {"tool": "addMemories", "text": "My dog is called {tag}", "think_ms": 1500},
+        {"tool": "retrieveMemories", "text": "what is my dog called", "expect": "{tag}"}]}]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+
+import httpx
+
+from harness import percentile, report_header, running_server, summarize, write_report
+
+WEBHOOK_TOOLS = ("addMemories", "retrieveMemories", "getSessionSummary")
+MCP_TOOLS = ("store_memory", "search_memory")
+
+# Per-turn latency budgets in ms (what the voice agent can absorb without an audible gap)
+DEFAULT_BUDGETS_MS = {
+    "addMemories": 400,
+    "retrieveMemories": 300,
+    "getSessionSummary": 300,
+    "store_memory": 400,
+    "search_memory": 300,
+}
+
+CONVERSATIONS = [
+    {"name": "pets", "turns": [
+        {"tool": "getSessionSummary", "think_ms": 500},
+        {"tool": "addMemories", "text": "My dog is called {tag} and loves the beach", "think_ms": 2500},
+        {"tool": "retrieveMemories", "text": "what is my dog called {tag}", "expect": "{tag}", "think_ms": 3000},
+    ]},
+    {"name": "scheduling", "turns": [
+        {"tool": "getSessionSummary", "think_ms": 500},
+        {"tool": "store_memory", "text": "Dentist appointment {tag} on Thursday at 3pm", "think_ms": 2000},
+        {"tool": "addMemories", "text": "Need to pick up {tag} prescription after the dentist", "think_ms": 2000},
+        {"tool": "search_memory", "text": "dentist {tag}", "expect": "{tag}", "think_ms": 1500},
+        {"tool": "retrieveMemories", "text": "prescription {tag}", "expect": "{tag}", "think_ms": 1500},
+    ]},
+    {"name": "preferences", "turns": [
+        {"tool": "getSessionSummary", "think_ms": 500},
+        {"tool": "retrieveMemories", "text": "coffee preferences", "think_ms": 2000},
+        {"tool": "addMemories", "text": "I take my coffee with oat milk, code {tag}", "think_ms": 3000},
+        {"tool": "search_memory", "text": "oat milk coffee {tag}", "expect": "{tag}", "think_ms": 2000},
+    ]},
+    {"name": "project", "turns": [
+        {"tool": "getSessionSummary", "think_ms": 500},
+        {"tool": "store_memory", "text": "Project {tag} launch moved to March budget 42000", "think_ms": 2500},
+        {"tool": "search_memory", "text": "project {tag} launch", "expect": "{tag}", "think_ms": 2500},
+        {"tool": "retrieveMemories", "text": "budget {tag}", "expect": "42000", "think_ms": 2000},
+        {"tool": "getSessionSummary", "think_ms": 1000},
+    ]},
+]
+
+
+def tool_request(tool: str, text: str):
+    """(path, body) for one scripted turn"""
+    if tool in WEBHOOK_TOOLS:
+        return f"/webhook/elevenlabs/tools/{tool}", {"parameters": {"message": text}} if text else {}
+    arguments = {"message": text} if tool == "store_memory" else {"query": text, "limit": 5}
+    return "/mcp", {"jsonrpc": "2.0", "id": str(uuid.uuid4()), "method": "tools/call",
+                    "params": {"name": tool, "arguments": arguments}}
+
+
+def response_text(tool: str, response: httpx.Response):
+    """(ok, text) for a webhook or JSON-RPC response"""
+    if response.status_code >= 400:
+        return False, ""
+    body = response.json()
+    if tool in WEBHOOK_TOOLS:
+        return not body.get("error"), body.get("message", "")
+    if body.get("error"):
+        return False, ""
+    return True, "".join(c.get("text", "") for c in body.get("result", {}).get("content", []))
+
+
+class Recorder:
+    def __init__(self, budgets_ms: dict):
+        self.budgets_ms = budgets_ms
+        self.by_tool = {}
+        self.by_turn = {}
+        self.errors = {}
+        self.over_budget = {}
+        self.expected = 0
+        self.hits = 0
+        self.sessions = 0
+
+    def record(self, tool: str, turn_key: str, latency: float, ok: bool):
+        if not ok:
+            self.errors[tool] = self.errors.get(tool, 0) + 1
+            return
+        self.by_tool.setdefault(tool, []).append(latency)
+        self.by_turn.setdefault(turn_key, []).append(latency)
+        if latency * 1000 > self.budgets_ms.get(tool, float("inf")):
+            self.over_budget[tool] = self.over_budget.get(tool, 0) + 1
+
+    def report(self, elapsed: float) -> dict:
+        tools = {}
+        total = within = 0
+        for tool, latencies in sorted(self.by_tool.items()):
+            stats = summarize(latencies, self.errors.get(tool, 0), elapsed)
+            over = self.over_budget.get(tool, 0)
+            stats["budget_ms"] = self.budgets_ms.get(tool)
+            stats["within_budget"] = round(1 - over / len(latencies), 4)
+            tools[tool] = stats
+            total += len(latencies) + self.errors.get(tool, 0)
+            within += len(latencies) - over
+        turns = {key: {"count": len(v), "p50_ms": _ms(percentile(sorted(v), 50)),
+                       "p95_ms": _ms(percentile(sorted(v), 95))}
+                 for key, v in sorted(self.by_turn.items())}
+        return {
+            "sessions": self.sessions,
+            "turns_total": total,
+            "within_budget": round(within / total, 4) if total else None,
+            "recall_hit_rate": round(self.hits / self.expected, 4) if self.expected else None,
+            "tools": tools,
+            "turns": turns,
+        }
+
+
+def _ms(value):
+    return round(value * 1000, 3) if value is not None else None
+
+
+async def run_session(client: httpx.AsyncClient, conversation: dict, recorder: Recorder, think_scale: float):
+    tag = f"z{uuid.uuid4().hex[:10]}"
+    for index, turn in enumerate(conversation["turns"]):
+        tool = turn["tool"]
+        path, body = tool_request(tool, turn.get("text", "").replace("{tag}", tag))
+        started = time.perf_counter()
+        try:
+            response = await client.post(path, json=body)
+            ok, text = response_text(tool, response)
+        except (httpx.HTTPError, ValueError):
+            ok, text = False, ""
+        recorder.record(tool, f"{conversation['name']}[{index}] {tool}", time.perf_counter() - started, ok)
+        if "expect" in turn:
+            recorder.expected += 1
+            recorder.hits += ok and turn["expect"].replace("{tag}", tag) in text
+        if turn.get("think_ms") and think_scale:
+            await asyncio.sleep(turn["think_ms"] * think_scale / 1000)
+    recorder.sessions += 1
+
+
+async def run(base_url: str, conversations: list, args) -> dict:
+    recorder = Recorder({**DEFAULT_BUDGETS_MS, **args.budget})
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.sessions, max_keepalive_connections=args.sessions)
+    remaining = args.conversations
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                await run_session(client, rng.choice(conversations), recorder, args.think_scale)
+
+        started = time.monotonic()
+        await asyncio.gather(*[worker() for _ in range(args.sessions)])
+        elapsed = time.monotonic() - started
+    return recorder.report(elapsed)
+
+
+def parse_budgets(value: str) -> dict:
+    budgets = {}
+    for item in filter(None, value.split(",")):
+        tool, _, ms = item.partition("=")
+        budgets[tool.strip()] = float(ms)
+    return budgets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Replay against an already running server instead of spawning app.py")
+    parser.add_argument("--script", help="JSON conversation script (defaults to the built-in set)")
+    parser.add_argument("--sessions", type=int, default=20, help="Concurrent simulated sessions")
+    parser.add_argument("--conversations", type=int, default=100, help="Total conversations to replay")
+    parser.add_argument("--think-scale", type=float, default=0.1,
+                        help="Multiplier on scripted think time between turns (0 = back to back)")
+    parser.add_argument("--budget", type=parse_budgets, default={},
+                        help="Per-tool budget overrides, e.g. retrieveMemories=250,store_memory=500")
+    parser.add_argument("--slo", type=float, default=0.99, help="Required fraction of turns within budget")
+    parser.add_argument("--latency", default=None, help="Stand-in latency spec, e.g. lognormal:40:0.4")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="bench/results/conversation_replay.json")
+    args = parser.parse_args()
+
+    conversations = CONVERSATIONS
+    if args.script:
+        with open(args.script) as f:
+            conversations = json.load(f)
+    unknown = {t["tool"] for c in conversations for t in c["turns"]} - set(WEBHOOK_TOOLS) - set(MCP_TOOLS)
+    if unknown:
+        parser.error(f"unknown tools in script: {', '.join(sorted(unknown))}")
+
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    if args.url:
+        result = asyncio.run(run(args.url, conversations, args))
+    else:
+        env = {"MEM0_STANDIN_LATENCY_MS": args.latency} if args.latency else {}
+        with running_server("app", env) as (base_url, _):
+            result = asyncio.run(run(base_url, conversations, args))
+
+    for tool, stats in result["tools"].items():
+        print(f"{tool:20s} p50 {stats['p50_ms']}ms  p95 {stats['p95_ms']}ms  p99 {stats['p99_ms']}ms  "
+              f"budget {stats['budget_ms']}ms  within {stats['within_budget']:.2%}  errors {stats['error_rate']:.2%}")
+    print(f"Recall hit rate: {result['recall_hit_rate']}  Turns within budget: {result['within_budget']}")
+
+    report = report_header("conversation_replay", config)
+    report.update(result)
+    write_report(args.out, report)
+
+    if result["within_budget"] is None or result["within_budget"] < args.slo:
+        print(f"❌ SLO missed: {result['within_budget']} of turns within budget (need {args.slo})")
+        sys.exit(1)
+    print(f"✅ SLO met: {result['within_budget']} of turns within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Shared helpers for the benchmark scripts in bench/
+Spawning a server against the offline Mem0 stand-in, latency statistics,
+machine-readable reports and run-to-run comparison
+"""
+
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Stand-in defaults: realistic-ish hosted Mem0 latency, reproducible
+STANDIN_ENV = {
+    "MEM0_BACKEND": "standin",
+    "MEM0_STANDIN_SEED": "42",
+    "MEM0_STANDIN_LATENCY_MS": "lognormal:40:0.4",
+    "LOOP_MONITOR": "1",
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def running_server(module: str = "app", env: Dict[str, str] = None, port: int = None,
+                   health_path: str = "/health", startup_timeout: float = 30.0):
+    """Run `uvicorn module:app` against the stand-in and yield its base URL"""
+    port = port or free_port()
+    child_env = {**os.environ, **STANDIN_ENV, **(env or {})}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        cwd=REPO_ROOT,
+        env=child_env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_ready(base_url + health_path, proc, startup_timeout)
+        yield base_url, proc
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def _wait_ready(url: str, proc, timeout: float):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with code {proc.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"server not ready after {timeout}s")
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    # Nearest-rank percentile
+    rank = math.ceil(pct / 100.0 * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(1, rank)) - 1]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    """Latencies in seconds -> throughput, error rate and millisecond percentiles"""
+    values = sorted(latencies)
+    total = len(values) + errors
+    ms = lambda v: round(v * 1000, 3) if v is not None else None
+    return {
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": ms(sum(values) / len(values)) if values else None,
+        "p50_ms": ms(percentile(values, 50)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "max_ms": ms(values[-1]) if values else None,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def report_header(kind: str, config: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "benchmark": kind,
+        "commit": git_revision(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": config,
+    }
+
+
+def write_report(path: str, report: Dict[str, Any]):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"📝 Report written to {path}")
+
+
+def compare(current: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            metric: str = "p95_ms", threshold: float = 0.2) -> List[str]:
+    """Names of entries whose metric grew by more than threshold (fraction) over the baseline"""
+    regressions = []
+    for name, stats in current.items():
+        before = baseline.get(name, {}).get(metric)
+        after = stats.get(metric)
+        if before and after and after > before * (1 + threshold):
+            regressions.append(f"{name}: {metric} {before} -> {after} (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
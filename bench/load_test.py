@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Load-test benchmark for the MCP, webhook and REST endpoints of app.py
+Runs each scenario at a fixed concurrency against the offline Mem0 stand-in
+and writes throughput, p50/p95/p99 and error rates to a JSON report
+
+    python bench/load_test.py --concurrency 32 --duration 10 --out bench/results/load.json
+    python bench/load_test.py --compare bench/results/load-main.json
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import sys
+import time
+import uuid
+
+import httpx
+
+from harness import compare, report_header, running_server, summarize, write_report
+
+MEMORY_ID_RE = re.compile(r"Memory stored: ([\w-]+)")
+
+
+def rpc(method: str, params: dict = None) -> dict:
+    return {"jsonrpc": "2.0", "id": str(uuid.uuid4()), "method": method, "params": params or {}}
+
+
+def tool(name: str, arguments: dict) -> dict:
+    return rpc("tools/call", {"name": name, "arguments": arguments})
+
+
+def is_error(response: httpx.Response) -> bool:
+    """HTTP failure, JSON-RPC error or an {"error": ...} body"""
+    if response.status_code >= 400:
+        return True
+    try:
+        body = response.json()
+    except ValueError:
+        return True
+    return isinstance(body, dict) and bool(body.get("error"))
+
+
+async def delete_memory(client: httpx.AsyncClient) -> httpx.Response:
+    """Store a memory first (unmeasured) so the timed delete hits a real ID"""
+    stored = await client.post("/mcp", json=tool("store_memory", {"message": "benchmark delete target"}))
+    match = MEMORY_ID_RE.search(json.dumps(stored.json()))
+    memory_id = match.group(1) if match else "missing"
+    started = time.perf_counter()
+    response = await client.post("/mcp", json=tool("delete_memory", {"memory_id": memory_id}))
+    response.elapsed_override = time.perf_counter() - started
+    return response
+
+
+# name -> coroutine factory taking the client
+SCENARIOS = {
+    "mcp_initialize": lambda c: c.post("/mcp", json=rpc("initialize")),
+    "mcp_tools_list": lambda c: c.post("/mcp", json=rpc("tools/list")),
+    "mcp_store_memory": lambda c: c.post("/mcp", json=tool("store_memory", {"message": "I prefer oat milk in my coffee"})),
+    "mcp_search_memory": lambda c: c.post("/mcp", json=tool("search_memory", {"query": "coffee", "limit": 5})),
+    "mcp_get_all_memories": lambda c: c.post("/mcp", json=tool("get_all_memories", {"limit": 50})),
+    "mcp_delete_memory": delete_memory,
+    "mcp_v1_store_memory": lambda c: c.post("/mcp-v1", json=tool("store_memory", {"content": "Meeting with Dana on Friday"})),
+    "elevenlabs_webhook": lambda c: c.post("/elevenlabs/webhook", json={"text": "Remind me about the dentist"}),
+    "webhook_addMemories": lambda c: c.post("/webhook/elevenlabs/tools/addMemories",
+                                            json={"parameters": {"message": "My sister's birthday is in May"}}),
+    "webhook_retrieveMemories": lambda c: c.post("/webhook/elevenlabs/tools/retrieveMemories",
+                                                 json={"parameters": {"message": "birthday"}}),
+    "webhook_getSessionSummary": lambda c: c.post("/webhook/elevenlabs/tools/getSessionSummary", json={}),
+    "api_memory_add": lambda c: c.post("/api/memory/add", json={"message": "Budget review next week"}),
+    "api_memory_search": lambda c: c.post("/api/memory/search", json={"query": "budget"}),
+}
+
+
+async def run_scenario(base_url: str, name: str, concurrency: int, duration: float,
+                       max_requests: int, warmup: int) -> dict:
+    factory = SCENARIOS[name]
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        for _ in range(warmup):
+            await factory(client)
+
+        deadline = time.monotonic() + duration
+        issued = 0
+
+        async def worker():
+            nonlocal errors, issued
+            while time.monotonic() < deadline and (not max_requests or issued < max_requests):
+                issued += 1
+                started = time.perf_counter()
+                try:
+                    response = await factory(client)
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                elapsed = getattr(response, "elapsed_override", time.perf_counter() - started)
+                if is_error(response):
+                    errors += 1
+                else:
+                    latencies.append(elapsed)
+
+        started = time.monotonic()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.monotonic() - started
+    return summarize(latencies, errors, elapsed)
+
+
+async def run_all(base_url: str, names, args) -> dict:
+    results = {}
+    for name in names:
+        stats = await run_scenario(base_url, name, args.concurrency, args.duration, args.requests, args.warmup)
+        results[name] = stats
+        print(f"{name:28s} {stats['throughput_rps']:>9.1f} rps  p50 {stats['p50_ms']}ms  "
+              f"p95 {stats['p95_ms']}ms  p99 {stats['p99_ms']}ms  errors {stats['error_rate']:.2%}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Benchmark an already running server instead of spawning app.py")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenario names")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per scenario")
+    parser.add_argument("--requests", type=int, default=0, help="Cap on requests per scenario (0 = no cap)")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--latency", default=None, help="Stand-in latency spec, e.g. lognormal:40:0.4")
+    parser.add_argument("--out", default="bench/results/load_test.json")
+    parser.add_argument("--compare", help="Baseline report to check for p95 regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed p95 growth vs baseline")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    config = {k: v for k, v in vars(args).items() if k not in ("out", "compare")}
+    if args.url:
+        results = asyncio.run(run_all(args.url, names, args))
+    else:
+        env = {"MEM0_STANDIN_LATENCY_MS": args.latency} if args.latency else {}
+        with running_server("app", env) as (base_url, _):
+            results = asyncio.run(run_all(base_url, names, args))
+
+    report = report_header("load_test", config)
+    report["results"] = results
+    write_report(args.out, report)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, "p95_ms", args.threshold)
+        for line in regressions:
+            print(f"❌ Regression {line}")
+        if regressions:
+            sys.exit(1)
+        print("✅ No p95 regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Dispatch and serialization microbenchmarks
+Times the pure-CPU parts of request handling in app.py with the Mem0 call
+replaced by an instant in-memory answer, so only parsing, dispatch,
+formatting and serialization are measured:
+  - JSON-RPC body parse
+  - initialize / tools/list through the full ASGI stack
+  - search_memory / get_all_memories result formatting (call_mcp_tool)
+  - store_memory metadata build (three strftime calls) + broadcast
+  - SSE frame and JSON response encoding (json_backend)
+
+Every run appends to a history file so fast-path work can be tracked over
+time; --compare fails on ns/op regressions against the previous run or a
+baseline report.
+
+    python bench/microbench.py
+    python bench/microbench.py --only sse_frame,metadata_strftime --compare previous
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+
+from alloc_budgets import asgi_call, rpc, tool
+from harness import REPO_ROOT, STANDIN_ENV, compare, report_header, write_report
+
+SEARCH_RESULTS = 20
+GET_ALL_RESULTS = 500
+
+
+def sample_memories(count: int) -> list:
+    now = datetime.now().isoformat()
+    return [{
+        "id": f"00000000-0000-4000-8000-{i:012d}",
+        "memory": f"Dentist appointment on Thursday at 3pm, bring the insurance card #{i}",
+        "user_id": "quinn_may", "agent_id": None, "run_id": None,
+        "metadata": {"category": "mcp_memory", "day": now[:10], "month": now[:7], "year": now[:4]},
+        "categories": None, "created_at": now, "updated_at": now, "score": 0.42,
+    } for i in range(count)]
+
+
+class InstantMemory:
+    """Answers memory-layer calls immediately so only app-side CPU is timed"""
+
+    def __init__(self):
+        self.search_results = sample_memories(SEARCH_RESULTS)
+        self.all_results = sample_memories(GET_ALL_RESULTS)
+
+    async def add(self, workload=None, **kwargs):
+        return {"id": "00000000-0000-4000-8000-000000000000", "results": []}
+
+    async def search(self, workload=None, **kwargs):
+        return self.search_results
+
+    async def get_all(self, workload=None, **kwargs):
+        return self.all_results
+
+    async def delete(self, workload=None, **kwargs):
+        return {"message": "Memory deleted successfully!"}
+
+
+def benchmarks(app_module):
+    from json_backend import FastJSONResponse, loads, sse_frame
+
+    from memory_index import MemoryIndex
+
+    app = app_module.app
+    app_module.memory = InstantMemory()
+    # The index must page the instant answers too, not the stand-in behind app.memory_index
+    app_module.memory_index = MemoryIndex(app_module.memory, ttl=float("inf"))
+    body = tool("search_memory", {"query": "dentist appointment", "limit": 5})
+    sse_event = {"id": "9f0c1b8e-1d7a-4c55-9a53-0f0e5cf0b0aa", "type": "mcp_memory",
+                 "message": "Dentist appointment on Thursday at 3pm", "user_id": "quinn_may",
+                 "timestamp": datetime.now().isoformat(), "stored": True}
+    search_response = {"jsonrpc": "2.0", "id": "bench",
+                       "result": {"content": [{"type": "text", "text": "Found 20 memories:\n" + "• memory\n" * 20}]}}
+
+    def metadata_strftime():
+        now = datetime.now()
+        return {
+            "category": "mcp_memory",
+            "day": now.strftime("%Y-%m-%d"),
+            "month": now.strftime("%Y-%m"),
+            "year": now.strftime("%Y"),
+            "client": app_module.CLIENT,
+            "project_type": app_module.PROJECT_TYPE,
+            "device": "elevenlabs_mcp",
+            "timestamp": now.isoformat(),
+        }
+
+    # name -> (kind, callable); "sync" callables are timed directly, "async" ones awaited in a loop
+    return {
+        "jsonrpc_parse": ("sync", lambda: loads(body)),
+        "mcp_initialize": ("async", lambda: asgi_call(app, "POST", "/mcp", rpc("initialize"))),
+        "mcp_tools_list": ("async", lambda: asgi_call(app, "POST", "/mcp", rpc("tools/list"))),
+        "search_format": ("async", lambda: app_module.call_mcp_tool(
+            "search_memory", {"query": "dentist", "limit": SEARCH_RESULTS}, "bench")),
+        "get_all_format": ("async", lambda: app_module.call_mcp_tool(
+            "get_all_memories", {"limit": 50}, "bench")),
+        "store_memory": ("async", lambda: app_module.call_mcp_tool(
+            "store_memory", {"message": "Dentist appointment on Thursday"}, "bench")),
+        "metadata_strftime": ("sync", metadata_strftime),
+        "sse_frame": ("sync", lambda: sse_frame(sse_event)),
+        "json_response_render": ("sync", lambda: FastJSONResponse(search_response).body),
+    }
+
+
+def time_sync(fn, number: int) -> float:
+    started = time.perf_counter_ns()
+    for _ in range(number):
+        fn()
+    return (time.perf_counter_ns() - started) / number
+
+
+async def time_async(fn, number: int) -> float:
+    started = time.perf_counter_ns()
+    for _ in range(number):
+        await fn()
+    return (time.perf_counter_ns() - started) / number
+
+
+async def run(names, args) -> dict:
+    os.environ.update({**STANDIN_ENV, "LOOP_MONITOR": "0", "TRACE_SAMPLE_RATE": "0"})
+    sys.path.insert(0, str(REPO_ROOT))
+    import app as app_module
+
+    available = benchmarks(app_module)
+    # Load the view up front so neither get_all_format nor keyword search downloads while timed
+    await app_module.memory_index.view(app_module.tenants.current())
+    results = {}
+    for name in names:
+        kind, fn = available[name]
+        timer = (lambda n: time_sync(fn, n)) if kind == "sync" else None
+        # Calibrate so each repeat runs for roughly --target-ms
+        number = 1
+        while True:
+            ns = timer(number) if timer else await time_async(fn, number)
+            if ns * number >= args.target_ms * 1e6 or number >= 1_000_000:
+                break
+            number *= 4
+        runs = [timer(number) if timer else await time_async(fn, number) for _ in range(args.repeat)]
+        results[name] = {
+            "ns_per_op": round(min(runs), 1),
+            "median_ns": round(statistics.median(runs), 1),
+            "ops_per_s": round(1e9 / min(runs), 1),
+            "loops": number,
+        }
+        print(f"{name:24s} {results[name]['ns_per_op'] / 1000:>10.2f} µs/op  "
+              f"(median {results[name]['median_ns'] / 1000:.2f} µs, {number} loops x {args.repeat})")
+    return results
+
+
+def load_baseline(spec: str, history: str) -> dict:
+    """'previous' = the last run in the history file, otherwise a report path"""
+    if spec == "previous":
+        if not os.path.exists(history):
+            return {}
+        with open(history) as f:
+            lines = [line for line in f if line.strip()]
+        return json.loads(lines[-1])["results"] if lines else {}
+    with open(spec) as f:
+        return json.load(f)["results"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default=None, help="Comma-separated benchmark names")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=200, help="Approximate duration of one repeat")
+    parser.add_argument("--out", default="bench/results/microbench.json")
+    parser.add_argument("--history", default="bench/results/microbench_history.jsonl",
+                        help="Append each run here for tracking over time")
+    parser.add_argument("--compare", help="'previous' or a baseline report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed ns/op growth vs baseline")
+    args = parser.parse_args()
+
+    all_names = ["jsonrpc_parse", "mcp_initialize", "mcp_tools_list", "search_format", "get_all_format",
+                 "store_memory", "metadata_strftime", "sse_frame", "json_response_render"]
+    names = [n.strip() for n in args.only.split(",")] if args.only else all_names
+    unknown = [n for n in names if n not in all_names]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    baseline = load_baseline(args.compare, args.history) if args.compare else None
+    results = asyncio.run(run(names, args))
+
+    report = report_header("microbench", {k: v for k, v in vars(args).items() if k not in ("out", "compare")})
+    report["results"] = results
+    write_report(args.out, report)
+    os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+    with open(args.history, "a") as f:
+        f.write(json.dumps(report) + "\n")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, "ns_per_op", args.threshold)
+        for line in regressions:
+            print(f"❌ Regression {line}")
+        if regressions:
+            sys.exit(1)
+        print("✅ No ns/op regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+SSE fan-out scalability benchmark
+Opens increasing numbers of /sse (and optionally GET /mcp) subscribers,
+including deliberately slow readers, pushes events through POST /sse and
+/elevenlabs/webhook, and reports per level:
+  - delivery latency to fast readers (p50/p95/p99) and delivered fraction
+  - server CPU seconds per pushed event
+  - server resident memory per connection
+  - write-endpoint latency, flagging the level where it degrades
+
+    python bench/sse_fanout.py --levels 0,250,1000,2000 --slow-fraction 0.1
+
+Server CPU/RSS are read from /proc (Linux) or psutil when installed.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import time
+from datetime import datetime
+
+import httpx
+
+from harness import percentile, report_header, running_server, summarize, write_report
+
+
+def process_usage(pid: int):
+    """(cpu_seconds, rss_bytes) of the server process"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        ticks = os.sysconf("SC_CLK_TCK")
+        cpu = (int(fields[11]) + int(fields[12])) / ticks
+        with open(f"/proc/{pid}/status") as f:
+            rss = next(int(line.split()[1]) * 1024 for line in f if line.startswith("VmRSS:"))
+        return cpu, rss
+    except (OSError, StopIteration):
+        import psutil
+
+        proc = psutil.Process(pid)
+        times = proc.cpu_times()
+        return times.user + times.system, proc.memory_info().rss
+
+
+def raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+class Subscriber:
+    """Raw-socket SSE reader; cheap enough to hold thousands in one process"""
+
+    def __init__(self, host: str, port: int, path: str, slow: bool, deliveries: list):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.slow = slow
+        self.deliveries = deliveries
+        self.task = None
+        self.writer = None
+        self.received = 0
+
+    async def connect(self):
+        reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(
+            f"GET {self.path} HTTP/1.1\r\nHost: {self.host}\r\nAccept: text/event-stream\r\n\r\n".encode()
+        )
+        await self.writer.drain()
+        await reader.readuntil(b"\r\n\r\n")
+        self.task = asyncio.ensure_future(self._read(reader))
+
+    async def _read(self, reader):
+        if self.slow:
+            # Never read past the headers; the server's buffers and queues take the pressure
+            await asyncio.Event().wait()
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            if not line.startswith(b"data: "):
+                continue
+            self.received += 1
+            sent = _sent_at(line[6:])
+            if sent is not None:
+                self.deliveries.append(time.time() - sent)
+
+    def close(self):
+        if self.task:
+            self.task.cancel()
+        if self.writer:
+            self.writer.close()
+
+
+def _sent_at(payload: bytes):
+    try:
+        event = json.loads(payload)
+    except ValueError:
+        return None
+    sent = (event.get("metadata") or {}).get("bench_sent")
+    if sent is not None:
+        return sent
+    if event.get("type") == "elevenlabs_memory" and event.get("timestamp"):
+        return datetime.fromisoformat(event["timestamp"]).timestamp()
+    return None
+
+
+async def push_events(client: httpx.AsyncClient, count: int, rate: float):
+    """Alternate POST /sse and the ElevenLabs webhook; returns per-endpoint write latencies"""
+    writes = {"post_sse": [], "elevenlabs_webhook": []}
+    errors = 0
+    interval = 1.0 / rate
+    for i in range(count):
+        started = time.perf_counter()
+        try:
+            if i % 2 == 0:
+                response = await client.post("/sse", json={
+                    "message": f"fan-out event {i}", "metadata": {"bench_sent": time.time()}})
+                writes["post_sse"].append(time.perf_counter() - started)
+            else:
+                response = await client.post("/elevenlabs/webhook", json={"text": f"fan-out event {i}"})
+                writes["elevenlabs_webhook"].append(time.perf_counter() - started)
+            errors += response.status_code >= 400
+        except httpx.HTTPError:
+            errors += 1
+        await asyncio.sleep(max(0.0, interval - (time.perf_counter() - started)))
+    return writes, errors
+
+
+async def run(base_url: str, pid: int, args) -> dict:
+    host, port = base_url.split("//")[1].split(":")
+    port = int(port)
+    subscribers = []
+    deliveries = []
+    levels = []
+    baseline_write_p95 = None
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as client:
+        for level in args.levels:
+            new = level - len(subscribers)
+            for start in range(0, max(0, new), args.connect_batch):
+                batch = []
+                for i in range(start, min(new, start + args.connect_batch)):
+                    index = len(subscribers) + len(batch)
+                    path = "/mcp" if index % 100 < args.mcp_fraction * 100 else "/sse"
+                    slow = path == "/sse" and index % 100 < (args.mcp_fraction + args.slow_fraction) * 100
+                    batch.append(Subscriber(host, port, path, slow, deliveries))
+                results = await asyncio.gather(*[s.connect() for s in batch], return_exceptions=True)
+                subscribers.extend(s for s, r in zip(batch, results) if not isinstance(r, Exception))
+            await asyncio.sleep(args.settle)
+
+            deliveries.clear()
+            for s in subscribers:
+                s.received = 0
+            cpu_before, rss_before = process_usage(pid)
+            writes, write_errors = await push_events(client, args.events, args.rate)
+            await asyncio.sleep(args.drain)
+            cpu_after, rss_after = process_usage(pid)
+
+            fast_sse = [s for s in subscribers if s.path == "/sse" and not s.slow]
+            expected = len(fast_sse) * args.events
+            all_writes = writes["post_sse"] + writes["elevenlabs_webhook"]
+            write_stats = summarize(all_writes, write_errors, 1.0)
+            values = sorted(deliveries)
+            entry = {
+                "subscribers": len(subscribers),
+                "fast_sse": len(fast_sse),
+                "slow_sse": sum(1 for s in subscribers if s.slow),
+                "mcp_streams": sum(1 for s in subscribers if s.path == "/mcp"),
+                "delivery_p50_ms": _ms(percentile(values, 50)),
+                "delivery_p95_ms": _ms(percentile(values, 95)),
+                "delivery_p99_ms": _ms(percentile(values, 99)),
+                "delivered_fraction": round(len(values) / expected, 4) if expected else None,
+                "cpu_ms_per_event": round((cpu_after - cpu_before) * 1000 / args.events, 3),
+                "rss_mb": round(rss_after / 2**20, 2),
+                "rss_kb_per_connection": round((rss_after - levels[0]["rss_bytes"]) / 1024 / len(subscribers), 2)
+                if levels and subscribers else None,
+                "rss_bytes": rss_after,
+                "write_p50_ms": write_stats["p50_ms"],
+                "write_p95_ms": write_stats["p95_ms"],
+                "write_errors": write_errors,
+                "post_sse_p95_ms": summarize(writes["post_sse"], 0, 1.0)["p95_ms"],
+                "webhook_p95_ms": summarize(writes["elevenlabs_webhook"], 0, 1.0)["p95_ms"],
+            }
+            if baseline_write_p95 is None:
+                baseline_write_p95 = entry["write_p95_ms"]
+            entry["write_degraded"] = bool(
+                baseline_write_p95 and entry["write_p95_ms"]
+                and entry["write_p95_ms"] > baseline_write_p95 * (1 + args.degrade_threshold)
+            )
+            levels.append(entry)
+            print(f"{entry['subscribers']:>6} subs  delivery p95 {entry['delivery_p95_ms']}ms  "
+                  f"delivered {entry['delivered_fraction']}  cpu/event {entry['cpu_ms_per_event']}ms  "
+                  f"rss/conn {entry['rss_kb_per_connection']}KB  write p95 {entry['write_p95_ms']}ms"
+                  f"{'  ⚠️ write latency degraded' if entry['write_degraded'] else ''}")
+
+    for s in subscribers:
+        s.close()
+    knee = next((e["subscribers"] for e in levels if e["write_degraded"]), None)
+    return {"levels": levels, "write_latency_knee": knee}
+
+
+def _ms(value):
+    return round(value * 1000, 3) if value is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Target a running server (requires --pid for CPU/RSS accounting)")
+    parser.add_argument("--pid", type=int, help="Server PID when using --url")
+    parser.add_argument("--levels", default="0,100,500,1000,2000",
+                        type=lambda s: [int(x) for x in s.split(",")])
+    parser.add_argument("--slow-fraction", type=float, default=0.1, help="Share of /sse readers that never read")
+    parser.add_argument("--mcp-fraction", type=float, default=0.1, help="Share of subscribers on GET /mcp")
+    parser.add_argument("--events", type=int, default=50, help="Events pushed per level")
+    parser.add_argument("--rate", type=float, default=20.0, help="Events per second")
+    parser.add_argument("--connect-batch", type=int, default=200)
+    parser.add_argument("--settle", type=float, default=1.0)
+    parser.add_argument("--drain", type=float, default=2.0)
+    parser.add_argument("--degrade-threshold", type=float, default=0.5,
+                        help="Write p95 growth over the first level that counts as degraded")
+    parser.add_argument("--out", default="bench/results/sse_fanout.json")
+    args = parser.parse_args()
+
+    fd_limit = raise_fd_limit()
+    if max(args.levels) + 100 > fd_limit:
+        print(f"⚠️ File descriptor limit {fd_limit} is below the largest level")
+
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    # Admission control would shed subscribers past its cap; lift it so we measure the process itself
+    env = {"ADMISSION_SSE_MAX_SUBSCRIBERS": str(max(args.levels) * 2 + 10), "MEM0_STANDIN_LATENCY_MS": "5"}
+    if args.url:
+        if not args.pid:
+            parser.error("--pid is required with --url")
+        result = asyncio.run(run(args.url, args.pid, args))
+    else:
+        with running_server("app", env) as (base_url, proc):
+            result = asyncio.run(run(base_url, proc.pid, args))
+
+    report = report_header("sse_fanout", config)
+    report.update(result)
+    write_report(args.out, report)
+    if result["write_latency_knee"] is not None:
+        print(f"⚠️ Write-endpoint latency degraded at {result['write_latency_knee']} subscribers")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+Bulk streaming import
+Parses an NDJSON request body line by line as it arrives (optionally gzip'd)
+and writes through the memory layer in the BULK workload class, so live
+voice traffic keeps its own bulkhead and limiter share. Consecutive lines of
+the same conversation and metadata are batched into one add call. Progress
+is published on /sse and a checkpoint (every line up to N is done) is saved
+along with the lines finished past it, so an interrupted import, or one
+with failed lines, resumes by re-sending the same file with its job_id and
+only the lines not yet written are retried.
+
+Accepted lines:
+    {"message": "...", "metadata": {...}, "conversation_id": "...", "timestamp": "..."}
+    {"messages": [{"role": "user", "content": "..."}, ...]}
+    {"type": "memory", "data": {...}}          (lines from /api/memory/export)
+"""
+
+import asyncio
+import json
+import os
+import re
+import tempfile
+import time
+import uuid
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from json_backend import loads
+from scheduling import BULK
+
+JOB_ID_RE = re.compile(r"^[\w-]{1,64}$")
+MAX_LINE_BYTES = 1 << 20
+MAX_FAILED_LINES = 100
+
+
+class ImportRejected(ValueError):
+    """Bad job id, oversized line or other client error"""
+
+
+class ImportRunning(ImportRejected):
+    """The job_id is already being imported by another request"""
+
+
+def _ranges(numbers) -> List[List[int]]:
+    """Sorted line numbers as [first, last] runs"""
+    ranges: List[List[int]] = []
+    for n in sorted(numbers):
+        if ranges and ranges[-1][1] == n - 1:
+            ranges[-1][1] = n
+        else:
+            ranges.append([n, n])
+    return ranges
+
+
+class ImportJob:
+    def __init__(self, job_id: str, user_id: str, checkpoint: int = 0, done: List[List[int]] = None):
+        self.job_id = job_id
+        self.user_id = user_id
+        self.status = "running"
+        self.checkpoint = checkpoint
+        self.lines = 0
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.invalid = 0
+        self.skipped = 0
+        self.failed_lines: List[int] = []
+        self.started = time.time()
+        self.finished: Optional[float] = None
+        # Lines finished past the checkpoint (a failed line holds it back)
+        self._done = {n for first, last in done or [] for n in range(first, last + 1) if n > checkpoint}
+
+    def is_done(self, line_number: int) -> bool:
+        return line_number <= self.checkpoint or line_number in self._done
+
+    def complete(self, line_numbers):
+        """Mark lines done and advance the contiguous checkpoint"""
+        self._done.update(line_numbers)
+        while self.checkpoint + 1 in self._done:
+            self.checkpoint += 1
+            self._done.discard(self.checkpoint)
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = (self.finished or time.time()) - self.started
+        return {
+            "job_id": self.job_id,
+            "user_id": self.user_id,
+            "status": self.status,
+            "checkpoint": self.checkpoint,
+            "done_after_checkpoint": _ranges(self._done),
+            "lines": self.lines,
+            "written": self.written,
+            "batches": self.batches,
+            "failed": self.failed,
+            "invalid": self.invalid,
+            "skipped": self.skipped,
+            "failed_lines": self.failed_lines,
+            "elapsed_s": round(elapsed, 2),
+            "lines_per_s": round(self.lines / elapsed, 1) if elapsed else None,
+        }
+
+
+def _metadata(record: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """Metadata with day/month/year/timestamp from the line's stamp, else the import's start"""
+    metadata = {"category": "bulk_import", **(record.get("metadata") or {})}
+    stamp = record.get("timestamp") or record.get("created_at")
+    try:
+        when = datetime.fromisoformat(stamp) if stamp else now
+    except (TypeError, ValueError):
+        when = now
+    metadata.setdefault("day", when.strftime("%Y-%m-%d"))
+    metadata.setdefault("month", when.strftime("%Y-%m"))
+    metadata.setdefault("year", when.strftime("%Y"))
+    metadata.setdefault("timestamp", when.isoformat())
+    return metadata
+
+
+def _normalize(record: Any, now: datetime) -> Optional[Dict[str, Any]]:
+    """{"messages", "metadata", "conversation_id"} or None for an unusable line"""
+    if not isinstance(record, dict):
+        return None
+    if record.get("type") == "memory" and isinstance(record.get("data"), dict):
+        record = {**record["data"], "message": record["data"].get("memory")}
+    messages = record.get("messages")
+    if not messages:
+        text = record.get("message") or record.get("content") or record.get("text")
+        if not isinstance(text, str) or not text.strip():
+            return None
+        messages = [{"role": record.get("role", "user"), "content": text}]
+    if not isinstance(messages, list) or not all(isinstance(m, dict) and m.get("content") for m in messages):
+        return None
+    return {
+        "messages": messages,
+        "metadata": _metadata(record, now),
+        "conversation_id": record.get("conversation_id") or record.get("run_id"),
+    }
+
+
+class BulkImporter:
+    def __init__(self, memory, broadcast: Callable = None, concurrency: int = 4, batch_size: int = 20,
+                 checkpoint_dir: str = None, progress_interval: float = 1.0):
+        self.memory = memory
+        self.broadcast = broadcast
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.checkpoint_dir = checkpoint_dir
+        self.progress_interval = progress_interval
+        self.jobs: Dict[str, ImportJob] = {}
+        if checkpoint_dir:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+
+    # ----- checkpoints -----
+
+    def _checkpoint_path(self, job_id: str) -> str:
+        return os.path.join(self.checkpoint_dir, f"{job_id}.json")
+
+    def _save(self, job: ImportJob):
+        if not self.checkpoint_dir:
+            return
+        tmp = self._checkpoint_path(job.job_id) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(job.snapshot(), f)
+        os.replace(tmp, self._checkpoint_path(job.job_id))
+
+    def job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if job_id in self.jobs:
+            return self.jobs[job_id].snapshot()
+        if self.checkpoint_dir and JOB_ID_RE.match(job_id) and os.path.exists(self._checkpoint_path(job_id)):
+            with open(self._checkpoint_path(job_id)) as f:
+                return json.load(f)
+        return None
+
+    def start(self, user_id: str, job_id: str = None) -> ImportJob:
+        """New job, or the saved checkpoint of job_id to resume from"""
+        if job_id is None:
+            job_id = uuid.uuid4().hex[:16]
+        elif not JOB_ID_RE.match(job_id):
+            raise ImportRejected("job_id must be 1-64 letters, digits, '_' or '-'")
+        existing = self.jobs.get(job_id)
+        if existing and existing.status == "running":
+            raise ImportRunning(f"Import {job_id} is already running")
+        saved = self.job(job_id)
+        if saved and saved.get("user_id") not in (None, user_id):
+            raise ImportRejected(f"Import {job_id} belongs to another user")
+        job = ImportJob(job_id, user_id, checkpoint=saved["checkpoint"] if saved else 0,
+                        done=saved.get("done_after_checkpoint") if saved else None)
+        self.jobs[job_id] = job
+        return job
+
+    # ----- streaming -----
+
+    async def _lines(self, chunks: AsyncIterator[bytes], gzipped: bool) -> AsyncIterator[bytes]:
+        decompressor = zlib.decompressobj(31) if gzipped else None
+        buffer = b""
+        async for chunk in chunks:
+            if decompressor:
+                chunk = decompressor.decompress(chunk)
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                yield line
+            if len(buffer) > MAX_LINE_BYTES:
+                raise ImportRejected(f"Line longer than {MAX_LINE_BYTES} bytes")
+        if decompressor:
+            buffer += decompressor.flush()
+        if buffer.strip():
+            yield buffer
+
+    async def _batches(self, job: ImportJob, chunks, gzipped: bool):
+        """Yield lists of (line_number, record), one list per add call"""
+        batch: List[Tuple[int, Dict[str, Any]]] = []
+        now = datetime.fromtimestamp(job.started)
+        async for raw in self._lines(chunks, gzipped):
+            job.lines += 1
+            line_number = job.lines
+            if job.is_done(line_number):
+                job.skipped += 1
+                continue
+            if not raw.strip():
+                job.complete([line_number])
+                continue
+            try:
+                parsed = loads(raw)
+            except ValueError:
+                parsed = None
+            if isinstance(parsed, dict) and parsed.get("type") == "end":
+                # Trailer of an /api/memory/export stream
+                job.complete([line_number])
+                continue
+            record = _normalize(parsed, now)
+            if record is None:
+                job.invalid += 1
+                job.complete([line_number])
+                continue
+            conversation = record["conversation_id"]
+            # One add call carries one metadata, so a line with its own day/timestamp starts a new batch
+            previous = batch[-1][1] if batch else None
+            if batch and (conversation is None or conversation != previous["conversation_id"]
+                          or record["metadata"] != previous["metadata"] or len(batch) >= self.batch_size):
+                yield batch
+                batch = []
+            batch.append((line_number, record))
+        if batch:
+            yield batch
+
+    async def _write(self, job: ImportJob, batch):
+        line_numbers = [n for n, _ in batch]
+        first = batch[0][1]
+        messages = [m for _, record in batch for m in record["messages"]]
+        kwargs = {"messages": messages, "user_id": job.user_id, "metadata": first["metadata"]}
+        if first["conversation_id"]:
+            kwargs["run_id"] = str(first["conversation_id"])
+        job.batches += 1
+        try:
+            await self.memory.add(workload=BULK, **kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Failed lines stay ahead of the checkpoint, so a resume retries them
+            job.failed += len(batch)
+            room = MAX_FAILED_LINES - len(job.failed_lines)
+            job.failed_lines.extend(line_numbers[:max(0, room)])
+            return
+        job.written += len(batch)
+        job.complete(line_numbers)
+
+    async def _progress(self, job: ImportJob, final: bool = False):
+        self._save(job)
+        if self.broadcast:
+            await self.broadcast({"type": "import_progress", "final": final,
+                                  "timestamp": datetime.now().isoformat(), **job.snapshot()}, job.user_id)
+
+    async def run(self, job: ImportJob, chunks: AsyncIterator[bytes], gzipped: bool = False) -> Dict[str, Any]:
+        """Consume the body, writing with bounded concurrency; returns the final job snapshot"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        async def worker():
+            while True:
+                batch = await queue.get()
+                if batch is None:
+                    return
+                await self._write(job, batch)
+
+        async def reporter():
+            while True:
+                await asyncio.sleep(self.progress_interval)
+                await self._progress(job)
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        progress = asyncio.create_task(reporter())
+        consumed = False
+        try:
+            # The bounded queue pushes back on the body reader when writes fall behind
+            async for batch in self._batches(job, chunks, gzipped):
+                await queue.put(batch)
+            consumed = True
+        except Exception as e:
+            job.status = f"interrupted: {e.__class__.__name__}"
+            raise
+        finally:
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers, return_exceptions=True)
+            if consumed:
+                # Only now are all writes settled
+                job.status = "completed_with_failures" if job.failed else "completed"
+            progress.cancel()
+            job.finished = time.time()
+            await self._progress(job, final=True)
+        return job.snapshot()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "batch_size": self.batch_size,
+            "checkpoint_dir": self.checkpoint_dir,
+            "jobs": {job_id: job.snapshot() for job_id, job in self.jobs.items()},
+        }
+
+
+def importer_from_env(memory, broadcast: Callable = None) -> Optional[BulkImporter]:
+    """
+    IMPORT_CONCURRENCY      concurrent add calls per import (default 4)
+    IMPORT_BATCH_SIZE       max lines of one conversation per add call (default 20)
+    IMPORT_CHECKPOINT_DIR   where resume checkpoints are kept (default: system temp dir)
+    """
+    if memory is None:
+        return None
+    return BulkImporter(
+        memory,
+        broadcast,
+        concurrency=int(os.environ.get("IMPORT_CONCURRENCY", 4)),
+        batch_size=int(os.environ.get("IMPORT_BATCH_SIZE", 20)),
+        checkpoint_dir=os.environ.get("IMPORT_CHECKPOINT_DIR",
+                                      os.path.join(tempfile.gettempdir(), "mem0-import-checkpoints")),
+    )
@@ -0,0 +1,248 @@
+"""
+Record/replay cassettes of Mem0 traffic
+RecordingClient wraps the real MemoryClient and appends every call (op,
+arguments, result or error, latency) to a gzip'd NDJSON cassette, redacted
+on the way out. ReplayClient serves a cassette back at recorded or scaled
+latency so caching and indexing work can be benchmarked on the real query
+mix without a network. Both are selected in memory_client_from_env.
+"""
+
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from mem0_standin import ResultList, StandInAPIError
+
+CASSETTE_VERSION = 1
+RECORDED_OPS = ("add", "search", "get_all", "get", "delete")
+
+ID_KEYS = {"user_id", "agent_id", "run_id", "client", "device"}
+TEXT_KEYS = {"memory", "content", "query", "message", "text", "messages"}
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+PHONE_RE = re.compile(r"\+?\d[\d\s().-]{7,}\d")
+WORD_RE = re.compile(r"\w+")
+
+
+class Redactor:
+    """
+    Redaction modes:
+      none  keep everything
+      pii   hash scope IDs, mask emails and phone numbers (default)
+      text  pii, plus every word of memory/query text becomes a stable salted
+            token, so result sizes and query/result word overlap survive
+    """
+
+    def __init__(self, mode: str = "pii", salt: str = ""):
+        if mode not in ("none", "pii", "text"):
+            raise ValueError(f"Unknown redaction mode: {mode}")
+        self.mode = mode
+        self.salt = salt
+
+    def _hash(self, value: str, length: int = 12) -> str:
+        return hashlib.sha256(f"{self.salt}:{value}".encode()).hexdigest()[:length]
+
+    def _text(self, value: str) -> str:
+        value = EMAIL_RE.sub("<email>", value)
+        value = PHONE_RE.sub("<phone>", value)
+        if self.mode == "text":
+            value = WORD_RE.sub(lambda m: m.group(0) if m.group(0).startswith(("email", "phone"))
+                                else "w" + self._hash(m.group(0).lower(), 6), value)
+        return value
+
+    def __call__(self, value: Any, key: str = None) -> Any:
+        if self.mode == "none":
+            return value
+        if isinstance(value, dict):
+            return {k: self(v, k) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self(v, key) for v in value]
+        if isinstance(value, str):
+            if key in ID_KEYS:
+                return f"id-{self._hash(value)}"
+            if key in TEXT_KEYS:
+                return self._text(value)
+        return value
+
+
+def call_key(op: str, kwargs: Dict[str, Any]) -> str:
+    return op + " " + json.dumps(kwargs, sort_keys=True, default=str)
+
+
+class RecordingClient:
+    """Pass-through wrapper that writes each backend call to a cassette"""
+
+    def __init__(self, client, path: str, redactor: Redactor = None):
+        self.client = client
+        self.path = path
+        self.redactor = redactor or Redactor()
+        self.recorded = 0
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, "at", encoding="utf-8")
+        self._write({"cassette": CASSETTE_VERSION, "created": datetime.now().isoformat(),
+                     "redact": self.redactor.mode})
+        atexit.register(self.close)
+
+    def _write(self, record: Dict[str, Any]):
+        line = json.dumps(record, separators=(",", ":"), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def __getattr__(self, op: str):
+        target = getattr(self.client, op)
+        if op not in RECORDED_OPS:
+            return target
+
+        def recorded(*args, **kwargs):
+            if args:
+                # MemoryClient positional order: add(messages), search(query), get/delete(memory_id)
+                kwargs = {{"add": "messages", "search": "query"}.get(op, "memory_id"): args[0], **kwargs}
+            started = time.monotonic()
+            record = {"op": op, "kwargs": self.redactor(kwargs)}
+            try:
+                result = target(**kwargs)
+            except Exception as e:
+                record["error"] = {"type": type(e).__name__, "message": self.redactor(str(e), "message"),
+                                   "status_code": getattr(e, "status_code", None)}
+                record["latency_ms"] = round((time.monotonic() - started) * 1000, 3)
+                self._write(record)
+                self.recorded += 1
+                raise
+            record["result"] = self.redactor(result)
+            record["latency_ms"] = round((time.monotonic() - started) * 1000, 3)
+            self._write(record)
+            self.recorded += 1
+            return result
+
+        return recorded
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class ReplayClient:
+    """
+    Serves a cassette: exact (redacted) argument matches first, otherwise the
+    next recorded response for the same op in recording order, so a different
+    workload still sees realistic result sizes and latencies
+    """
+
+    def __init__(self, path: str, latency_scale: float = 1.0, redactor: Redactor = None):
+        self.path = path
+        self.latency_scale = latency_scale
+        self.redactor = redactor
+        self._lock = threading.Lock()
+        self._exact = defaultdict(deque)
+        self._by_op = defaultdict(list)
+        self._cursor = defaultdict(int)
+        self.matched = 0
+        self.fallback = 0
+        self.missing = 0
+
+        for record in self._read(path):
+            if "op" not in record:
+                if self.redactor is None:
+                    self.redactor = Redactor(record.get("redact", "pii"), os.environ.get("MEM0_RECORD_SALT", ""))
+                continue
+            self._exact[call_key(record["op"], record["kwargs"])].append(record)
+            self._by_op[record["op"]].append(record)
+        self.redactor = self.redactor or Redactor("none")
+
+    @staticmethod
+    def _read(path: str):
+        """Yield records, tolerating the truncated tail of a recorder that was killed mid-write"""
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            try:
+                for line in f:
+                    yield json.loads(line)
+            except (EOFError, ValueError):
+                return
+
+    def _next(self, op: str, kwargs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        key = call_key(op, self.redactor(kwargs))
+        with self._lock:
+            exact = self._exact.get(key)
+            if exact:
+                record = exact[0]
+                exact.rotate(-1)
+                self.matched += 1
+                return record
+            records = self._by_op.get(op)
+            if not records:
+                self.missing += 1
+                return None
+            record = records[self._cursor[op] % len(records)]
+            self._cursor[op] += 1
+            self.fallback += 1
+            return record
+
+    def _replay(self, op: str, kwargs: Dict[str, Any]) -> Any:
+        record = self._next(op, kwargs)
+        if record is None:
+            raise StandInAPIError(f"No recorded {op} calls in cassette", 501)
+        if self.latency_scale:
+            time.sleep(record.get("latency_ms", 0) * self.latency_scale / 1000)
+        if "error" in record:
+            error = record["error"]
+            raise StandInAPIError(error["message"], error.get("status_code") or 500)
+        result = record.get("result")
+        return ResultList(result) if isinstance(result, list) else result
+
+    def add(self, messages, **kwargs):
+        return self._replay("add", {"messages": messages, **kwargs})
+
+    def search(self, query: str, **kwargs):
+        return self._replay("search", {"query": query, **kwargs})
+
+    def get_all(self, **kwargs):
+        return self._replay("get_all", kwargs)
+
+    def get(self, memory_id: str):
+        return self._replay("get", {"memory_id": memory_id})
+
+    def delete(self, memory_id: str, **kwargs):
+        return self._replay("delete", {"memory_id": memory_id, **kwargs})
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cassette": self.path,
+            "recorded_calls": {op: len(records) for op, records in self._by_op.items()},
+            "matched": self.matched,
+            "fallback": self.fallback,
+            "missing": self.missing,
+            "latency_scale": self.latency_scale,
+        }
+
+
+def recorder_from_env(client):
+    """
+    MEM0_RECORD         cassette path to append to (unset = no recording)
+    MEM0_RECORD_REDACT  none | pii | text (default pii)
+    MEM0_RECORD_SALT    salt for hashed IDs and words; reuse it when replaying
+    """
+    path = os.environ.get("MEM0_RECORD")
+    if not path or client is None:
+        return client
+    redactor = Redactor(os.environ.get("MEM0_RECORD_REDACT", "pii"), os.environ.get("MEM0_RECORD_SALT", ""))
+    return RecordingClient(client, path, redactor)
+
+
+def replay_from_env() -> ReplayClient:
+    """
+    MEM0_REPLAY_FILE            cassette to serve
+    MEM0_REPLAY_LATENCY_SCALE   multiplier on recorded latency (0 = instant, default 1)
+    """
+    path = os.environ.get("MEM0_REPLAY_FILE")
+    if not path:
+        raise ValueError("MEM0_BACKEND=replay requires MEM0_REPLAY_FILE")
+    return ReplayClient(path, latency_scale=float(os.environ.get("MEM0_REPLAY_LATENCY_SCALE", 1.0)))
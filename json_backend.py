@@ -0,0 +1,88 @@
+"""
+Pluggable JSON encoding for responses, JSON-RPC envelopes and SSE frames
+Uses orjson when it is installed and the stdlib json module otherwise;
+JSON_BACKEND=auto|orjson|stdlib forces a choice. Responses given bytes are
+passed through untouched, so hot paths can encode once and reuse.
+"""
+
+import json
+import os
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _select_backend() -> str:
+    requested = os.environ.get("JSON_BACKEND", "auto").lower()
+    if requested == "stdlib" or (requested == "auto" and orjson is None):
+        return "stdlib"
+    if orjson is None:
+        raise RuntimeError("JSON_BACKEND=orjson but orjson is not installed")
+    return "orjson"
+
+
+BACKEND = _select_backend()
+
+
+def _default(obj: Any) -> Any:
+    """Last resort for values neither encoder knows (mem0 result objects, sets, ...)"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    return str(obj)
+
+
+if BACKEND == "orjson":
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default, option=_OPTIONS)
+
+    def dumps(obj: Any) -> str:
+        return orjson.dumps(obj, default=_default, option=_OPTIONS).decode()
+
+    loads = orjson.loads
+else:
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_default)
+
+    def dumps_bytes(obj: Any) -> bytes:
+        return _encoder.encode(obj).encode()
+
+    def dumps(obj: Any) -> str:
+        return _encoder.encode(obj)
+
+    loads = json.loads
+
+
+def sse_frame(obj: Any, event: str = None) -> str:
+    """One server-sent event carrying obj as JSON"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {dumps(obj)}\n\n"
+
+
+def jsonrpc_raw(request_id: Any, result: bytes) -> bytes:
+    """JSON-RPC success envelope around an already encoded result"""
+    return b'{"jsonrpc":"2.0","id":' + dumps_bytes(request_id) + b',"result":' + result + b"}"
+
+
+async def request_json(request) -> Any:
+    """Parse a request body with the selected backend (JSONDecodeError is a ValueError either way)"""
+    return loads(await request.body())
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by the selected backend; bytes content is sent as-is"""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            return bytes(content)
+        return dumps_bytes(content)
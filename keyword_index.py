@@ -0,0 +1,96 @@
+"""
+Local BM25 keyword index and reciprocal-rank fusion
+Semantic search ranks exact names, projects and numbers poorly; a per-user
+inverted index over memory text (kept by memory_index.UserView) catches
+them, and reciprocal-rank fusion merges both rankings without having to
+calibrate Mem0's scores against BM25's.
+"""
+
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Tuple
+
+TOKEN_RE = re.compile(r"\w+")
+
+# Words that carry no recall signal in spoken queries ("what did I say about ...")
+STOPWORDS = frozenset("""
+a about an and any are as at be been but by can could did do does for from had has have he her him his
+how i if in into is it its me my of on or our she so that the their them then there these they this
+to us was we were what when where which who why will with would you your remember recall tell said say
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS and (len(t) > 1 or t.isdigit())]
+
+
+class BM25Index:
+    """Inverted index of term -> {doc_id: term frequency} with Okapi BM25 scoring"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.lengths: Dict[str, int] = {}
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, doc_id: str, text: str):
+        self.remove(doc_id)
+        terms = Counter(tokenize(text or ""))
+        length = sum(terms.values())
+        self.lengths[doc_id] = length
+        self.total_length += length
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+
+    def remove(self, doc_id: str, text: str = None):
+        """Drop a document; pass its text to touch only its own postings"""
+        length = self.lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        terms = set(tokenize(text)) if text is not None else list(self.postings)
+        for term in terms:
+            docs = self.postings.get(term)
+            if docs and docs.pop(doc_id, None) is not None and not docs:
+                del self.postings[term]
+
+    def search(self, query: str, limit: int) -> List[Tuple[str, float]]:
+        """Top (doc_id, score) pairs, best first"""
+        n = len(self.lengths)
+        if not n:
+            return []
+        average = self.total_length / n or 1.0
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs.items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / average)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[Dict[str, Any]]], limit: int,
+                           k: int = 60) -> List[Dict[str, Any]]:
+    """
+    Merge ranked result lists by sum of 1 / (k + rank); a memory found by
+    several rankers keeps the first list's copy of its record. The same text
+    stored under different ids (e.g. in user and agent scope) counts as one.
+    """
+    fused: Dict[str, float] = {}
+    records: Dict[str, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for rank, record in enumerate(ranking, start=1):
+            key = " ".join(str(record.get("memory") or record.get("id")).lower().split())
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank)
+            records.setdefault(key, record)
+    best = heapq.nlargest(limit, fused.items(), key=lambda item: item[1])
+    return [records[key] for key, _ in best]
@@ -0,0 +1,175 @@
+"""
+Event-loop lag sampler and blocking-call detector
+A loop task measures scheduling lag; a watchdog thread notices when the loop
+stops ticking and captures the stack and endpoint that is holding it
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Dict, List
+
+from metrics import Histogram
+
+# Lag buckets in seconds
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class LoopMonitor:
+    """Samples event-loop lag and records the worst blocking offenders"""
+
+    def __init__(self, interval: float = 0.1, block_threshold: float = 0.1,
+                 max_offenders: int = 50, stack_depth: int = 20):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.max_offenders = max_offenders
+        self.stack_depth = stack_depth
+
+        self.lag = Histogram(LAG_BUCKETS)
+        # Exponentially weighted recent lag, used for admission control
+        self.recent_lag = 0.0
+        self.blocks = 0
+        self.offenders: Dict[tuple, Dict[str, Any]] = {}
+        # asyncio.Task -> "METHOD /path", maintained by LoopMonitorMiddleware
+        self.task_endpoints: Dict[asyncio.Task, str] = {}
+
+        self.loop = None
+        self.loop_thread_id = None
+        self.last_tick = time.monotonic()
+        self._pending = None
+        self._lock = threading.Lock()
+        self._task = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start sampling; must be called from the running event loop"""
+        if self._task is not None:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.last_tick = time.monotonic()
+        self._task = self.loop.create_task(self._sample())
+        threading.Thread(target=self._watchdog, name="loop-watchdog", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _sample(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self.last_tick = now
+            self.lag.observe(lag)
+            self.recent_lag += (lag - self.recent_lag) * 0.3
+            if self._pending is not None:
+                self._finish_block(lag)
+
+    def _watchdog(self):
+        poll = max(0.01, self.block_threshold / 2)
+        while not self._stop.wait(poll):
+            stalled = time.monotonic() - self.last_tick - self.interval
+            if stalled < self.block_threshold or self._pending is not None:
+                continue
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.format_list(traceback.extract_stack(frame, limit=self.stack_depth))
+            with self._lock:
+                self._pending = {
+                    "endpoint": self._current_endpoint(),
+                    "stack": [line.rstrip() for line in stack],
+                }
+
+    def _current_endpoint(self) -> str:
+        task = asyncio.current_task(self.loop) if self.loop else None
+        if task is None:
+            return "<loop callback>"
+        endpoint = self.task_endpoints.get(task)
+        if endpoint:
+            return endpoint
+        coro = task.get_coro()
+        return f"<task {getattr(coro, '__qualname__', task.get_name())}>"
+
+    def _finish_block(self, lag: float):
+        with self._lock:
+            pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        self.blocks += 1
+        # Innermost frame identifies the blocking call site
+        site = pending["stack"][-1].splitlines()[0].strip() if pending["stack"] else "?"
+        key = (pending["endpoint"], site)
+        entry = self.offenders.get(key)
+        if entry is None:
+            if len(self.offenders) >= self.max_offenders:
+                smallest = min(self.offenders, key=lambda k: self.offenders[k]["max_ms"])
+                if self.offenders[smallest]["max_ms"] >= lag * 1000:
+                    return
+                del self.offenders[smallest]
+            entry = self.offenders[key] = {
+                "endpoint": pending["endpoint"],
+                "site": site,
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "stack": pending["stack"],
+            }
+        entry["count"] += 1
+        entry["total_ms"] = round(entry["total_ms"] + lag * 1000, 2)
+        if lag * 1000 >= entry["max_ms"]:
+            entry["max_ms"] = round(lag * 1000, 2)
+            entry["stack"] = pending["stack"]
+
+    def worst_offenders(self, limit: int = 10) -> List[Dict[str, Any]]:
+        ranked = sorted(self.offenders.values(), key=lambda e: e["total_ms"], reverse=True)
+        return ranked[:limit]
+
+    def current_lag(self) -> float:
+        """Smoothed recent lag, or the ongoing stall if the loop is late right now"""
+        if self._task is None:
+            return 0.0
+        return max(self.recent_lag, time.monotonic() - self.last_tick - self.interval)
+
+    def snapshot(self, limit: int = 10) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "interval_s": self.interval,
+            "block_threshold_s": self.block_threshold,
+            "recent_lag_ms": round(self.recent_lag * 1000, 2),
+            "lag": self.lag.snapshot(),
+            "blocks_detected": self.blocks,
+            "worst_offenders": self.worst_offenders(limit),
+        }
+
+
+class LoopMonitorMiddleware:
+    """ASGI middleware recording which endpoint each request task is serving"""
+
+    def __init__(self, app, monitor: LoopMonitor):
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        task = asyncio.current_task()
+        self.monitor.task_endpoints[task] = f"{scope['method']} {scope['path']}"
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.monitor.task_endpoints.pop(task, None)
+
+
+def monitor_from_env() -> LoopMonitor:
+    return LoopMonitor(
+        interval=float(os.environ.get("LOOP_LAG_INTERVAL_S", 0.1)),
+        block_threshold=float(os.environ.get("LOOP_BLOCK_THRESHOLD_S", 0.1)),
+    )
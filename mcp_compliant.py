@@ -5,25 +5,29 @@ Implements Model Context Protocol specification
 """
 
 import os
-import json
 import asyncio
 from datetime import datetime
 from typing import Dict, Any, Optional
 from fastapi import FastAPI, Request, Response, HTTPException
 from fastapi.responses import StreamingResponse, JSONResponse
-from mem0 import MemoryClient
+from json_backend import FastJSONResponse, sse_frame
+from mem0_standin import memory_client_from_env
+from tenancy import TenantMiddleware, UnknownTenant, resolver_from_env
 import uuid
 from pydantic import BaseModel
 
-app = FastAPI(title="Mem0 MCP Server")
-
-# Initialize Mem0
-mem0_client = MemoryClient(
-    api_key=os.environ.get('MEM0_API_KEY', 'm0-IQGqsMWB42QhWG77RuzpSdNcyEppgRHeBhz0KcNu')
-)
+app = FastAPI(title="Mem0 MCP Server", default_response_class=FastJSONResponse)
 
 USER_ID = 'quinn_may'
 
+# Per-request tenant from token, X-User-Id or the user_id tool argument (TENANT_*)
+tenants = resolver_from_env(USER_ID)
+app.add_middleware(TenantMiddleware, resolver=tenants)
+
+# Initialize Mem0 (MEM0_BACKEND=standin selects the offline stand-in)
+# None without MEM0_API_KEY: tool calls then answer "Memory system not configured"
+mem0_client = memory_client_from_env(os.environ.get('MEM0_API_KEY'), USER_ID)
+
 class MCPRequest(BaseModel):
     jsonrpc: str = "2.0"
     id: Optional[str] = None
@@ -97,6 +101,28 @@ async def mcp_handler(request: MCPRequest):
         tool_name = params.get("name")
         arguments = params.get("arguments", {})
         
+        try:
+            user_id = tenants.override(arguments.get("user_id"))
+        except UnknownTenant as e:
+            return {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "error": {
+                    "code": -32602,
+                    "message": str(e)
+                }
+            }
+        
+        if not mem0_client:
+            return {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "error": {
+                    "code": -32603,
+                    "message": "Memory system not configured"
+                }
+            }
+        
         if tool_name == "store_memory":
             content = arguments.get("content")
             if not content:
@@ -119,7 +145,7 @@ async def mcp_handler(request: MCPRequest):
             
             result = mem0_client.add(
                 messages=[{"role": "user", "content": content}],
-                user_id=USER_ID,
+                user_id=user_id,
                 metadata=metadata
             )
             
@@ -151,7 +177,7 @@ async def mcp_handler(request: MCPRequest):
             # Search Mem0
             results = mem0_client.search(
                 query=query,
-                user_id=USER_ID,
+                user_id=user_id,
                 limit=5
             )
             
@@ -200,7 +226,7 @@ async def sse_handler(request: Request):
     async def event_stream():
         # Send initial connection
         yield f"event: open\n"
-        yield f"data: {json.dumps({'type': 'open'})}\n\n"
+        yield sse_frame({'type': 'open'})
         
         # Keep alive
         while True:
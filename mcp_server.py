@@ -5,23 +5,19 @@ Implements the Model Context Protocol for tool communication
 """
 
 import os
-import json
 import asyncio
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from fastapi import FastAPI, Request, Response
 from fastapi.responses import StreamingResponse
-from mem0 import MemoryClient
+from json_backend import FastJSONResponse, request_json, sse_frame
+from mem0_standin import memory_client_from_env
+from tenancy import TenantMiddleware, UnknownTenant, resolver_from_env
 import uuid
 from pydantic import BaseModel
 
 # Initialize FastAPI
-app = FastAPI(title="Mem0 MCP Server")
-
-# Initialize Mem0 client
-mem0_client = MemoryClient(
-    api_key=os.environ.get('MEM0_API_KEY', 'm0-IQGqsMWB42QhWG77RuzpSdNcyEppgRHeBhz0KcNu')
-)
+app = FastAPI(title="Mem0 MCP Server", default_response_class=FastJSONResponse)
 
 # Configuration
 USER_ID = os.environ.get('USER_ID', 'quinn_may')
@@ -29,6 +25,14 @@ CLIENT = 'ElevenLabs'
 PROJECT_TYPE = 'voice_agent'
 DEVICE = 'mcp_server'
 
+# Per-request tenant from token, X-User-Id or the user_id tool argument (TENANT_*)
+tenants = resolver_from_env(USER_ID)
+app.add_middleware(TenantMiddleware, resolver=tenants)
+
+# Initialize Mem0 client (MEM0_BACKEND=standin selects the offline stand-in)
+# None without MEM0_API_KEY: tool calls then answer "Memory system not configured"
+mem0_client = memory_client_from_env(os.environ.get('MEM0_API_KEY'), USER_ID)
+
 class MCPRequest(BaseModel):
     jsonrpc: str = "2.0"
     method: str
@@ -131,6 +135,28 @@ async def handle_tool_call(params: dict, request_id: str) -> dict:
     tool_name = params.get("name")
     arguments = params.get("arguments", {})
     
+    try:
+        user_id = tenants.override(arguments.get("user_id"))
+    except UnknownTenant as e:
+        return {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "error": {
+                "code": -32602,
+                "message": str(e)
+            }
+        }
+    
+    if not mem0_client:
+        return {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "error": {
+                "code": -32603,
+                "message": "Memory system not configured"
+            }
+        }
+    
     try:
         if tool_name == "store_memory":
             message = arguments.get("message")
@@ -162,7 +188,7 @@ async def handle_tool_call(params: dict, request_id: str) -> dict:
             
             result = mem0_client.add(
                 messages=[{"role": "user", "content": message}],
-                user_id=USER_ID,
+                user_id=user_id,
                 metadata=metadata
             )
             
@@ -197,7 +223,7 @@ async def handle_tool_call(params: dict, request_id: str) -> dict:
             # Search memories
             results = mem0_client.search(
                 query=query,
-                user_id=USER_ID,
+                user_id=user_id,
                 limit=limit
             )
             
@@ -225,7 +251,7 @@ async def handle_tool_call(params: dict, request_id: str) -> dict:
             
             # Get all memories
             all_memories = mem0_client.get_all(
-                user_id=USER_ID
+                user_id=user_id
             )
             
             # Sort by created_at and get recent ones
@@ -277,7 +303,7 @@ async def handle_tool_call(params: dict, request_id: str) -> dict:
 async def sse_generator(request: Request):
     """Generate SSE events for MCP protocol"""
     # Send initial connection event
-    yield f"data: {json.dumps({'type': 'connection', 'message': 'MCP Server Connected'})}\n\n"
+    yield sse_frame({'type': 'connection', 'message': 'MCP Server Connected'})
     
     # Keep connection alive
     while True:
@@ -287,13 +313,13 @@ async def sse_generator(request: Request):
         
         # Send heartbeat
         await asyncio.sleep(30)
-        yield f"data: {json.dumps({'type': 'heartbeat'})}\n\n"
+        yield sse_frame({'type': 'heartbeat'})
 
 @app.post("/mcp")
 async def mcp_endpoint(request: Request):
     """Main MCP endpoint for ElevenLabs"""
     try:
-        body = await request.json()
+        body = await request_json(request)
         
         # Parse MCP request
         method = body.get("method")
@@ -0,0 +1,309 @@
+"""
+Offline Mem0 stand-in
+In-memory implementation of the MemoryClient calls the servers use
+(add / search / get_all / get / delete) with tunable latency, error rate and
+429 bursts, so the memory path can be tested and benchmarked without a
+MEM0_API_KEY or network. Select it with MEM0_BACKEND=standin.
+"""
+
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+class StandInAPIError(Exception):
+    """Injected backend failure, shaped like an HTTP error from the Mem0 API"""
+
+    def __init__(self, message: str, status_code: int = 500, retry_after: float = None):
+        self.status_code = status_code
+        self.debug_info = {"retry_after": retry_after} if retry_after is not None else {}
+        super().__init__(message)
+
+
+class ResultList(list):
+    """
+    List of results that also answers .get("results"), so callers written
+    against either the list or the {"results": [...]} response shape work
+    """
+
+    def get(self, key, default=None):
+        return self if key == "results" else default
+
+
+class LatencyModel:
+    """
+    Latency spec: "40" (fixed ms), "uniform:20:80", "normal:40:10",
+    "lognormal:40:0.5" (median ms, sigma), optionally followed by
+    "+tail:0.01:2000" to add a 1% chance of a 2000ms stall
+    """
+
+    def __init__(self, spec: str = "0", rng: random.Random = None):
+        self.spec = spec
+        self.rng = rng or random.Random()
+        main, _, tail = spec.partition("+tail:")
+        parts = main.split(":")
+        if len(parts) == 1:
+            self.kind, self.params = "fixed", [float(parts[0] or 0)]
+        else:
+            self.kind, self.params = parts[0], [float(p) for p in parts[1:]]
+        self.tail = [float(p) for p in tail.split(":")] if tail else None
+
+    def sample_ms(self) -> float:
+        p = self.params
+        if self.kind == "fixed":
+            value = p[0]
+        elif self.kind == "uniform":
+            value = self.rng.uniform(p[0], p[1])
+        elif self.kind == "normal":
+            value = self.rng.gauss(p[0], p[1])
+        elif self.kind == "lognormal":
+            value = self.rng.lognormvariate(math.log(max(p[0], 1e-3)), p[1])
+        else:
+            raise ValueError(f"Unknown latency model: {self.kind}")
+        if self.tail and self.rng.random() < self.tail[0]:
+            value += self.tail[1]
+        return max(0.0, value)
+
+
+class StandInMemoryClient:
+    """Thread-safe in-memory Mem0 stand-in; safe to call from worker threads"""
+
+    def __init__(
+        self,
+        latency: str = "0",
+        op_latency: Dict[str, str] = None,
+        error_rate: float = 0.0,
+        burst_every: float = 0.0,
+        burst_duration: float = 0.0,
+        burst_retry_after: float = 1.0,
+        max_concurrency: int = 0,
+        seed: Optional[int] = None,
+    ):
+        self.rng = random.Random(seed)
+        self.latency = LatencyModel(latency, self.rng)
+        self.op_latency = {op: LatencyModel(spec, self.rng) for op, spec in (op_latency or {}).items()}
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_duration = burst_duration
+        self.burst_retry_after = burst_retry_after
+        self.max_concurrency = max_concurrency
+
+        self.memories: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._started = time.monotonic()
+        self.calls = {}
+        self.injected_errors = 0
+        self.injected_429s = 0
+
+    # ----- fault injection -----
+
+    def _enter(self, op: str):
+        with self._lock:
+            self.calls[op] = self.calls.get(op, 0) + 1
+            self._in_flight += 1
+            in_flight = self._in_flight
+            roll = self.rng.random()
+            delay = self.op_latency.get(op, self.latency).sample_ms() / 1000.0
+        try:
+            if self.burst_every and (time.monotonic() - self._started) % self.burst_every < self.burst_duration:
+                self.injected_429s += 1
+                raise StandInAPIError("Rate limit exceeded (burst)", 429, self.burst_retry_after)
+            if self.max_concurrency and in_flight > self.max_concurrency:
+                self.injected_429s += 1
+                raise StandInAPIError("Rate limit exceeded (concurrency)", 429, self.burst_retry_after)
+            if delay:
+                time.sleep(delay)
+            if roll < self.error_rate:
+                self.injected_errors += 1
+                raise StandInAPIError("Injected backend error", 500)
+        except Exception:
+            self._exit()
+            raise
+
+    def _exit(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    # ----- MemoryClient surface -----
+
+    def add(self, messages, user_id: str = None, agent_id: str = None, run_id: str = None,
+            metadata: Dict[str, Any] = None, **kwargs) -> Dict[str, Any]:
+        self._enter("add")
+        try:
+            if isinstance(messages, str):
+                messages = [{"role": "user", "content": messages}]
+            content = "\n".join(m.get("content", "") for m in messages if m.get("role", "user") == "user")
+            now = datetime.now().isoformat()
+            record = {
+                "id": str(uuid.uuid4()),
+                "memory": content,
+                "user_id": user_id,
+                "agent_id": agent_id,
+                "run_id": run_id,
+                "metadata": dict(metadata or {}),
+                "categories": None,
+                "created_at": now,
+                "updated_at": now,
+            }
+            with self._lock:
+                self.memories[record["id"]] = record
+            event = {"id": record["id"], "memory": content, "event": "ADD"}
+            return {"id": record["id"], "results": [event]}
+        finally:
+            self._exit()
+
+    def search(self, query: str, user_id: str = None, agent_id: str = None, run_id: str = None,
+               limit: int = 10, filters: Dict[str, Any] = None, **kwargs) -> List[Dict[str, Any]]:
+        self._enter("search")
+        try:
+            terms = set(TOKEN_RE.findall(query.lower()))
+            scored = []
+            for record in self._scoped(user_id, agent_id, run_id, filters):
+                words = TOKEN_RE.findall(record["memory"].lower())
+                if not words:
+                    continue
+                overlap = sum(1 for w in words if w in terms)
+                if overlap:
+                    scored.append((overlap / math.sqrt(len(words)), record))
+            scored.sort(key=lambda pair: (pair[0], pair[1]["created_at"]), reverse=True)
+            return ResultList({**record, "score": round(score, 4)} for score, record in scored[:limit])
+        finally:
+            self._exit()
+
+    def get_all(self, user_id: str = None, agent_id: str = None, run_id: str = None,
+                filters: Dict[str, Any] = None, page: int = None, page_size: int = None,
+                **kwargs) -> List[Dict[str, Any]]:
+        self._enter("get_all")
+        try:
+            records = sorted(self._scoped(user_id, agent_id, run_id, filters),
+                             key=lambda r: r["created_at"], reverse=True)
+            if page is not None and page_size:
+                start = (int(page) - 1) * int(page_size)
+                records = records[start:start + int(page_size)]
+            return ResultList(dict(r) for r in records)
+        finally:
+            self._exit()
+
+    def get(self, memory_id: str) -> Dict[str, Any]:
+        self._enter("get")
+        try:
+            with self._lock:
+                record = self.memories.get(memory_id)
+            if record is None:
+                raise StandInAPIError(f"Memory {memory_id} not found", 404)
+            return dict(record)
+        finally:
+            self._exit()
+
+    def delete(self, memory_id: str, **kwargs) -> Dict[str, Any]:
+        self._enter("delete")
+        try:
+            with self._lock:
+                removed = self.memories.pop(memory_id, None)
+            if removed is None:
+                raise StandInAPIError(f"Memory {memory_id} not found", 404)
+            return {"message": "Memory deleted successfully!"}
+        finally:
+            self._exit()
+
+    def _scoped(self, user_id, agent_id, run_id, filters):
+        with self._lock:
+            records = list(self.memories.values())
+        for record in records:
+            if user_id is not None and record["user_id"] != user_id:
+                continue
+            if agent_id is not None and record["agent_id"] != agent_id:
+                continue
+            if run_id is not None and record["run_id"] != run_id:
+                continue
+            if filters and any(record["metadata"].get(k) != v for k, v in filters.items()):
+                continue
+            yield record
+
+    def preload(self, count: int, user_id: str, words: int = 12):
+        """Seed synthetic memories (no latency or faults) for large-result benchmarks"""
+        vocabulary = ("project", "meeting", "coffee", "deadline", "family", "travel", "budget",
+                      "launch", "doctor", "gym", "recipe", "client", "invoice", "birthday")
+        for i in range(count):
+            text = " ".join(self.rng.choice(vocabulary) for _ in range(words))
+            record_id = str(uuid.uuid4())
+            now = datetime.now().isoformat()
+            self.memories[record_id] = {
+                "id": record_id, "memory": f"{text} #{i}", "user_id": user_id, "agent_id": None,
+                "run_id": None, "metadata": {"category": "preload"}, "categories": None,
+                "created_at": now, "updated_at": now,
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memories": len(self.memories),
+            "calls": dict(self.calls),
+            "in_flight": self._in_flight,
+            "injected_errors": self.injected_errors,
+            "injected_429s": self.injected_429s,
+        }
+
+
+def standin_from_env(user_id: str = None) -> StandInMemoryClient:
+    """
+    MEM0_STANDIN_LATENCY_MS       latency spec for every op (see LatencyModel)
+    MEM0_STANDIN_LATENCY_MS_<OP>  per-op override, e.g. MEM0_STANDIN_LATENCY_MS_GET_ALL
+    MEM0_STANDIN_ERROR_RATE       probability of an injected 500
+    MEM0_STANDIN_429_BURST        "every_s:duration_s" windows that answer 429
+    MEM0_STANDIN_MAX_CONCURRENCY  answer 429 above this many concurrent calls (0 = off)
+    MEM0_STANDIN_SEED             RNG seed for reproducible runs
+    MEM0_STANDIN_PRELOAD          synthetic memories to seed for user_id
+    """
+    env = os.environ.get
+    op_latency = {}
+    for op in ("add", "search", "get_all", "get", "delete"):
+        spec = env(f"MEM0_STANDIN_LATENCY_MS_{op.upper()}")
+        if spec:
+            op_latency[op] = spec
+    burst_every, burst_duration = 0.0, 0.0
+    if env("MEM0_STANDIN_429_BURST"):
+        burst_every, burst_duration = (float(x) for x in env("MEM0_STANDIN_429_BURST").split(":"))
+    seed = env("MEM0_STANDIN_SEED")
+
+    client = StandInMemoryClient(
+        latency=env("MEM0_STANDIN_LATENCY_MS", "0"),
+        op_latency=op_latency,
+        error_rate=float(env("MEM0_STANDIN_ERROR_RATE", 0)),
+        burst_every=burst_every,
+        burst_duration=burst_duration,
+        max_concurrency=int(env("MEM0_STANDIN_MAX_CONCURRENCY", 0)),
+        seed=int(seed) if seed else None,
+    )
+    preload = int(env("MEM0_STANDIN_PRELOAD", 0))
+    if preload and user_id:
+        client.preload(preload, user_id)
+    return client
+
+
+def memory_client_from_env(api_key: Optional[str], user_id: str = None):
+    """
+    Backend selected by MEM0_BACKEND: "standin" for the local stand-in,
+    "replay" to serve a recorded cassette, anything else for the hosted Mem0
+    API (None when no api_key is given). MEM0_RECORD wraps the chosen client
+    in a cassette recorder (see cassette.py).
+    """
+    from cassette import recorder_from_env, replay_from_env
+
+    backend = os.environ.get("MEM0_BACKEND", "mem0").lower()
+    if backend == "replay":
+        return replay_from_env()
+    if backend == "standin":
+        return recorder_from_env(standin_from_env(user_id))
+    if not api_key:
+        return None
+    from mem0 import MemoryClient
+    return recorder_from_env(MemoryClient(api_key=api_key))
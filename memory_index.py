@@ -0,0 +1,420 @@
+"""
+Local indexed view of each user's memories
+Loaded once from Mem0 with a single get_all, kept current from the memory
+layer's successful add/delete calls, and re-synced after a TTL to pick up
+writes made by other processes. Pages are served newest-first by keyset
+cursor, so a page costs O(log n + page size) however deep the caller scrolls.
+
+Secondary indexes bucket each user's memories by metadata day (which also
+answers month and year ranges, being string prefixes of it) and by category,
+so date-range and category recall never scans the whole view. A BM25
+keyword index over memory text (keyword_index.py) backs hybrid search.
+"""
+
+import asyncio
+import base64
+import bisect
+import heapq
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from keyword_index import BM25Index
+from metrics import record_cache
+from scheduling import BULK
+
+
+class InvalidCursor(ValueError):
+    """Cursor that was not produced by this index"""
+
+
+class InvalidDate(ValueError):
+    """Date filter that is not YYYY, YYYY-MM, YYYY-MM-DD, today or yesterday"""
+
+
+DATE_RE = re.compile(r"^\d{4}(-\d{2}(-\d{2})?)?$")
+
+
+def resolve_date(value: Optional[str]) -> Optional[str]:
+    """Normalize a date filter to a YYYY[-MM[-DD]] prefix of the day metadata"""
+    if not value:
+        return None
+    value = value.strip().lower()
+    if value in ("today", "yesterday"):
+        day = datetime.now() - timedelta(days=1 if value == "yesterday" else 0)
+        return day.strftime("%Y-%m-%d")
+    if not DATE_RE.match(value):
+        raise InvalidDate(f"Invalid date: {value!r} (use YYYY, YYYY-MM or YYYY-MM-DD)")
+    return value
+
+
+def encode_cursor(key: Tuple[str, str]) -> str:
+    raw = json.dumps({"v": 1, "c": key[0], "i": key[1]}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return data["c"], data["i"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+
+
+def encode_offset(offset: int) -> str:
+    raw = json.dumps({"v": 1, "o": offset}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_offset(cursor: str) -> int:
+    """Offset of an export cursor (see MemoryIndex.iter_pages)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        offset = json.loads(raw)["o"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+    if not isinstance(offset, int) or offset < 0:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}")
+    return offset
+
+
+def result_list(response: Any) -> List[Dict[str, Any]]:
+    """Memory list from either the list or the {"results": [...]} response shape"""
+    if isinstance(response, dict):
+        return response.get("results") or []
+    return list(response or [])
+
+
+def _utc(value: Any) -> Any:
+    """
+    created_at as UTC ISO 8601, so keys from Mem0 (any offset) and from local
+    writes sort together; naive stamps are taken as local time
+    """
+    if not isinstance(value, str) or not value:
+        return value
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(timezone.utc).isoformat()
+    except ValueError:
+        return value
+
+
+def _insort(buckets: Dict[str, List[Tuple[str, str]]], name: Optional[str], key: Tuple[str, str]):
+    if name is not None:
+        bisect.insort(buckets.setdefault(name, []), key)
+
+
+def _discard(buckets: Dict[str, List[Tuple[str, str]]], name: Optional[str], key: Tuple[str, str]):
+    keys = buckets.get(name)
+    if keys is None:
+        return
+    i = bisect.bisect_left(keys, key)
+    if i < len(keys) and keys[i] == key:
+        del keys[i]
+    if not keys:
+        del buckets[name]
+
+
+class UserView:
+    """
+    One user's memories: records by id plus keys sorted by (created_at, id),
+    overall and per day / per category bucket, and a keyword index of their text
+    """
+
+    def __init__(self):
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self.keys: List[Tuple[str, str]] = []
+        self.by_day: Dict[str, List[Tuple[str, str]]] = {}
+        self.by_category: Dict[str, List[Tuple[str, str]]] = {}
+        self.days: List[str] = []
+        self.text = BM25Index()
+        self.loaded_at = 0.0
+        self.stale = True
+        self.lock = asyncio.Lock()
+
+    @staticmethod
+    def key(record: Dict[str, Any]) -> Tuple[str, str]:
+        return record.get("created_at") or "", record["id"]
+
+    @staticmethod
+    def day(record: Dict[str, Any]) -> Optional[str]:
+        """The day bucket: the day metadata every write path stamps, else the created_at date"""
+        day = (record.get("metadata") or {}).get("day") or (record.get("created_at") or "")[:10]
+        return str(day) if day else None
+
+    @staticmethod
+    def category(record: Dict[str, Any]) -> Optional[str]:
+        category = (record.get("metadata") or {}).get("category")
+        return str(category) if category is not None else None
+
+    def load(self, records: List[Dict[str, Any]]):
+        self.records = {r["id"]: r for r in records if r.get("id")}
+        for record in self.records.values():
+            if record.get("created_at"):
+                record["created_at"] = _utc(record["created_at"])
+        self.keys = sorted(self.key(r) for r in self.records.values())
+        self.by_day, self.by_category = {}, {}
+        self.text = BM25Index()
+        for key in self.keys:
+            record = self.records[key[1]]
+            self.text.add(record["id"], record.get("memory"))
+            for buckets, name in ((self.by_day, self.day(record)), (self.by_category, self.category(record))):
+                if name is not None:
+                    buckets.setdefault(name, []).append(key)
+        self.days = sorted(self.by_day)
+        self.loaded_at = time.monotonic()
+        self.stale = False
+
+    def put(self, record: Dict[str, Any]):
+        self.remove(record["id"])
+        if record.get("created_at"):
+            record["created_at"] = _utc(record["created_at"])
+        self.records[record["id"]] = record
+        key = self.key(record)
+        bisect.insort(self.keys, key)
+        day = self.day(record)
+        if day is not None and day not in self.by_day:
+            bisect.insort(self.days, day)
+        _insort(self.by_day, day, key)
+        _insort(self.by_category, self.category(record), key)
+        self.text.add(record["id"], record.get("memory"))
+
+    def remove(self, memory_id: str) -> bool:
+        record = self.records.pop(memory_id, None)
+        if record is None:
+            return False
+        key = self.key(record)
+        i = bisect.bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            del self.keys[i]
+        day = self.day(record)
+        _discard(self.by_day, day, key)
+        if day is not None and day not in self.by_day:
+            i = bisect.bisect_left(self.days, day)
+            if i < len(self.days) and self.days[i] == day:
+                del self.days[i]
+        _discard(self.by_category, self.category(record), key)
+        self.text.remove(memory_id, record.get("memory") or "")
+        return True
+
+    def _filtered_keys(self, category: str = None, date_from: str = None,
+                       date_to: str = None) -> List[Tuple[str, str]]:
+        """Sorted keys matching the filters, read from the smallest bucket set"""
+        if not (date_from or date_to):
+            return self.by_category.get(category, []) if category else self.keys
+        # Dates are prefixes, so "2026-10" to "2026-10" covers every day of that month
+        lo = bisect.bisect_left(self.days, date_from) if date_from else 0
+        hi = bisect.bisect_left(self.days, date_to + "\uffff") if date_to else len(self.days)
+        buckets = [self.by_day[day] for day in self.days[lo:hi]]
+        if not buckets:
+            return []
+        keys = buckets[0] if len(buckets) == 1 else list(heapq.merge(*buckets))
+        if category:
+            keys = [k for k in keys if self.category(self.records[k[1]]) == category]
+        return keys
+
+    @staticmethod
+    def _page_keys(all_keys: List[Tuple[str, str]], cursor: Optional[str], limit: int):
+        end = len(all_keys)
+        if cursor:
+            end = bisect.bisect_left(all_keys, decode_cursor(cursor))
+        start = max(0, end - limit)
+        keys = all_keys[start:end][::-1]
+        return keys, encode_cursor(keys[-1]) if start > 0 and keys else None
+
+    def page(self, cursor: Optional[str], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Newest first, starting just after the cursor"""
+        keys, next_cursor = self._page_keys(self.keys, cursor, limit)
+        return [self.records[k[1]] for k in keys], next_cursor
+
+    def query(self, cursor: Optional[str], limit: int, category: str = None, date_from: str = None,
+              date_to: str = None) -> Tuple[List[Dict[str, Any]], Optional[str], int]:
+        """Like page(), restricted to a category and/or day range; also returns the match count"""
+        all_keys = self._filtered_keys(category, date_from, date_to)
+        keys, next_cursor = self._page_keys(all_keys, cursor, limit)
+        return [self.records[k[1]] for k in keys], next_cursor, len(all_keys)
+
+
+class MemoryIndex:
+    """Per-user local views over the memory layer; see module docstring"""
+
+    def __init__(self, memory, ttl: float = 300.0, max_users: int = 1000):
+        self.memory = memory
+        self.ttl = ttl
+        self.max_users = max_users
+        # One shard per tenant, least recently used first
+        self.views: "OrderedDict[str, UserView]" = OrderedDict()
+        self.syncs = 0
+        self.evictions = 0
+        self._warming: Dict[str, asyncio.Task] = {}
+
+    def _view(self, user_id: str) -> UserView:
+        view = self.views.get(user_id)
+        if view is None:
+            view = self.views[user_id] = UserView()
+            self._evict()
+        else:
+            self.views.move_to_end(user_id)
+        return view
+
+    def _evict(self):
+        """Drop the least recently used tenants' views beyond max_users (they reload on demand)"""
+        for user_id in list(self.views):
+            if len(self.views) <= self.max_users:
+                return
+            if not self.views[user_id].lock.locked():
+                del self.views[user_id]
+                self.evictions += 1
+
+    async def view(self, user_id: str) -> UserView:
+        """The user's view, (re)loaded from Mem0 when missing, stale or past the TTL"""
+        view = self._view(user_id)
+        fresh = not view.stale and time.monotonic() - view.loaded_at < self.ttl
+        record_cache("memory_index", fresh)
+        if not fresh:
+            async with view.lock:
+                # Concurrent first readers share one download
+                if view.stale or time.monotonic() - view.loaded_at >= self.ttl:
+                    response = await self.memory.get_all(workload=BULK, user_id=user_id)
+                    view.load(result_list(response))
+                    self.syncs += 1
+        return view
+
+    async def page(self, user_id: str, cursor: str = None, limit: int = 10, category: str = None,
+                   date_from: str = None, date_to: str = None):
+        """
+        (records, next_cursor, total) for one page of the user's memories,
+        optionally only one category and/or a date range (see resolve_date)
+        """
+        date_from, date_to = resolve_date(date_from), resolve_date(date_to)
+        view = await self.view(user_id)
+        return view.query(cursor, limit, category, date_from, date_to)
+
+    def warm(self, user_id: str):
+        """Load or refresh the user's view in the background"""
+        if user_id in self._warming:
+            return
+
+        async def load():
+            try:
+                await self.view(user_id)
+            except Exception:
+                pass  # the next foreground read retries and surfaces the error
+            finally:
+                self._warming.pop(user_id, None)
+
+        self._warming[user_id] = asyncio.create_task(load())
+
+    def keyword_search(self, user_id: str, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        BM25 matches from the view already in memory, best first. Never waits
+        on Mem0: a missing or expired view is refreshed in the background and
+        this call answers from what is loaded (or nothing) meanwhile.
+        """
+        view = self.views.get(user_id)
+        if view is not None:
+            self.views.move_to_end(user_id)
+        if view is None or view.stale or time.monotonic() - view.loaded_at >= self.ttl:
+            self.warm(user_id)
+        if view is None or not view.loaded_at:
+            return []
+        return [view.records[doc_id] for doc_id, _ in view.text.search(query, limit)]
+
+    async def iter_pages(self, user_id: str, cursor: str = None, page_size: int = 500):
+        """
+        Yield (record, cursor) pairs newest first, paging Mem0 itself rather
+        than the local view so an export never holds more than one page; each
+        cursor is an offset that resumes just after its record. Memories added
+        or deleted meanwhile shift the offsets, so a resumed export may repeat
+        or miss a few of them.
+        """
+        offset = decode_offset(cursor) if cursor else 0
+        page, skip = offset // page_size + 1, offset % page_size
+        while True:
+            records = result_list(await self.memory.get_all(workload=BULK, user_id=user_id,
+                                                            page=page, page_size=page_size))
+            for record in records[skip:]:
+                offset += 1
+                yield record, encode_offset(offset)
+            if len(records) < page_size:
+                return
+            page, skip = page + 1, 0
+
+    def observe(self, op: str, kwargs: Dict[str, Any], result: Any):
+        """Memory-layer listener: apply a successful write to the loaded views"""
+        if op == "delete":
+            for view in self.views.values():
+                view.remove(kwargs.get("memory_id"))
+            return
+        if op != "add":
+            return
+        user_id = kwargs.get("user_id")
+        view = self.views.get(user_id)
+        if view is None or view.stale:
+            return
+
+        events = result_list(result)
+        if isinstance(result, dict) and result.get("id") and not any(e.get("id") == result["id"] for e in events):
+            events = [{"id": result["id"], "event": "ADD"}] + events
+        if not events:
+            # Queued / asynchronous add: we cannot know the new IDs, so reload on next read
+            view.stale = True
+            return
+
+        messages = kwargs.get("messages")
+        if isinstance(messages, str):
+            content = messages
+        else:
+            content = "\n".join(m.get("content", "") for m in messages or [] if m.get("role", "user") == "user")
+        now = datetime.now(timezone.utc).isoformat()
+        for event in events:
+            if event.get("event") == "DELETE":
+                view.remove(event.get("id"))
+            elif event.get("id") and event.get("event", "ADD") in ("ADD", "UPDATE"):
+                previous = view.records.get(event["id"], {})
+                view.put({
+                    "id": event["id"],
+                    "memory": event.get("memory") or content,
+                    "user_id": user_id,
+                    "agent_id": kwargs.get("agent_id"),
+                    "run_id": kwargs.get("run_id"),
+                    "metadata": dict(kwargs.get("metadata") or {}),
+                    "categories": None,
+                    "created_at": previous.get("created_at", now),
+                    "updated_at": now,
+                })
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "ttl_s": self.ttl,
+            "max_users": self.max_users,
+            "syncs": self.syncs,
+            "evictions": self.evictions,
+            "users": {
+                user_id: {"memories": len(view.keys), "days": len(view.days), "terms": len(view.text.postings),
+                          "categories": {c: len(keys) for c, keys in view.by_category.items()},
+                          "stale": view.stale,
+                          "age_s": round(time.monotonic() - view.loaded_at, 1) if view.loaded_at else None}
+                for user_id, view in self.views.items()
+            },
+        }
+
+
+def index_from_env(memory) -> Optional[MemoryIndex]:
+    """
+    MEMORY_INDEX_TTL_S        seconds before a view is re-synced from Mem0 (default 300)
+    MEMORY_INDEX_MAX_USERS    tenant views kept in memory, least recently used evicted (default 1000)
+    """
+    if memory is None:
+        return None
+    index = MemoryIndex(
+        memory,
+        ttl=float(os.environ.get("MEMORY_INDEX_TTL_S", 300)),
+        max_users=int(os.environ.get("MEMORY_INDEX_MAX_USERS", 1000)),
+    )
+    memory.listeners.append(index.observe)
+    return index
@@ -0,0 +1,173 @@
+"""
+Async memory layer in front of the Mem0 client
+Every handler in app.py goes through here instead of calling mem0_client directly.
+Call path: workload bulkhead -> hedger -> adaptive limiter (by priority)
+-> circuit breaker -> worker thread
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict
+
+from metrics import MEM0_LATENCY
+from tracing import tracer
+from resilience import AdaptiveLimiter, CircuitBreaker, Hedger, error_status, rate_limit_retry_after
+from scheduling import PriorityScheduler
+
+# Operations that are safe to send twice
+IDEMPOTENT_READS = ("search", "get_all")
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.environ.get(name, default))
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+
+class MemoryLayer:
+    """Runs blocking Mem0 calls off the event loop behind a limiter and circuit breaker, hedging reads"""
+
+    def __init__(self, client, breaker: CircuitBreaker = None, hedged_ops=None, limiter: AdaptiveLimiter = None,
+                 scheduler: PriorityScheduler = None):
+        self.client = client
+        self.scheduler = scheduler or PriorityScheduler()
+        self.limiter = limiter or AdaptiveLimiter(
+            "mem0",
+            initial_limit=_env_int("MEM0_CONCURRENCY_INITIAL", 8),
+            min_limit=_env_int("MEM0_CONCURRENCY_MIN", 1),
+            max_limit=_env_int("MEM0_CONCURRENCY_MAX", 64),
+            max_queue=_env_int("MEM0_QUEUE_MAX", 1000),
+            queue_timeout=_env_float("MEM0_QUEUE_TIMEOUT_S", 30.0),
+        )
+        self.rate_limit_retries = _env_int("MEM0_RATE_LIMIT_RETRIES", 2)
+        self.breaker = breaker or CircuitBreaker(
+            "mem0",
+            window_size=_env_int("MEM0_BREAKER_WINDOW", 100),
+            min_calls=_env_int("MEM0_BREAKER_MIN_CALLS", 10),
+            failure_rate=_env_float("MEM0_BREAKER_FAILURE_RATE", 0.5),
+            slow_call_threshold=_env_float("MEM0_BREAKER_SLOW_CALL_S", 3.0),
+            slow_call_rate=_env_float("MEM0_BREAKER_SLOW_CALL_RATE", 0.8),
+            reset_timeout=_env_float("MEM0_BREAKER_RESET_S", 30.0),
+        )
+        if hedged_ops is None:
+            hedged_ops = [op.strip() for op in os.environ.get("MEM0_HEDGE_OPS", "search").split(",") if op.strip()]
+        self.hedgers = {
+            op: Hedger(op, max_delay=_env_float("MEM0_HEDGE_MAX_DELAY_S", 2.0))
+            for op in hedged_ops if op in IDEMPOTENT_READS
+        }
+        # Called as listener(op, kwargs, result) after every successful call (local indexes)
+        self.listeners = []
+
+    async def _attempt(self, op: str, args: tuple, kwargs: dict, priority: int = 0) -> Any:
+        """
+        Single logical backend call: waits for a limiter slot, is guarded by
+        the breaker, and is re-queued behind Retry-After when rate limited
+        """
+        for attempt in range(self.rate_limit_retries + 1):
+            await self.limiter.acquire(priority)
+            try:
+                self.breaker.allow()
+            except Exception:
+                self.limiter.release()
+                raise
+
+            started = time.monotonic()
+            with tracer.span("mem0.request", op=op, attempt=attempt):
+                call = asyncio.ensure_future(asyncio.to_thread(getattr(self.client, op), *args, **kwargs))
+                try:
+                    await asyncio.shield(call)
+                except asyncio.CancelledError:
+                    if not call.done():
+                        # Losing hedge or abandoned request: the worker thread is still talking to
+                        # Mem0, so its limiter slot and breaker outcome are settled when it finishes
+                        call.add_done_callback(lambda done: self._settle(op, done, started))
+                        raise
+                except Exception:
+                    pass
+
+            retry_after = self._settle(op, call, started)
+            error = call.exception()
+            if error is None:
+                return call.result()
+            if retry_after is None or attempt == self.rate_limit_retries:
+                raise error
+
+    def _settle(self, op: str, call: asyncio.Future, started: float):
+        """
+        Release the limiter slot and record the breaker outcome of a finished
+        backend call; returns Retry-After seconds when it was rate limited
+        """
+        latency = time.monotonic() - started
+        error = call.exception()
+        if error is None:
+            MEM0_LATENCY.observe(latency, op, "ok")
+            self.limiter.release(latency)
+            self.breaker.record_success(latency)
+            return None
+        retry_after = rate_limit_retry_after(error)
+        if retry_after is None:
+            MEM0_LATENCY.observe(latency, op, "error")
+            self.limiter.release(latency)
+            status = error_status(error)
+            if (status is not None and 400 <= status < 500) or isinstance(error, (ValueError, TypeError)):
+                # Bad ids and bad requests say nothing about backend health
+                self.breaker.record_neutral()
+            else:
+                self.breaker.record_failure(latency)
+            return None
+        MEM0_LATENCY.observe(latency, op, "rate_limited")
+        self.limiter.release(rate_limited_for=retry_after)
+        self.breaker.record_neutral()
+        return retry_after
+
+    async def call(self, op: str, *args, workload: str = None, tenant: str = None, **kwargs) -> Any:
+        """
+        Run a backend operation in its workload class (see scheduling.py);
+        tenant defaults to the call's user_id / agent_id (pass it for
+        id-addressed ops such as delete)
+        """
+        workload = self.scheduler.classify(op, workload)
+        priority = self.scheduler.priority(workload)
+        # Tenants share each workload pool round-robin (see scheduling.Bulkhead)
+        tenant = tenant or kwargs.get("user_id") or kwargs.get("agent_id") or ""
+        with tracer.span(f"mem0.{op}", workload=workload):
+            async with self.scheduler.slot(workload, tenant):
+                hedger = self.hedgers.get(op)
+                if hedger is None:
+                    result = await self._attempt(op, args, kwargs, priority)
+                else:
+                    result = await hedger.run(lambda: self._attempt(op, args, kwargs, priority))
+        for listener in self.listeners:
+            listener(op, kwargs, result)
+        return result
+
+    async def add(self, workload: str = None, **kwargs) -> Any:
+        return await self.call("add", workload=workload, **kwargs)
+
+    async def search(self, workload: str = None, **kwargs) -> Any:
+        return await self.call("search", workload=workload, **kwargs)
+
+    async def get_all(self, workload: str = None, **kwargs) -> Any:
+        return await self.call("get_all", workload=workload, **kwargs)
+
+    async def get(self, workload: str = None, **kwargs) -> Any:
+        return await self.call("get", workload=workload, **kwargs)
+
+    async def delete(self, workload: str = None, **kwargs) -> Any:
+        return await self.call("delete", workload=workload, **kwargs)
+
+    @property
+    def queue_depth(self) -> int:
+        """Calls waiting for a workload slot or a Mem0 concurrency slot"""
+        return self.scheduler.queue_depth + self.limiter.queue_depth
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limiter": self.limiter.snapshot(),
+            "workloads": self.scheduler.snapshot(),
+            "breaker": self.breaker.snapshot(),
+            "hedging": {op: h.snapshot() for op, h in self.hedgers.items()},
+        }
@@ -0,0 +1,248 @@
+"""
+Lightweight metric primitives and the process-wide registry behind /metrics
+Counters and histograms are plain list/dict increments (no locks) so they can
+sit on the hot path; rendering to the Prometheus text format happens on scrape
+"""
+
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+# Latency buckets in seconds, upper bounds (le)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is a bisect plus two increments"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # One extra slot for +Inf
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative = 0
+        buckets = {}
+        for bound, n in zip(self.buckets, self.counts):
+            cumulative += n
+            buckets[f"le_{bound}"] = cumulative
+        buckets["le_inf"] = self.count
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "max": round(self.max, 6),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class CounterFamily:
+    """Monotonic counters keyed by label values"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def get(self, *labels) -> float:
+        return self.values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in list(self.values.items())]
+
+
+class HistogramFamily:
+    """Fixed-bucket histograms keyed by label values"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.children: Dict[tuple, Histogram] = {}
+
+    def labels(self, *labels) -> Histogram:
+        child = self.children.get(labels)
+        if child is None:
+            child = self.children[labels] = Histogram(self.buckets)
+        return child
+
+    def observe(self, value: float, *labels):
+        self.labels(*labels).observe(value)
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, h in list(self.children.items()):
+            cumulative = 0
+            for bound, n in zip(h.buckets, h.counts):
+                cumulative += n
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {h.count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {h.sum}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {h.count}")
+        return lines
+
+
+class GaugeFunc:
+    """Gauge read from a callback at scrape time; the callback may return a number or {labels: value}"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, fn: Callable[[], Any], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+
+    def render(self) -> List[str]:
+        value = self.fn()
+        if isinstance(value, dict):
+            return [f"{self.name}{_labels(self.labelnames, k if isinstance(k, tuple) else (k,))} {v}"
+                    for k, v in value.items()]
+        return [f"{self.name} {value}"]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labelnames=()) -> CounterFamily:
+        return self.metrics.get(name) or self.register(CounterFamily(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS) -> HistogramFamily:
+        return self.metrics.get(name) or self.register(HistogramFamily(name, help_text, labelnames, buckets))
+
+    def gauge(self, name, help_text, fn, labelnames=()) -> GaugeFunc:
+        return self.register(GaugeFunc(name, help_text, fn, labelnames))
+
+    def render(self) -> str:
+        out = []
+        for metric in list(self.metrics.values()):
+            try:
+                lines = metric.render()
+            except Exception:
+                continue
+            out.append(f"# HELP {metric.name} {metric.help}")
+            out.append(f"# TYPE {metric.name} {metric.kind}")
+            out.extend(lines)
+        return "\n".join(out) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests by route, method and status", ("route", "method", "status"))
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route (streams excluded)", ("route", "method"))
+TOOL_CALLS = REGISTRY.counter(
+    "tool_calls_total", "MCP / webhook tool calls by transport, tool and result code", ("transport", "tool", "code"))
+TOOL_LATENCY = REGISTRY.histogram(
+    "tool_call_duration_seconds", "MCP / webhook tool call latency", ("transport", "tool"))
+MEM0_LATENCY = REGISTRY.histogram(
+    "mem0_call_duration_seconds", "Mem0 backend call latency by operation and outcome", ("op", "outcome"))
+SSE_QUEUE_LAG = REGISTRY.histogram(
+    "sse_queue_lag_seconds", "Time from broadcast to delivery on an SSE stream",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0))
+CACHE_REQUESTS = REGISTRY.counter(
+    "cache_requests_total", "Local cache / index lookups by cache and result (hit or miss)", ("cache", "result"))
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+def jsonrpc_code(response) -> str:
+    """Result code label for a JSON-RPC response dict ("ok" or the error code)"""
+    if isinstance(response, dict) and response.get("error"):
+        return str(response["error"].get("code", "error"))
+    return "ok"
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting requests and timing non-streaming responses per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        state = {"status": 500, "stream": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                for key, value in message.get("headers", ()):
+                    if key == b"content-type" and value.startswith(b"text/event-stream"):
+                        state["stream"] = True
+                if state["stream"]:
+                    # Record streams as soon as they open; their duration is connection lifetime
+                    _record(scope, state, None)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not state["stream"]:
+                _record(scope, state, time.perf_counter() - started)
+
+
+def _record(scope, state, elapsed):
+    route = scope.get("route")
+    template = getattr(route, "path", None) or "<unmatched>"
+    method = scope["method"]
+    HTTP_REQUESTS.inc(template, method, str(state["status"]))
+    if elapsed is not None:
+        HTTP_LATENCY.observe(elapsed, template, method)
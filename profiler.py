@@ -0,0 +1,131 @@
+"""
+On-demand stack-sampling profiler
+Samples every thread's Python stack at a fixed rate from a background thread
+and folds them into collapsed-stack lines ("a;b;c count") that flamegraph.pl,
+speedscope and inferno read directly
+"""
+
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is running or the cooldown has not elapsed"""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"profiler busy, retry in {retry_after:.0f}s")
+
+
+class SamplingProfiler:
+    """Runs at most one bounded profile at a time, with a cooldown between runs"""
+
+    def __init__(self, max_seconds: float = 30.0, max_hz: int = 250, cooldown: float = 60.0,
+                 max_depth: int = 64):
+        self.max_seconds = max_seconds
+        self.max_hz = max_hz
+        self.cooldown = cooldown
+        self.max_depth = max_depth
+        self.main_thread_id = None
+
+        self._lock = threading.Lock()
+        self._running = False
+        self._last_finished = 0.0
+        self.runs = 0
+        self.rejected = 0
+
+    def reserve(self, seconds: float, hz: int):
+        """Claim the profiler or raise ProfilerBusy; returns the clamped (seconds, hz)"""
+        if not math.isfinite(seconds):
+            # nan survives the clamp below and would never reach the sampling deadline
+            raise ValueError(f"seconds must be a finite number, got {seconds}")
+        with self._lock:
+            if self._running:
+                self.rejected += 1
+                raise ProfilerBusy(self.max_seconds)
+            wait = self._last_finished + self.cooldown - time.monotonic()
+            if self._last_finished and wait > 0:
+                self.rejected += 1
+                raise ProfilerBusy(wait)
+            self._running = True
+        return min(max(seconds, 0.1), self.max_seconds), min(max(hz, 1), self.max_hz)
+
+    def run(self, seconds: float, hz: int) -> Dict:
+        """Blocking sample loop; call reserve() first and run this in a worker thread"""
+        try:
+            return self._sample(seconds, hz)
+        finally:
+            with self._lock:
+                self._running = False
+                self._last_finished = time.monotonic()
+                self.runs += 1
+
+    def _sample(self, seconds: float, hz: int) -> Dict:
+        me = threading.get_ident()
+        interval = 1.0 / hz
+        stacks = Counter()
+        samples = 0
+        started = time.monotonic()
+        cpu_started = time.thread_time()
+        deadline = started + seconds
+
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                stacks[self._fold(frame, names.get(thread_id, str(thread_id)), thread_id)] += 1
+            samples += 1
+            time.sleep(max(0.0, interval - (time.monotonic() - now)))
+
+        return {
+            "seconds": round(time.monotonic() - started, 3),
+            "hz": hz,
+            "samples": samples,
+            "sampler_cpu_s": round(time.thread_time() - cpu_started, 4),
+            "stacks": stacks,
+        }
+
+    def _fold(self, frame, thread_name: str, thread_id: int) -> str:
+        parts = []
+        while frame is not None and len(parts) < self.max_depth:
+            code = frame.f_code
+            parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        root = "event-loop" if thread_id == self.main_thread_id else thread_name
+        parts.append(root)
+        return ";".join(reversed(parts))
+
+    def snapshot(self) -> Dict:
+        cooldown_left = 0.0
+        if self._last_finished:
+            cooldown_left = max(0.0, self._last_finished + self.cooldown - time.monotonic())
+        return {
+            "running": self._running,
+            "runs": self.runs,
+            "rejected": self.rejected,
+            "cooldown_remaining_s": round(cooldown_left, 1),
+            "max_seconds": self.max_seconds,
+            "max_hz": self.max_hz,
+        }
+
+
+def collapsed(stacks: Counter) -> str:
+    """Render folded stacks, heaviest first"""
+    return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
+
+
+def profiler_from_env() -> SamplingProfiler:
+    return SamplingProfiler(
+        max_seconds=float(os.environ.get("PROFILE_MAX_SECONDS", 30)),
+        max_hz=int(os.environ.get("PROFILE_MAX_HZ", 250)),
+        cooldown=float(os.environ.get("PROFILE_COOLDOWN_S", 60)),
+    )
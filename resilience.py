@@ -0,0 +1,491 @@
+"""
+Resilience primitives for the Mem0 memory path
+Circuit breaker with a rolling error/latency window, hedged reads and an
+AIMD adaptive concurrency limiter that honours Retry-After
+"""
+
+import asyncio
+import heapq
+import itertools
+import re
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Message sniffing for client versions whose errors carry no status code
+RATE_LIMIT_RE = re.compile(r"\b429\b|rate limit", re.IGNORECASE)
+
+
+class BackendUnavailable(Exception):
+    """Base for fast rejections that carry a retry hint in seconds"""
+
+    def __init__(self, message: str, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(message)
+
+
+class CircuitOpenError(BackendUnavailable):
+    """Raised when the breaker rejects a call without touching the backend"""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        super().__init__(f"{name} circuit open, retry in {retry_after:.1f}s", retry_after)
+
+
+class LimiterTimeout(BackendUnavailable):
+    """Raised when a call waited too long (or the queue is full) for a concurrency slot"""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        super().__init__(f"{name} overloaded, retry in {retry_after:.1f}s", retry_after)
+
+
+def error_status(exc: BaseException) -> Optional[int]:
+    """HTTP status of a backend error (status_code or response.status_code), if it carries one"""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def rate_limit_retry_after(exc: BaseException, default: float = 1.0) -> Optional[float]:
+    """
+    Seconds to back off if exc is a 429 from the backend, otherwise None.
+    Understands mem0 RateLimitError (debug_info), httpx errors (response
+    headers) and, only when the error carries no status, falls back to
+    sniffing the message of older client versions.
+    """
+    status = error_status(exc)
+    response = getattr(exc, "response", None)
+    debug_info = getattr(exc, "debug_info", None) or {}
+
+    is_rate_limited = (
+        status == 429
+        or type(exc).__name__ == "RateLimitError"
+        or "retry_after" in debug_info
+        or (status is None and RATE_LIMIT_RE.search(str(exc)) is not None)
+    )
+    if not is_rate_limited:
+        return None
+
+    retry_after = debug_info.get("retry_after")
+    if retry_after is None and response is not None:
+        retry_after = getattr(response, "headers", {}).get("Retry-After")
+    try:
+        return max(0.0, float(retry_after))
+    except (TypeError, ValueError):
+        return default
+
+
+class RollingWindow:
+    """Bounded window of recent call outcomes (latency, ok) with an age limit"""
+
+    def __init__(self, size: int = 100, max_age: float = 60.0):
+        self.size = size
+        self.max_age = max_age
+        self.samples = deque(maxlen=size)
+
+    def record(self, latency: float, ok: bool):
+        self.samples.append((time.monotonic(), latency, ok))
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.max_age
+        while self.samples and self.samples[0][0] < cutoff:
+            self.samples.popleft()
+
+    def __len__(self):
+        self._prune()
+        return len(self.samples)
+
+    def error_rate(self) -> float:
+        self._prune()
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, _, ok in self.samples if not ok) / len(self.samples)
+
+    def slow_rate(self, threshold: float) -> float:
+        self._prune()
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, latency, _ in self.samples if latency >= threshold) / len(self.samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Latency percentile over successful calls, None when the window is empty"""
+        self._prune()
+        latencies = sorted(latency for _, latency, ok in self.samples if ok)
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, int(round(pct / 100.0 * (len(latencies) - 1))))
+        return latencies[index]
+
+    def reset(self):
+        self.samples.clear()
+
+
+class CircuitBreaker:
+    """
+    Closed -> open when the rolling error rate or slow-call rate crosses its
+    threshold, open -> half-open after reset_timeout, half-open -> closed after
+    enough successful probes (or straight back to open on any failure).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_size: int = 100,
+        window_age: float = 60.0,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        slow_call_threshold: float = 3.0,
+        slow_call_rate: float = 0.8,
+        reset_timeout: float = 30.0,
+        half_open_probes: int = 2,
+    ):
+        self.name = name
+        self.window = RollingWindow(window_size, window_age)
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_threshold = slow_call_threshold
+        self.slow_call_rate = slow_call_rate
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.probe_successes = 0
+        self.rejected = 0
+        self.transitions = 0
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        self.state = state
+        self.transitions += 1
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        elif state == CLOSED:
+            self.window.reset()
+        self.probes_in_flight = 0
+        self.probe_successes = 0
+
+    def allow(self):
+        """Admit a call or raise CircuitOpenError"""
+        if self.state == OPEN:
+            elapsed = time.monotonic() - self.opened_at
+            if elapsed < self.reset_timeout:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self.reset_timeout - elapsed)
+            self._transition(HALF_OPEN)
+
+        if self.state == HALF_OPEN:
+            if self.probes_in_flight >= self.half_open_probes:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, 1.0)
+            self.probes_in_flight += 1
+
+    def record_success(self, latency: float):
+        self.window.record(latency, True)
+        if self.state == HALF_OPEN:
+            self.probes_in_flight = max(0, self.probes_in_flight - 1)
+            self.probe_successes += 1
+            if self.probe_successes >= self.half_open_probes:
+                self._transition(CLOSED)
+        else:
+            self._evaluate()
+
+    def record_failure(self, latency: float):
+        self.window.record(latency, False)
+        if self.state == HALF_OPEN:
+            self._transition(OPEN)
+        else:
+            self._evaluate()
+
+    def record_neutral(self):
+        """Outcome that says nothing about backend health (e.g. a 429)"""
+        if self.state == HALF_OPEN:
+            self.probes_in_flight = max(0, self.probes_in_flight - 1)
+
+    def _evaluate(self):
+        if self.state != CLOSED or len(self.window) < self.min_calls:
+            return
+        if (self.window.error_rate() >= self.failure_rate
+                or self.window.slow_rate(self.slow_call_threshold) >= self.slow_call_rate):
+            self._transition(OPEN)
+
+    def snapshot(self) -> Dict[str, Any]:
+        retry_after = 0.0
+        if self.state == OPEN:
+            retry_after = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        return {
+            "name": self.name,
+            "state": self.state,
+            "calls_in_window": len(self.window),
+            "error_rate": round(self.window.error_rate(), 4),
+            "slow_call_rate": round(self.window.slow_rate(self.slow_call_threshold), 4),
+            "p95_latency_ms": _ms(self.window.percentile(95)),
+            "rejected": self.rejected,
+            "transitions": self.transitions,
+            "retry_after_s": round(retry_after, 2),
+        }
+
+
+class Hedger:
+    """
+    Run an idempotent call and, if it has not finished by the observed p95
+    latency, fire a duplicate and keep whichever completes first.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        percentile: float = 95.0,
+        min_samples: int = 20,
+        min_delay: float = 0.05,
+        max_delay: float = 2.0,
+        window_size: int = 200,
+    ):
+        self.name = name
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.window = RollingWindow(window_size, max_age=300.0)
+
+        self.calls = 0
+        self.hedges_sent = 0
+        self.primary_wins = 0
+        self.hedge_wins = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, None until enough samples exist"""
+        if len(self.window) < self.min_samples:
+            return None
+        p = self.window.percentile(self.percentile)
+        if p is None:
+            return None
+        return min(self.max_delay, max(self.min_delay, p))
+
+    async def run(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        started = time.monotonic()
+        delay = self.hedge_delay()
+        primary = asyncio.ensure_future(call())
+
+        if delay is None:
+            result = await primary
+            self.window.record(time.monotonic() - started, True)
+            return result
+
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+        except BaseException:
+            # asyncio.wait does not cancel what it waits on; don't orphan the primary
+            primary.cancel()
+            raise
+        if done:
+            result = primary.result()
+            self.window.record(time.monotonic() - started, True)
+            return result
+
+        self.hedges_sent += 1
+        hedge = asyncio.ensure_future(call())
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    if task is hedge:
+                        self.hedge_wins += 1
+                    else:
+                        self.primary_wins += 1
+                    self.window.record(time.monotonic() - started, True)
+                    return task.result()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def snapshot(self) -> Dict[str, Any]:
+        decided = self.primary_wins + self.hedge_wins
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "hedges_sent": self.hedges_sent,
+            "hedge_rate": round(self.hedges_sent / self.calls, 4) if self.calls else 0.0,
+            "primary_wins": self.primary_wins,
+            "hedge_wins": self.hedge_wins,
+            "hedge_win_rate": round(self.hedge_wins / decided, 4) if decided else 0.0,
+            "hedge_delay_ms": _ms(self.hedge_delay()),
+        }
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit in front of the backend. The limit grows by roughly
+    one slot per limit's worth of healthy completions, is multiplied by
+    backoff on a 429 or a latency spike, and all admission pauses until a
+    Retry-After deadline has passed. Calls over the limit wait in a queue
+    ordered by priority (lower first), FIFO within a priority. A share of
+    the limit is held back for calls below reserve_priority so background
+    work can never occupy every slot.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.5,
+        max_queue: int = 1000,
+        queue_timeout: float = 30.0,
+        reserve_fraction: float = 0.25,
+        reserve_priority: int = 2,
+    ):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.reserve_fraction = reserve_fraction
+        self.reserve_priority = reserve_priority
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self.in_flight = 0
+        self.waiters = []
+        self._seq = itertools.count()
+        self.paused_until = 0.0
+        self.baseline = None
+        self._wake_handle = None
+
+        self.admitted = 0
+        self.queued = 0
+        self.timed_out = 0
+        self.rate_limited = 0
+        self.latency_backoffs = 0
+        self.max_queue_depth = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self.waiters)
+
+    def _has_capacity(self, priority: int = 0) -> bool:
+        limit = int(self.limit)
+        if priority >= self.reserve_priority:
+            # Keep at least one slot for interactive work, even after a backoff shrinks the limit
+            reserved = max(int(limit * self.reserve_fraction), 1 if limit > 1 else 0)
+            limit = limit - reserved
+        return self.in_flight < limit and time.monotonic() >= self.paused_until
+
+    def _wake(self):
+        self._wake_handle = None
+        while self.waiters and self._has_capacity(self.waiters[0][0]):
+            _, _, waiter = heapq.heappop(self.waiters)
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+        remaining = self.paused_until - time.monotonic()
+        if self.waiters and remaining > 0 and self._wake_handle is None:
+            self._wake_handle = asyncio.get_running_loop().call_later(remaining, self._wake)
+
+    def _discard(self, waiter):
+        for i, entry in enumerate(self.waiters):
+            if entry[2] is waiter:
+                self.waiters[i] = self.waiters[-1]
+                self.waiters.pop()
+                heapq.heapify(self.waiters)
+                return
+
+    async def acquire(self, priority: int = 0):
+        if not self.waiters and self._has_capacity(priority):
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        if len(self.waiters) >= self.max_queue:
+            self.timed_out += 1
+            raise LimiterTimeout(self.name, max(1.0, self.paused_until - time.monotonic()))
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self._seq), waiter))
+        self.queued += 1
+        self.max_queue_depth = max(self.max_queue_depth, len(self.waiters))
+        self._wake()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as we gave up; hand the slot back
+                self.in_flight -= 1
+                self._wake()
+            self._discard(waiter)
+            waiter.cancel()
+            self.timed_out += 1
+            raise LimiterTimeout(self.name, max(1.0, self.paused_until - time.monotonic()))
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.in_flight -= 1
+                self._wake()
+            self._discard(waiter)
+            waiter.cancel()
+            raise
+        self.admitted += 1
+
+    def release(self, latency: float = None, rate_limited_for: float = None):
+        """Return a slot, adjusting the limit from the call outcome"""
+        self.in_flight = max(0, self.in_flight - 1)
+
+        if rate_limited_for is not None:
+            self.rate_limited += 1
+            self.paused_until = max(self.paused_until, time.monotonic() + rate_limited_for)
+            self._decrease()
+        elif latency is not None:
+            if self.baseline is None or latency < self.baseline:
+                self.baseline = latency
+            else:
+                # Let the baseline drift up slowly so it tracks backend changes
+                self.baseline += (latency - self.baseline) * 0.01
+            if latency > self.baseline * self.latency_tolerance and latency - self.baseline > 0.05:
+                self.latency_backoffs += 1
+                self._decrease()
+            elif self.in_flight + 1 >= int(self.limit) // 2:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        self._wake()
+
+    def _decrease(self):
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queue_depth": len(self.waiters),
+            "max_queue_depth": self.max_queue_depth,
+            "baseline_latency_ms": _ms(self.baseline),
+            "paused_for_s": round(max(0.0, self.paused_until - time.monotonic()), 2),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "timed_out": self.timed_out,
+            "rate_limited": self.rate_limited,
+            "latency_backoffs": self.latency_backoffs,
+        }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
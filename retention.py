@@ -0,0 +1,364 @@
+"""
+Bulk delete and retention by metadata filter
+Matches memories in the local index (memory_index.py) against the metadata
+every write path stamps (category, day, month, year, device, client) plus an
+age cut-off, then deletes them in the background through the memory layer's
+BULK workload class. Deletes are rate limited by a token bucket and run with
+bounded concurrency, so a large purge never crowds out voice traffic.
+
+Scheduled policies come from RETENTION_POLICIES, e.g. "sse_stream=30,test=7"
+expires sse_stream memories after 30 days and test memories after 7.
+"""
+
+import asyncio
+import math
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from scheduling import BULK
+
+FILTER_FIELDS = ("category", "day", "month", "year", "device", "client")
+MAX_JOBS = 50
+DRY_RUN_SAMPLE = 20
+
+
+class InvalidFilter(ValueError):
+    """Filter with unknown fields, bad values or no criteria at all"""
+
+
+def parse_filter(raw: Any) -> Dict[str, Any]:
+    """
+    Validate a filter: each metadata field takes a string or list of strings,
+    older_than_days a number and before an ISO date. An empty filter is
+    rejected so a bulk delete can never mean "everything".
+    """
+    if not isinstance(raw, dict):
+        raise InvalidFilter("filter must be an object")
+    unknown = set(raw) - set(FILTER_FIELDS) - {"older_than_days", "before"}
+    if unknown:
+        raise InvalidFilter(f"Unknown filter fields: {', '.join(sorted(unknown))}")
+
+    parsed: Dict[str, Any] = {}
+    for field in FILTER_FIELDS:
+        value = raw.get(field)
+        if value is None:
+            continue
+        values = [value] if isinstance(value, (str, int)) else value
+        if not isinstance(values, list) or not values or not all(isinstance(v, (str, int)) for v in values):
+            raise InvalidFilter(f"{field} must be a string or a list of strings")
+        parsed[field] = {str(v) for v in values}
+    if raw.get("older_than_days") is not None:
+        try:
+            parsed["older_than_days"] = float(raw["older_than_days"])
+        except (TypeError, ValueError):
+            raise InvalidFilter("older_than_days must be a number")
+        if parsed["older_than_days"] < 0:
+            raise InvalidFilter("older_than_days must not be negative")
+    if raw.get("before") is not None:
+        try:
+            parsed["before"] = _timestamp(str(raw["before"]))
+        except ValueError:
+            raise InvalidFilter("before must be an ISO date or datetime")
+    if not parsed:
+        raise InvalidFilter("filter needs at least one criterion")
+    return parsed
+
+
+def describe_filter(flt: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-friendly form of a parsed filter"""
+    described = {k: sorted(v) if isinstance(v, set) else v for k, v in flt.items()}
+    if "before" in described:
+        described["before"] = datetime.fromtimestamp(described["before"]).isoformat()
+    return described
+
+
+def _timestamp(value: str) -> float:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def _created(record: Dict[str, Any]) -> Optional[float]:
+    """When a memory was written: created_at, else the timestamp/day metadata"""
+    metadata = record.get("metadata") or {}
+    for value in (record.get("created_at"), metadata.get("timestamp"), metadata.get("day")):
+        if value:
+            try:
+                return _timestamp(str(value))
+            except ValueError:
+                continue
+    return None
+
+
+def matches(record: Dict[str, Any], flt: Dict[str, Any], now: float = None) -> bool:
+    metadata = record.get("metadata") or {}
+    for field in FILTER_FIELDS:
+        if field in flt and str(metadata.get(field)) not in flt[field]:
+            return False
+    if "older_than_days" in flt or "before" in flt:
+        created = _created(record)
+        if created is None:
+            return False
+        if "before" in flt and created >= flt["before"]:
+            return False
+        if "older_than_days" in flt:
+            now = time.time() if now is None else now
+            if created > now - flt["older_than_days"] * 86400:
+                return False
+    return True
+
+
+class TokenBucket:
+    """Allows `rate` operations per second with bursts of up to `burst`"""
+
+    def __init__(self, rate: float, burst: int = None):
+        if not rate > 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def take(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class DeleteJob:
+    def __init__(self, user_id: str, flt: Dict[str, Any], dry_run: bool = False, source: str = "api"):
+        self.job_id = uuid.uuid4().hex[:16]
+        self.user_id = user_id
+        self.filter = flt
+        self.dry_run = dry_run
+        self.source = source
+        self.status = "queued"
+        self.matched = 0
+        self.deleted = 0
+        self.failed = 0
+        self.sample: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+        self.started = time.time()
+        self.finished: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        snapshot = {
+            "job_id": self.job_id,
+            "user_id": self.user_id,
+            "source": self.source,
+            "filter": describe_filter(self.filter),
+            "dry_run": self.dry_run,
+            "status": self.status,
+            "matched": self.matched,
+            "deleted": self.deleted,
+            "failed": self.failed,
+            "elapsed_s": round((self.finished or time.time()) - self.started, 2),
+        }
+        if self.dry_run:
+            snapshot["sample"] = self.sample
+        if self.error:
+            snapshot["error"] = self.error
+        return snapshot
+
+
+class RetentionPolicy:
+    def __init__(self, name: str, flt: Dict[str, Any]):
+        self.name = name
+        self.filter = flt
+        self.last_run: Optional[float] = None
+        self.deleted = 0
+
+
+class RetentionManager:
+    """Background filter deletes and the scheduled retention sweep"""
+
+    def __init__(self, memory, index, broadcast: Callable = None, rate: float = 10.0, concurrency: int = 4,
+                 policies: List[RetentionPolicy] = None, interval: float = 3600.0):
+        self.memory = memory
+        self.index = index
+        self.broadcast = broadcast
+        self.bucket = TokenBucket(rate)
+        self.concurrency = concurrency
+        self.policies = policies or []
+        self.interval = interval
+        self.jobs: "OrderedDict[str, DeleteJob]" = OrderedDict()
+        self.sweeps = 0
+        self.last_error: Optional[Dict[str, Any]] = None
+        self._user_locks: Dict[str, asyncio.Lock] = {}
+        self._scheduler: Optional[asyncio.Task] = None
+
+    def start(self, user_id: str, flt: Dict[str, Any], dry_run: bool = False, source: str = "api") -> DeleteJob:
+        """Queue a delete job in the background and return it immediately"""
+        job = DeleteJob(user_id, flt, dry_run, source)
+        self.jobs[job.job_id] = job
+        while len(self.jobs) > MAX_JOBS:
+            oldest = next(iter(self.jobs.values()))
+            if oldest.status in ("queued", "running"):
+                break
+            self.jobs.popitem(last=False)
+        job.task = asyncio.create_task(self._run(job))
+        return job
+
+    def job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.jobs.get(job_id)
+        return job.snapshot() if job else None
+
+    async def _run(self, job: DeleteJob):
+        # One job per user at a time, so overlapping filters don't delete the same ids twice
+        lock = self._user_locks.setdefault(job.user_id, asyncio.Lock())
+        async with lock:
+            job.status = "running"
+            try:
+                view = await self.index.view(job.user_id)
+                now = time.time()
+                targets = [r for r in list(view.records.values()) if matches(r, job.filter, now)]
+                job.matched = len(targets)
+                if job.dry_run:
+                    job.sample = [{"id": r["id"], "memory": r.get("memory"), "created_at": r.get("created_at")}
+                                  for r in targets[:DRY_RUN_SAMPLE]]
+                else:
+                    await self._delete(job, [r["id"] for r in targets])
+                job.status = "completed"
+            except asyncio.CancelledError:
+                job.status = "cancelled"
+                raise
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                job.finished = time.time()
+                if self.broadcast and not job.dry_run:
+                    await self.broadcast({"type": "bulk_delete", "timestamp": datetime.now().isoformat(),
+                                          **job.snapshot()}, job.user_id)
+
+    async def _delete(self, job: DeleteJob, memory_ids: List[str]):
+        queue: asyncio.Queue = asyncio.Queue()
+        for memory_id in memory_ids:
+            queue.put_nowait(memory_id)
+
+        async def worker():
+            while not queue.empty():
+                memory_id = queue.get_nowait()
+                await self.bucket.take()
+                try:
+                    # The index listener drops the record from the local view on success
+                    await self.memory.delete(workload=BULK, memory_id=memory_id, tenant=job.user_id)
+                    job.deleted += 1
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    job.failed += 1
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(memory_ids)))))
+
+    # ----- scheduled retention -----
+
+    async def sweep(self, users: Iterable[str]) -> List[DeleteJob]:
+        """Run every policy for every user now; returns the finished jobs"""
+        jobs = []
+        for policy in self.policies:
+            for user_id in users:
+                job = self.start(user_id, policy.filter, source=f"policy:{policy.name}")
+                jobs.append(job)
+                await job.task
+                policy.deleted += job.deleted
+            policy.last_run = time.time()
+        self.sweeps += 1
+        return jobs
+
+    def start_scheduler(self, users: Callable[[], Iterable[str]]):
+        """Sweep every `interval` seconds for the users returned by users()"""
+        if not self.policies or self.interval <= 0 or self._scheduler:
+            return
+
+        async def loop():
+            while True:
+                await asyncio.sleep(self.interval)
+                try:
+                    await self.sweep(list(users()))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # Keep sweeping on the next tick; surface the failure in snapshot()
+                    self.last_error = {"error": f"{e.__class__.__name__}: {e}",
+                                       "at": datetime.now().isoformat()}
+
+        self._scheduler = asyncio.create_task(loop())
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "rate_per_s": self.bucket.rate,
+            "concurrency": self.concurrency,
+            "interval_s": self.interval,
+            "sweeps": self.sweeps,
+            "last_error": self.last_error,
+            "policies": [
+                {"name": p.name, "filter": describe_filter(p.filter), "deleted": p.deleted,
+                 "last_run": datetime.fromtimestamp(p.last_run).isoformat() if p.last_run else None}
+                for p in self.policies
+            ],
+            "jobs": [job.snapshot() for job in self.jobs.values()],
+        }
+
+
+def _policies_from_env(raw: str) -> List[RetentionPolicy]:
+    """category=days pairs; a malformed pair is reported and skipped rather than failing startup"""
+    policies = []
+    for part in raw.split(","):
+        if not part.strip():
+            continue
+        category, _, days = part.partition("=")
+        try:
+            flt = parse_filter({"category": category.strip() or None, "older_than_days": days.strip() or None})
+            if set(flt) != {"category", "older_than_days"}:
+                raise InvalidFilter("expected category=days")
+        except InvalidFilter as e:
+            print(f"⚠️ Skipping retention policy {part.strip()!r}: {e}")
+            continue
+        policies.append(RetentionPolicy(category.strip(), flt))
+    return policies
+
+
+def _positive_from_env(name: str, default: float) -> float:
+    """A positive number from the environment; a bad value is reported and the default used"""
+    raw = os.environ.get(name)
+    if raw is None:
+        return default
+    try:
+        value = float(raw)
+    except ValueError:
+        value = math.nan
+    if not (math.isfinite(value) and value > 0):
+        print(f"⚠️ Ignoring {name}={raw!r}: must be a positive number, using {default}")
+        return default
+    return value
+
+
+def retention_from_env(memory, index, broadcast: Callable = None) -> Optional[RetentionManager]:
+    """
+    RETENTION_POLICIES      category=days pairs, e.g. "sse_stream=30,test=7" (default: none)
+    RETENTION_INTERVAL_S    seconds between scheduled sweeps (default 3600, 0 disables)
+    RETENTION_RATE          max deletes per second across all jobs (default 10)
+    RETENTION_CONCURRENCY   concurrent delete calls per job (default 4)
+    """
+    if memory is None:
+        return None
+    return RetentionManager(
+        memory,
+        index,
+        broadcast,
+        rate=_positive_from_env("RETENTION_RATE", 10),
+        concurrency=max(1, int(_positive_from_env("RETENTION_CONCURRENCY", 4))),
+        policies=_policies_from_env(os.environ.get("RETENTION_POLICIES", "")),
+        interval=float(os.environ.get("RETENTION_INTERVAL_S", 3600)),
+    )
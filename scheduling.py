@@ -0,0 +1,226 @@
+"""
+Priority scheduling for memory operations
+Each workload class gets its own bounded concurrency pool (bulkhead) and a
+priority used when competing for the shared Mem0 concurrency limit, so voice
+reads never queue behind bulk imports or a large get_all. Within a pool,
+tenants (Mem0 users) are served round-robin under a per-tenant quota.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+
+from resilience import BackendUnavailable
+
+INTERACTIVE_READ = "interactive_read"
+INTERACTIVE_WRITE = "interactive_write"
+BULK = "bulk"
+ADMIN = "admin"
+
+# Lower value is served first by the shared limiter
+PRIORITIES = {
+    INTERACTIVE_READ: 0,
+    INTERACTIVE_WRITE: 1,
+    BULK: 2,
+    ADMIN: 3,
+}
+
+# Default workload class per backend operation when the caller doesn't say
+DEFAULT_WORKLOADS = {
+    "search": INTERACTIVE_READ,
+    "get": INTERACTIVE_READ,
+    "add": INTERACTIVE_WRITE,
+    "delete": INTERACTIVE_WRITE,
+    "get_all": BULK,
+}
+
+# (max concurrent, max queued) per class, overridable via MEM0_POOL_<CLASS>=concurrent[:queued]
+DEFAULT_POOLS = {
+    INTERACTIVE_READ: (32, 500),
+    INTERACTIVE_WRITE: (16, 500),
+    BULK: (4, 2000),
+    ADMIN: (2, 20),
+}
+
+
+class BulkheadFull(BackendUnavailable):
+    """Raised when a workload class has no free slot and its queue is full or timed out"""
+
+    def __init__(self, workload: str, retry_after: float = 1.0):
+        self.workload = workload
+        super().__init__(f"{workload} pool is full, retry in {retry_after:.1f}s", retry_after)
+
+
+class Bulkhead:
+    """
+    Bounded concurrency pool for one workload class, shared fairly between
+    tenants: waiters queue per tenant and freed slots go round-robin to the
+    next tenant with work, so a noisy tenant's backlog never starves a quiet
+    one. tenant_quota caps one tenant's concurrent and queued calls.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float = 30.0,
+                 tenant_quota: tuple = None):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        quota_concurrent, quota_queued = tenant_quota or (None, None)
+        self.tenant_concurrent = max(1, min(quota_concurrent or max_concurrent, max_concurrent))
+        self.tenant_queue = max(1, min(quota_queued or max_queue // 2, max_queue))
+
+        # tenant -> FIFO of waiting futures; insertion order is the round-robin order
+        self.queues: "OrderedDict[str, deque]" = OrderedDict()
+        self.tenant_active: Dict[str, int] = {}
+
+        self.active = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _grant(self, tenant: str):
+        self.active += 1
+        self.tenant_active[tenant] = self.tenant_active.get(tenant, 0) + 1
+
+    def _dispatch(self):
+        """Hand free slots to waiting tenants, round-robin, within their quotas"""
+        while self.active < self.max_concurrent:
+            for tenant, waiters in self.queues.items():
+                if self.tenant_active.get(tenant, 0) < self.tenant_concurrent:
+                    break
+            else:
+                return
+            waiter = waiters.popleft()
+            if waiters:
+                self.queues.move_to_end(tenant)
+            else:
+                del self.queues[tenant]
+            self._grant(tenant)
+            waiter.set_result(None)
+
+    async def acquire(self, tenant: str = ""):
+        if (not self.queues and self.active < self.max_concurrent
+                and self.tenant_active.get(tenant, 0) < self.tenant_concurrent):
+            self._grant(tenant)
+            return
+        if self.waiting >= self.max_queue or len(self.queues.get(tenant, ())) >= self.tenant_queue:
+            self.rejected += 1
+            raise BulkheadFull(self.name)
+
+        started = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self.queues.setdefault(tenant, deque()).append(waiter)
+        self.waiting += 1
+        # Slots may be free while other tenants wait only on their own quota
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done():
+                # Granted just as we gave up: hand the slot on
+                self.release(tenant)
+            else:
+                waiter.cancel()
+                waiters = self.queues.get(tenant)
+                if waiters is not None:
+                    waiters.remove(waiter)
+                    if not waiters:
+                        del self.queues[tenant]
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.rejected += 1
+            raise BulkheadFull(self.name)
+        finally:
+            self.waiting -= 1
+        waited = time.monotonic() - started
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+    def release(self, tenant: str = ""):
+        self.active -= 1
+        self.completed += 1
+        remaining = self.tenant_active.get(tenant, 0) - 1
+        if remaining > 0:
+            self.tenant_active[tenant] = remaining
+        else:
+            self.tenant_active.pop(tenant, None)
+        self._dispatch()
+
+    def snapshot(self) -> Dict[str, Any]:
+        admitted = self.completed + self.active
+        return {
+            "max_concurrent": self.max_concurrent,
+            "tenant_quota": [self.tenant_concurrent, self.tenant_queue],
+            "active": self.active,
+            "waiting": self.waiting,
+            "tenants_active": len(self.tenant_active),
+            "tenants_waiting": len(self.queues),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait / admitted * 1000, 2) if admitted else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+        }
+
+
+class PriorityScheduler:
+    """Maps workload classes to bulkheads and limiter priorities"""
+
+    def __init__(self, pools: Dict[str, tuple] = None, tenant_quota: tuple = None):
+        pools = pools or _pools_from_env()
+        tenant_quota = tenant_quota or _tenant_quota_from_env()
+        self.bulkheads = {
+            workload: Bulkhead(workload, concurrent, queued, tenant_quota=tenant_quota)
+            for workload, (concurrent, queued) in pools.items()
+        }
+
+    def classify(self, op: str, workload: str = None) -> str:
+        workload = workload or DEFAULT_WORKLOADS.get(op, INTERACTIVE_WRITE)
+        if workload not in self.bulkheads:
+            raise ValueError(f"Unknown workload class: {workload}")
+        return workload
+
+    def priority(self, workload: str) -> int:
+        return PRIORITIES[workload]
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(b.waiting for b in self.bulkheads.values())
+
+    @asynccontextmanager
+    async def slot(self, workload: str, tenant: str = ""):
+        bulkhead = self.bulkheads[workload]
+        await bulkhead.acquire(tenant)
+        try:
+            yield
+        finally:
+            bulkhead.release(tenant)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {workload: b.snapshot() for workload, b in self.bulkheads.items()}
+
+
+def _pools_from_env() -> Dict[str, tuple]:
+    pools = {}
+    for workload, (concurrent, queued) in DEFAULT_POOLS.items():
+        raw = os.environ.get(f"MEM0_POOL_{workload.upper()}")
+        if raw:
+            parts = raw.split(":")
+            concurrent = int(parts[0])
+            if len(parts) > 1:
+                queued = int(parts[1])
+        pools[workload] = (concurrent, queued)
+    return pools
+
+
+def _tenant_quota_from_env():
+    """MEM0_TENANT_QUOTA=concurrent[:queued] per tenant in each pool (default: whole pool, half its queue)"""
+    raw = os.environ.get("MEM0_TENANT_QUOTA")
+    if not raw:
+        return None
+    parts = raw.split(":")
+    return int(parts[0]), int(parts[1]) if len(parts) > 1 else None
@@ -0,0 +1,117 @@
+"""
+Precompressed, cacheable static responses
+Each asset is encoded and gzip (and brotli, when the brotli package is
+installed) compressed once at startup and carries an ETag and
+Last-Modified, so conditional GETs from browsers and polling monitors are
+answered with an empty 304
+"""
+
+import gzip
+import hashlib
+import os
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Dict
+
+from fastapi import Request, Response
+
+from json_backend import dumps_bytes
+from metrics import record_cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are not worth a Content-Encoding
+MIN_COMPRESS_BYTES = 512
+
+
+class StaticAsset:
+    """One immutable response body with its precomputed encodings and validators"""
+
+    def __init__(self, body: bytes, media_type: str, last_modified: float = None,
+                 cache_control: str = "no-cache"):
+        self.body = body
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.last_modified_ts = int(last_modified if last_modified is not None else time.time())
+        self.last_modified = formatdate(self.last_modified_ts, usegmt=True)
+        self.etag_base = hashlib.sha256(body).hexdigest()[:20]
+
+        self.encodings: Dict[str, bytes] = {}
+        if len(body) >= MIN_COMPRESS_BYTES:
+            self.encodings["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.encodings["br"] = brotli.compress(body, quality=11)
+
+    def etag(self, encoding: str = None) -> str:
+        # Each encoding is its own representation, so it gets its own validator
+        return f'"{self.etag_base}-{encoding}"' if encoding else f'"{self.etag_base}"'
+
+    def _negotiate(self, accept_encoding: str) -> str:
+        accepted = {}
+        for part in accept_encoding.split(","):
+            name, _, params = part.strip().partition(";")
+            q = 1.0
+            if params.strip().startswith("q="):
+                try:
+                    q = float(params.strip()[2:])
+                except ValueError:
+                    q = 0.0
+            if name:
+                accepted[name.strip().lower()] = q
+        for encoding in ("br", "gzip"):
+            if encoding in self.encodings and accepted.get(encoding, accepted.get("*", 0)) > 0:
+                return encoding
+        return None
+
+    def _not_modified(self, request: Request) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            if if_none_match.strip() == "*":
+                return True
+            for tag in if_none_match.split(","):
+                tag = tag.strip()
+                if tag.startswith("W/"):
+                    tag = tag[2:]
+                if tag.strip('"').split("-")[0] == self.etag_base:
+                    return True
+            return False
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return parsedate_to_datetime(if_modified_since).timestamp() >= self.last_modified_ts
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def response(self, request: Request, name: str = "static") -> Response:
+        encoding = self._negotiate(request.headers.get("accept-encoding", ""))
+        headers = {
+            "ETag": self.etag(encoding),
+            "Last-Modified": self.last_modified,
+            "Cache-Control": self.cache_control,
+        }
+        if self.encodings:
+            headers["Vary"] = "Accept-Encoding"
+
+        not_modified = self._not_modified(request)
+        record_cache(name, not_modified)
+        if not_modified:
+            return Response(status_code=304, headers=headers)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            return Response(self.encodings[encoding], media_type=self.media_type, headers=headers)
+        return Response(self.body, media_type=self.media_type, headers=headers)
+
+
+def file_asset(path: str, media_type: str, cache_control: str = "no-cache") -> StaticAsset:
+    with open(path, "rb") as f:
+        body = f.read()
+    return StaticAsset(body, media_type, os.path.getmtime(path), cache_control)
+
+
+def json_asset(content: Any, cache_control: str = "public, max-age=60") -> StaticAsset:
+    """JSON that only changes on restart (built from constants and env vars)"""
+    return StaticAsset(dumps_bytes(content), "application/json", cache_control=cache_control)
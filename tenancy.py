@@ -0,0 +1,177 @@
+"""
+Per-request tenant (Mem0 user) routing
+The tenant of a request comes from, in order of precedence:
+  1. a bearer token bound to a tenant in TENANT_TOKENS ("token:user,...")
+     (Authorization: Bearer <token> or X-Tenant-Token)
+  2. a user_id tool argument (MCP tools/call arguments, webhook parameters)
+  3. the X-User-Id header
+  4. USER_ID, the deployment's default tenant
+A bound token cannot be overridden by a header or argument, and a tenant
+that has a token can only be acted as with that token. Other header and
+argument tenants must be listed in TENANT_ALLOWED. With neither
+TENANT_ALLOWED nor TENANT_TOKENS the deployment is single-tenant and they
+are ignored. TENANT_REQUIRE_TOKEN=1 rejects every request without a bound
+token, the default tenant's included.
+
+The resolved tenant travels in a contextvar, so every memory call, index
+lookup and SSE broadcast made while handling the request is scoped to it.
+"""
+
+import contextvars
+import os
+import re
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+from json_backend import dumps_bytes
+
+TENANT_RE = re.compile(r"^[\w.@:-]{1,128}$")
+
+_current_tenant = contextvars.ContextVar("current_tenant", default=None)
+# True while the current tenant was fixed by a bound token
+_token_bound = contextvars.ContextVar("tenant_token_bound", default=False)
+
+
+class UnknownTenant(ValueError):
+    """Malformed tenant id, or one this request is not allowed to act as"""
+
+
+class TenantResolver:
+    def __init__(self, default: str, header: str = "x-user-id", tokens: Dict[str, str] = None,
+                 allowed: Iterable[str] = None, require_token: bool = False):
+        self.default = default
+        self.header = header.lower()
+        self.tokens = tokens or {}
+        self.allowed = set(allowed) if allowed else None
+        self.require_token = require_token
+
+    @property
+    def multi_tenant(self) -> bool:
+        """Whether header/argument tenants are honoured at all"""
+        return self.allowed is not None or bool(self.tokens)
+
+    def known(self) -> List[str]:
+        """Every tenant this resolver can ever serve: the default, allow-listed and token tenants"""
+        return sorted({self.default, *(self.allowed or ()), *self.tokens.values()})
+
+    @staticmethod
+    def _token(headers) -> Optional[str]:
+        authorization = headers.get("authorization") or ""
+        if authorization.lower().startswith("bearer "):
+            return authorization[7:].strip()
+        return headers.get("x-tenant-token")
+
+    def bound_tenant(self, headers) -> Optional[str]:
+        token = self._token(headers)
+        return self.tokens.get(token) if token else None
+
+    def resolve(self, headers, argument: str = None) -> str:
+        """The tenant for these request headers and optional tool argument"""
+        bound = self.bound_tenant(headers)
+        requested = argument or headers.get(self.header)
+        if bound:
+            if requested and requested != bound:
+                raise UnknownTenant(f"Token is bound to another tenant than {requested!r}")
+            return bound
+        if self.require_token:
+            raise UnknownTenant("A tenant token is required")
+        return self._check(requested)
+
+    def override(self, argument: str = None) -> str:
+        """The tenant for a tool call's user_id argument, given the request's tenant"""
+        current = self.current()
+        if not argument or argument == current:
+            return current
+        if _token_bound.get():
+            raise UnknownTenant(f"Token is bound to another tenant than {argument!r}")
+        return self._check(str(argument))
+
+    def _check(self, requested: Optional[str]) -> str:
+        if not requested or requested == self.default or not self.multi_tenant:
+            return self.default
+        if self.require_token or requested in self.tokens.values():
+            raise UnknownTenant(f"Tenant {requested!r} requires a tenant token")
+        if not TENANT_RE.match(requested):
+            raise UnknownTenant(f"Invalid tenant id: {requested!r}")
+        # Tokens alone only admit their own tenants; unbound ones must be allow-listed
+        if self.allowed is None or requested not in self.allowed:
+            raise UnknownTenant(f"Unknown tenant: {requested!r}")
+        return requested
+
+    @contextmanager
+    def scope(self, tenant: str, bound: bool = None):
+        """Make tenant current for the enclosed code (and tasks it creates)"""
+        token = _current_tenant.set(tenant)
+        bound_token = _token_bound.set(bound) if bound is not None else None
+        try:
+            yield tenant
+        finally:
+            _current_tenant.reset(token)
+            if bound_token is not None:
+                _token_bound.reset(bound_token)
+
+    def current(self) -> str:
+        return _current_tenant.get() or self.default
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "default": self.default,
+            "header": self.header,
+            "token_tenants": sorted(set(self.tokens.values())),
+            "allowed": sorted(self.allowed) if self.allowed is not None else None,
+            "require_token": self.require_token,
+            "multi_tenant": self.multi_tenant,
+        }
+
+
+class TenantMiddleware:
+    """Pure ASGI: resolve the tenant from headers and set it for the whole request"""
+
+    def __init__(self, app, resolver: TenantResolver, public_paths=("/health",)):
+        self.app = app
+        self.resolver = resolver
+        # Served as the default tenant without a token (load balancer health checks)
+        self.public_paths = tuple(public_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.public_paths:
+            return await self.app(scope, receive, send)
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        try:
+            tenant = self.resolver.resolve(headers)
+        except UnknownTenant as e:
+            body = dumps_bytes({"detail": str(e)})
+            await send({"type": "http.response.start", "status": 403,
+                        "headers": [(b"content-type", b"application/json"),
+                                    (b"content-length", str(len(body)).encode())]})
+            await send({"type": "http.response.body", "body": body})
+            return
+        with self.resolver.scope(tenant, bound=self.resolver.bound_tenant(headers) is not None):
+            await self.app(scope, receive, send)
+
+
+def _tokens_from_env(raw: str) -> Dict[str, str]:
+    tokens = {}
+    for pair in raw.split(","):
+        token, _, tenant = pair.strip().partition(":")
+        if token and tenant:
+            tokens[token] = tenant
+    return tokens
+
+
+def resolver_from_env(default: str) -> TenantResolver:
+    """
+    TENANT_HEADER          header naming the tenant (default X-User-Id)
+    TENANT_TOKENS          token:tenant pairs, comma separated
+    TENANT_ALLOWED         comma-separated tenants accepted from header/argument without
+                           a token (default: none)
+    TENANT_REQUIRE_TOKEN   1 = reject every request without a bound token
+    """
+    allowed = [t.strip() for t in os.environ.get("TENANT_ALLOWED", "").split(",") if t.strip()]
+    return TenantResolver(
+        default,
+        header=os.environ.get("TENANT_HEADER", "x-user-id"),
+        tokens=_tokens_from_env(os.environ.get("TENANT_TOKENS", "")),
+        allowed=allowed or None,
+        require_token=os.environ.get("TENANT_REQUIRE_TOKEN", "0") == "1",
+    )
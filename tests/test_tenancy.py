@@ -0,0 +1,36 @@
+import pytest
+
+from tenancy import TenantResolver, UnknownTenant
+
+
+def test_token_tenant_cannot_be_claimed_without_its_token():
+    resolver = TenantResolver("quinn_may", tokens={"s3cret": "alice"}, allowed=["alice", "bob"])
+    with pytest.raises(UnknownTenant):
+        resolver.resolve({"x-user-id": "alice"})
+    with pytest.raises(UnknownTenant):
+        resolver.resolve({}, argument="alice")
+    with resolver.scope("quinn_may", bound=False):
+        with pytest.raises(UnknownTenant):
+            resolver.override("alice")
+    assert resolver.resolve({"authorization": "Bearer s3cret", "x-user-id": "alice"}) == "alice"
+
+
+def test_tokens_alone_do_not_admit_unbound_tenants():
+    resolver = TenantResolver("quinn_may", tokens={"s3cret": "alice"})
+    with pytest.raises(UnknownTenant):
+        resolver.resolve({"x-user-id": "bob"})
+    with resolver.scope("quinn_may", bound=False):
+        with pytest.raises(UnknownTenant):
+            resolver.override("bob")
+    assert resolver.resolve({}) == "quinn_may"
+
+
+def test_allowed_tenants_are_served_from_header():
+    resolver = TenantResolver("quinn_may", tokens={"s3cret": "alice"}, allowed=["bob"])
+    assert resolver.resolve({"x-user-id": "bob"}) == "bob"
+    with pytest.raises(UnknownTenant):
+        resolver.resolve({"x-user-id": "carol"})
+
+
+def test_single_tenant_deployment_ignores_header():
+    assert TenantResolver("quinn_may").resolve({"x-user-id": "bob"}) == "quinn_may"
@@ -0,0 +1,302 @@
+"""
+Lightweight per-request tracing
+Spans are tracked through a contextvar, continued from an incoming W3C
+traceparent header, sampled per trace, and exported in the background as
+JSON lines to a local file or as OTLP/HTTP JSON to a collector
+"""
+
+import contextvars
+import json
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = {}
+        self.error = None
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Returned for unsampled requests so instrumented code needs no branches"""
+
+    def set(self, key: str, value: Any):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def parse_traceparent(header: Optional[str]):
+    """(trace_id, parent_span_id, sampled) from a W3C traceparent, or None"""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        flags = int(parts[3], 16)
+        int(parts[1], 16)
+        int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+class FileExporter:
+    """Appends finished spans as JSON lines"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Span]):
+        with open(self.path, "a") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict()) + "\n")
+
+
+class OTLPExporter:
+    """Posts spans as OTLP/HTTP JSON (e.g. http://collector:4318/v1/traces)"""
+
+    def __init__(self, url: str, service_name: str):
+        self.url = url
+        self.service_name = service_name
+
+    def export(self, spans: List[Span]):
+        import httpx
+
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attr("service.name", self.service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": "combinedmemory.tracing"},
+                    "spans": [_otlp_span(span) for span in spans],
+                }],
+            }]
+        }
+        httpx.post(self.url, json=payload, timeout=5.0)
+
+
+def _otlp_attr(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def _otlp_span(span: Span) -> Dict[str, Any]:
+    data = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 1,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": [_otlp_attr(k, v) for k, v in span.attributes.items()],
+        "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+    }
+    if span.parent_id:
+        data["parentSpanId"] = span.parent_id
+    return data
+
+
+class Tracer:
+    """Creates spans and hands finished ones to a background export thread"""
+
+    def __init__(self, exporter=None, sample_rate: float = 0.0, batch_size: int = 256,
+                 flush_interval: float = 1.0, max_pending: int = 10000):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self.exported = 0
+        self.export_errors = 0
+        self._thread = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None and self.sample_rate > 0
+
+    def start_trace(self, name: str, traceparent: Optional[str] = None):
+        """Root (or continued) span for a request; None when not sampled"""
+        if self.exporter is None:
+            return None
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+            if not sampled and random.random() >= self.sample_rate:
+                return None
+        else:
+            if random.random() >= self.sample_rate:
+                return None
+            trace_id, parent_id = os.urandom(16).hex(), None
+        return Span(name, trace_id, parent_id)
+
+    def activate(self, span: Span):
+        return _current_span.set(span)
+
+    def deactivate(self, token):
+        _current_span.reset(token)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        parent = _current_span.get()
+        if parent is None:
+            yield NOOP_SPAN
+            return
+        span = Span(name, parent.trace_id, parent.span_id)
+        if attributes:
+            span.attributes.update(attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            self.finish(span)
+
+    def finish(self, span: Span):
+        span.end_ns = time.time_ns()
+        try:
+            self.pending.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._export_loop, name="trace-exporter", daemon=True)
+            self._thread.start()
+
+    def _export_loop(self):
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self.exporter.export(batch)
+                self.exported += len(batch)
+            except Exception:
+                self.export_errors += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "exporter": type(self.exporter).__name__ if self.exporter else None,
+            "sample_rate": self.sample_rate,
+            "pending": self.pending.qsize(),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "export_errors": self.export_errors,
+        }
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a root span per request and echoing traceparent back"""
+
+    def __init__(self, app, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.tracer.exporter is None:
+            return await self.app(scope, receive, send)
+
+        incoming = None
+        for key, value in scope.get("headers", ()):
+            if key == b"traceparent":
+                incoming = value.decode("latin-1")
+                break
+        span = self.tracer.start_trace(f"{scope['method']} {scope['path']}", incoming)
+        if span is None:
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                span.set("http.status_code", message["status"])
+                headers = list(message.get("headers", ()))
+                headers.append((b"traceparent", span.traceparent().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        span.set("http.method", scope["method"])
+        span.set("http.target", scope["path"])
+        token = self.tracer.activate(span)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self.tracer.deactivate(token)
+            route = scope.get("route")
+            if route is not None:
+                span.name = f"{scope['method']} {route.path}"
+            self.tracer.finish(span)
+
+
+def tracer_from_env(service_name: str = "combinedmemory-voice-agent") -> Tracer:
+    """
+    TRACE_EXPORT=file:/path/spans.jsonl or otlp:http://host:4318/v1/traces
+    TRACE_SAMPLE_RATE=0.0-1.0 (requests with a sampled traceparent are always traced)
+    """
+    target = os.environ.get("TRACE_EXPORT", "")
+    exporter = None
+    if target.startswith("file:"):
+        exporter = FileExporter(target[len("file:"):])
+    elif target.startswith("otlp:"):
+        exporter = OTLPExporter(target[len("otlp:"):], service_name)
+    return Tracer(exporter, sample_rate=float(os.environ.get("TRACE_SAMPLE_RATE", 0.01)))
+
+
+# Process-wide tracer shared by app.py and the memory layer
+tracer = tracer_from_env()